@@ -0,0 +1,81 @@
+"""
+AST front end benchmark.
+
+On a large synthetic class, compares:
+- the single-pass CompilationEngine, against
+- JackParser (building a FlatAST) followed by the CodeGenerator
+
+and reports parse throughput, memory per AST node, and whether both
+front ends produced identical VM code.
+
+Usage:
+python benchmarks/ast_benchmark.py
+"""
+
+
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from code_generator import CodeGenerator
+from compilation_engine import CompilationEngine
+from jack_parser import JackParser
+from jack_tokenizer import JackTokenizer
+from synthetic import synthetic_class
+from vm_writer import VMWriter
+
+
+def best_of(repeat, function):
+  best = None
+
+  for _ in range(repeat):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+
+  return best, result
+
+
+def main():
+  source = synthetic_class(1_000_000)
+  tokenizer = JackTokenizer(source)
+  token_count = len(tokenizer.token_values)
+
+  def run_engine():
+    vm_writer = VMWriter()
+    tokenizer.seek(-1)
+    CompilationEngine(tokenizer, vm_writer).run()
+    return vm_writer
+
+  engine_time, engine_writer = best_of(3, run_engine)
+  parse_time, ast = best_of(3, lambda: JackParser(tokenizer).parse())
+
+  def run_code_generator():
+    vm_writer = VMWriter()
+    CodeGenerator(ast, tokenizer, vm_writer).run()
+    return vm_writer
+
+  codegen_time, ast_writer = best_of(3, run_code_generator)
+
+  tracemalloc.start()
+  JackParser(tokenizer).parse()
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  print(f"{token_count} tokens, {len(ast)} AST nodes")
+  print(f"engine (parse + emit)   {engine_time * 1000:>9.1f} ms {token_count / engine_time:>12,.0f} tokens/sec")
+  print(f"JackParser (parse only) {parse_time * 1000:>9.1f} ms {token_count / parse_time:>12,.0f} tokens/sec")
+  print(f"CodeGenerator (emit)    {codegen_time * 1000:>9.1f} ms")
+  print(f"AST parse + emit        {(parse_time + codegen_time) * 1000:>9.1f} ms")
+  print(f"AST node arrays         {ast.nbytes() / len(ast):>9.1f} bytes/node")
+  print(f"AST parse peak memory   {peak / len(ast):>9.1f} bytes/node")
+  print(f"identical VM code       {engine_writer.getvalue() == ast_writer.getvalue()}")
+
+
+if __name__ == "__main__":
+  main()
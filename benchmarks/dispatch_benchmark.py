@@ -0,0 +1,67 @@
+"""
+Parser dispatch benchmark.
+
+On a large synthetic class, measures how much Python-level work each front end
+does per token:
+- Python function calls per token, counted with cProfile, which doesn't
+  depend on how busy the machine is
+- tokens per second, best of a few runs
+
+for both the CompilationEngine and the JackParser.
+
+Usage:
+python benchmarks/dispatch_benchmark.py [source_bytes]
+"""
+
+
+import cProfile
+import os
+import pstats
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from compilation_engine import CompilationEngine
+from jack_parser import JackParser
+from jack_tokenizer import JackTokenizer
+from synthetic import synthetic_class
+from vm_writer import VMWriter
+
+
+def main():
+  size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+  tokenizer = JackTokenizer(synthetic_class(size))
+  token_count = len(tokenizer.token_values)
+
+  def run_engine():
+    tokenizer.seek(-1)
+    CompilationEngine(tokenizer, VMWriter()).run()
+
+  def run_parser():
+    JackParser(tokenizer).parse()
+
+  print(f"{token_count} tokens")
+  print(f"{'front end':<20} {'calls/token':>12} {'ms':>9} {'tokens/sec':>12}")
+
+  for name, function in (("CompilationEngine", run_engine), ("JackParser", run_parser)):
+    profile = cProfile.Profile()
+    profile.enable()
+    function()
+    profile.disable()
+    calls = pstats.Stats(profile).total_calls
+
+    best = None
+
+    for _ in range(5):
+      start = time.perf_counter()
+      function()
+      elapsed = time.perf_counter() - start
+      best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{name:<20} {calls / token_count:>12.2f} {best * 1000:>9.1f} {token_count / best:>12,.0f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,102 @@
+"""
+VM emulator benchmark.
+
+Compiles each program in memory, runs it to completion in the VM emulator,
+and reports how many VM instructions it executed and how fast:
+- the examples: Seven, ConvertToBin (with a value poked into RAM[8000]),
+  and Square (driven by a scripted keyboard)
+- Fibonacci, a small recursive program that never calls the OS,
+  so it measures the emulator itself rather than the JackOS stand-in
+
+and checks each program's result.
+
+Usage:
+python benchmarks/emulator_benchmark.py [fibonacci_n]
+"""
+
+
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from jack_compiler import compile_many
+from vm_emulator import VMEmulator
+
+
+FIBONACCI = """
+class Main {
+  function void main() {
+    do Output.printInt(Main.fibonacci(%d));
+    return;
+  }
+
+  function int fibonacci(int n) {
+    if (n < 2) {
+      return n;
+    }
+    return Main.fibonacci(n - 1) + Main.fibonacci(n - 2);
+  }
+}
+"""
+
+# Move right, left, down, and up, grow and shrink the square, then quit.
+# Each arrow key is held for a while, with a few idle polls between presses.
+SQUARE_KEYS = (
+  [0] * 20 + [132] * 120 + [0] * 5 + [130] * 60 + [0] * 5 + [133] * 40 + [0] * 5
+  + [131] * 20 + [0] * 5 + [90] * 3 + [0] * 5 + [88] * 3 + [0] * 5 + [81] + [0]
+)
+
+
+def example(name):
+  sources = {}
+
+  for jack_file in glob.glob(os.path.join(ROOT, "examples", name, "*.jack")):
+    with open(jack_file) as file:
+      sources[os.path.basename(jack_file)[:-5]] = file.read()
+
+  return sources
+
+
+def fibonacci(n):
+  return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+
+def main():
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+  value = 12345
+
+  programs = [
+    ("Seven", example("Seven"), {}, (), lambda emulator: emulator.os.text() == "7"),
+    (
+      "ConvertToBin", example("ConvertToBin"), {8000: value}, (),
+      lambda emulator: emulator.ram[8001:8017] == [(value >> bit) & 1 for bit in range(16)]
+    ),
+    ("Square", example("Square"), {}, SQUARE_KEYS, lambda emulator: emulator.halt_reason == "Main.main returned"),
+    (f"Fibonacci({n})", {"Main": FIBONACCI % n}, {}, (), lambda emulator: emulator.os.text() == str(fibonacci(n)))
+  ]
+
+  print(f"{'program':<16} {'instructions':>13} {'calls':>9} {'OS calls':>9} {'ms':>9} {'instrs/sec':>12} {'correct':>8}")
+
+  for name, sources, ram, keys, check in programs:
+    classes = [(class_name, result.instructions) for class_name, result in compile_many(sources).items()]
+
+    emulator = VMEmulator(classes, keys, ram)
+
+    start = time.perf_counter()
+    emulator.run()
+    elapsed = time.perf_counter() - start
+
+    report = emulator.report()
+
+    print(
+      f"{name:<16} {report['instructions']:>13,} {report['calls']:>9,} {sum(report['os_calls'].values()):>9,}"
+      + f" {elapsed * 1000:>9.1f} {report['instructions'] / elapsed:>12,.0f} {str(check(emulator)):>8}"
+    )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,103 @@
+"""
+Expression nesting benchmark.
+
+Compiles expressions nested (or chained) up to 10,000 deep with both front ends:
+- parens: (((1 + 1) + 1) + 1)...
+- unary: ---...-5
+- calls: Main.id(Main.id(...(7)))
+- chain: 1 + 1 + 1 + ... + 1
+
+and reports the time per level, which should stay flat as the depth grows.
+Everything is compiled under a tiny recursion limit, to show that
+the Python stack depth doesn't grow with the nesting depth,
+and each program is run in the VM emulator to check its result.
+Exits with status 1 if any program printed the wrong value.
+The VM code itself is checked by tests/test_deep_expressions.py; this is for timing.
+
+Usage:
+python benchmarks/expression_benchmark.py [max_depth]
+"""
+
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from compile_options import CompileOptions
+from jack_compiler import compile_source
+from vm_emulator import VMEmulator
+
+
+PROGRAM = """
+class Main {
+  function void main() {
+    do Output.printInt(%s);
+    return;
+  }
+
+  function int id(int x) {
+    return x;
+  }
+}
+"""
+
+# Expressions nested depth deep, and the value each one should print.
+SHAPES = {
+  "parens": lambda depth: ("(" * depth + "1" + " + 1)" * depth, depth + 1),
+  "unary": lambda depth: ("-" * depth + "5", -5 if depth % 2 else 5),
+  "calls": lambda depth: ("Main.id(" * depth + "7" + ")" * depth, 7),
+  "chain": lambda depth: (" + ".join(["1"] * depth), depth)
+}
+
+# Well below what recursing once per nesting level would need.
+RECURSION_LIMIT = 200
+
+
+def main():
+  max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+  depths = [depth for depth in (10, 100, 1000, 10_000, 100_000) if depth <= max_depth]
+
+  print(f"{'shape':<8} {'depth':>7} {'front end':>9} {'ms':>9} {'us/level':>9} {'correct':>8}")
+
+  wrong = []
+
+  for shape, build in SHAPES.items():
+    for depth in depths:
+      expression, expected = build(depth)
+      source = PROGRAM % expression
+
+      for frontend in ("engine", "ast"):
+        options = CompileOptions(frontend = frontend)
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(RECURSION_LIMIT)
+
+        try:
+          start = time.perf_counter()
+          result = compile_source(source, options)
+          elapsed = time.perf_counter() - start
+        finally:
+          sys.setrecursionlimit(limit)
+
+        emulator = VMEmulator([("Main", result.instructions)]).run()
+        correct = emulator.os.text() == str(expected)
+
+        if not correct:
+          wrong.append(f"{shape} at depth {depth} with the {frontend} front end printed {emulator.os.text()!r}, not {expected}")
+
+        print(
+          f"{shape:<8} {depth:>7} {frontend:>9} {elapsed * 1000:>9.2f}"
+          + f" {elapsed / depth * 1e6:>9.2f} {str(correct):>8}"
+        )
+
+  for message in wrong:
+    print(message, file = sys.stderr)
+
+  if wrong:
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,241 @@
+"""
+Benchmark harness.
+
+Times each phase of compiling a .jack file:
+- read      reading the source from disk
+- tokenize  lexing it with the JackTokenizer
+- compile   parsing and emitting VM instructions with the CompilationEngine
+            (or JackParser + CodeGenerator, with --frontend ast)
+- serialize turning the VMInstructions into VM code text
+- write     writing the .vm file atomically
+
+on every class in examples/, and on a few generated classes of increasing size.
+Each phase's throughput is reported in source bytes per second.
+
+With --save, the results become the new baseline (benchmarks/baseline.json by default).
+Otherwise, if a baseline exists, the compiler's own phases (tokenize, compile, serialize)
+are checked against it, and the harness exits with status 1 if any of them
+lost more than the tolerance (20% by default) of its throughput.
+The read and write phases are reported too, but they mostly measure the disk
+and the page cache, so they're too noisy to gate on.
+
+Baselines are only comparable on the machine they were recorded on,
+so they aren't checked in.
+
+Usage:
+python benchmarks/harness.py [--save] [--baseline FILE] [--tolerance FRACTION] [--repeat N] [--frontend engine|ast]
+"""
+
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from atomic_file import write_atomically
+from code_generator import CodeGenerator
+from compilation_engine import CompilationEngine
+from jack_compiler import read_jack_file
+from jack_parser import JackParser
+from jack_tokenizer import JackTokenizer
+from synthetic import synthetic_class
+from vm_writer import VMWriter
+
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_TOLERANCE = 0.2
+
+# The phases whose regressions fail the run.
+GATED_PHASES = ("tokenize", "compile", "serialize")
+
+# Sizes of the generated classes, in bytes of source.
+SYNTHETIC_SIZES = (10_000, 100_000, 1_000_000)
+
+# Keep calling a phase until a run takes at least this long,
+# so tiny inputs aren't lost in timer noise.
+MIN_RUN_TIME = 0.05
+
+
+# Return the best time for a single call of function, over `repeat` runs.
+# Like timeit's autorange, each run makes enough calls to take at least MIN_RUN_TIME.
+def measure(function, repeat):
+  number = 1
+
+  while True:
+    start = time.perf_counter()
+    for _ in range(number):
+      function()
+    elapsed = time.perf_counter() - start
+
+    if elapsed >= MIN_RUN_TIME:
+      break
+
+    number *= 10
+
+  best = elapsed / number
+
+  for _ in range(repeat - 1):
+    start = time.perf_counter()
+    for _ in range(number):
+      function()
+    best = min(best, (time.perf_counter() - start) / number)
+
+  return best
+
+
+# Write the benchmark inputs into directory, and return {case name: .jack file}.
+def prepare_cases(directory):
+  cases = {}
+
+  for jack_file in sorted(glob.glob(os.path.join(ROOT, "examples", "*", "*.jack"))):
+    program = os.path.basename(os.path.dirname(jack_file))
+    cases[f"{program}/{os.path.basename(jack_file)}"] = jack_file
+
+  for size in SYNTHETIC_SIZES:
+    jack_file = os.path.join(directory, f"Synthetic{size}.jack")
+
+    with open(jack_file, "w") as file:
+      file.write(synthetic_class(size, f"Synthetic{size}"))
+
+    cases[f"synthetic/{size // 1000}KB"] = jack_file
+
+  return cases
+
+
+# Time every phase of compiling one file.
+# Returns {"bytes": source size, "phases": {phase: {"seconds", "bytes_per_sec"}}}.
+def benchmark_file(jack_file, output_directory, repeat, frontend):
+  source = read_jack_file(jack_file)
+  tokenizer = JackTokenizer(source)
+  vm_file = os.path.join(output_directory, os.path.basename(jack_file)[:-5] + ".vm")
+
+  def compile_source():
+    vm_writer = VMWriter()
+    tokenizer.seek(-1)
+
+    if frontend == "ast":
+      CodeGenerator(JackParser(tokenizer).parse(), tokenizer, vm_writer).run()
+    else:
+      CompilationEngine(tokenizer, vm_writer).run()
+
+    return vm_writer
+
+  vm_writer = compile_source()
+  vm_code = vm_writer.getvalue()
+
+  timings = {
+    "read": measure(lambda: read_jack_file(jack_file), repeat),
+    "tokenize": measure(lambda: JackTokenizer(source), repeat),
+    "compile": measure(compile_source, repeat),
+    "serialize": measure(vm_writer.getvalue, repeat),
+    "write": measure(lambda: write_atomically(vm_file, vm_code), repeat)
+  }
+
+  return {
+    "bytes": len(source),
+    "phases": {
+      phase: {"seconds": seconds, "bytes_per_sec": len(source) / seconds}
+      for phase, seconds in timings.items()
+    }
+  }
+
+
+# Compare results against a baseline.
+# Returns a list of regressions, as (case, phase, baseline rate, current rate).
+def find_regressions(results, baseline, tolerance):
+  regressions = []
+
+  for case, result in results.items():
+    baseline_case = baseline.get(case)
+
+    if baseline_case is None:
+      continue
+
+    for phase in GATED_PHASES:
+      timing = result["phases"][phase]
+      baseline_rate = baseline_case["phases"].get(phase, {}).get("bytes_per_sec")
+
+      if baseline_rate and timing["bytes_per_sec"] < baseline_rate * (1 - tolerance):
+        regressions.append((case, phase, baseline_rate, timing["bytes_per_sec"]))
+
+  return regressions
+
+
+def print_table(results, baseline):
+  print(f"{'case':<28} {'phase':<10} {'ms':>10} {'MB/sec':>10} {'vs baseline':>12}")
+
+  for case, result in results.items():
+    for phase, timing in result["phases"].items():
+      line = f"{case:<28} {phase:<10} {timing['seconds'] * 1000:>10.3f} {timing['bytes_per_sec'] / 1e6:>10.2f}"
+
+      baseline_rate = baseline.get(case, {}).get("phases", {}).get(phase, {}).get("bytes_per_sec")
+      if baseline_rate:
+        line += f" {timing['bytes_per_sec'] / baseline_rate - 1:>+11.1%}"
+
+      print(line)
+
+
+def main():
+  parser = argparse.ArgumentParser(prog = "harness")
+  parser.add_argument("--save", action = "store_true", help = "record the results as the new baseline")
+  parser.add_argument("--baseline", default = DEFAULT_BASELINE, metavar = "FILE", help = "where the baseline is kept")
+  parser.add_argument("--tolerance", type = float, default = DEFAULT_TOLERANCE, metavar = "FRACTION", help = "how much slower a phase may get before it counts as a regression")
+  parser.add_argument("--repeat", type = int, default = 5, metavar = "N", help = "runs per phase; the best one counts")
+  parser.add_argument("--frontend", choices = ["engine", "ast"], default = "engine", help = "which front end to time in the compile phase")
+  args = parser.parse_args()
+
+  baseline = {}
+  if os.path.exists(args.baseline):
+    with open(args.baseline) as file:
+      recorded = json.load(file)
+
+    # A baseline for the other front end tells us nothing about this one.
+    if recorded.get("frontend") == args.frontend:
+      baseline = recorded["cases"]
+
+  with tempfile.TemporaryDirectory() as directory:
+    cases = prepare_cases(directory)
+    results = {
+      case: benchmark_file(jack_file, directory, args.repeat, args.frontend)
+      for case, jack_file in cases.items()
+    }
+
+  print_table(results, baseline)
+
+  if args.save:
+    write_atomically(args.baseline, json.dumps({
+      "frontend": args.frontend,
+      "python": platform.python_version(),
+      "machine": platform.machine(),
+      "cases": results
+    }, indent = 2) + "\n")
+
+    print(f"\nsaved baseline to {args.baseline}")
+    return
+
+  if not baseline:
+    print("\nno baseline to compare against; run with --save to record one")
+    return
+
+  regressions = find_regressions(results, baseline, args.tolerance)
+
+  if regressions:
+    print(f"\n{len(regressions)} regressions beyond {args.tolerance:.0%}:")
+
+    for case, phase, baseline_rate, rate in regressions:
+      print(f"  {case} {phase}: {baseline_rate / 1e6:.2f} -> {rate / 1e6:.2f} MB/sec")
+
+    sys.exit(1)
+
+  print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,73 @@
+"""
+In-memory compilation benchmark.
+
+Compiles a batch of small generated classes three ways:
+- writing each one to a temp file and compiling it with JackCompiler (the old way to embed the compiler)
+- compile_source() on each one (a fresh CompileSession per class)
+- compile_many() on the whole batch (one warm CompileSession)
+
+and checks that all three produce the same VM code.
+
+Usage:
+python benchmarks/in_memory_benchmark.py [snippet_count]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from jack_compiler import JackCompiler, compile_source, compile_many
+from synthetic import synthetic_class
+
+
+def timed(name, count, function):
+  start = time.perf_counter()
+  outputs = function()
+  elapsed = time.perf_counter() - start
+
+  print(f"{name:<28} {elapsed * 1000:>9.1f} ms {count / elapsed:>10,.0f} classes/sec")
+
+  return outputs
+
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+  # Roughly the size of a small test snippet: a couple of subroutines.
+  sources = {f"Snippet{n}": synthetic_class(800, f"Snippet{n}") for n in range(count)}
+
+  def through_files():
+    outputs = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+      for name, source in sources.items():
+        jack_file = os.path.join(directory, f"{name}.jack")
+
+        with open(jack_file, "w") as file:
+          file.write(source)
+
+        JackCompiler(jack_file)
+
+        with open(os.path.join(directory, f"{name}.vm")) as file:
+          outputs[name] = file.read()
+
+    return outputs
+
+  files = timed("temp files + JackCompiler", count, through_files)
+  single = timed("compile_source", count, lambda: {
+    name: compile_source(source, name = name).getvalue() for name, source in sources.items()
+  })
+  batch = timed("compile_many", count, lambda: {
+    name: result.getvalue() for name, result in compile_many(sources).items()
+  })
+
+  print(f"identical VM code            {files == single == batch}")
+
+
+if __name__ == "__main__":
+  main()
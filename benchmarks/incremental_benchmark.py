@@ -0,0 +1,53 @@
+"""
+Incremental build benchmark.
+
+Generates a project of synthetic Jack classes, then times:
+- a full incremental build (empty cache),
+- a no-op rebuild, and
+- a rebuild after touching a single file.
+
+Usage:
+python benchmarks/incremental_benchmark.py [class_count]
+"""
+
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from jack_compiler import JackCompiler
+from synthetic import synthetic_class
+
+
+def build(name, directory):
+  start = time.perf_counter()
+  compiler = JackCompiler(directory, incremental = True)
+  elapsed = time.perf_counter() - start
+
+  compiled = sum(1 for result in compiler.results if not result.skipped)
+  print(f"{name:<20} {elapsed * 1000:>10.1f} ms {compiled:>5} compiled")
+
+
+def main():
+  class_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+  with tempfile.TemporaryDirectory() as directory:
+    for n in range(class_count):
+      with open(os.path.join(directory, f"Class{n}.jack"), "w") as file:
+        file.write(synthetic_class(20_000, f"Class{n}"))
+
+    build("full build", directory)
+    build("no-op rebuild", directory)
+
+    with open(os.path.join(directory, "Class0.jack"), "a") as file:
+      file.write("// edited\n")
+
+    build("one file changed", directory)
+
+
+if __name__ == "__main__":
+  main()
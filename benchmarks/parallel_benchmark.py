@@ -0,0 +1,69 @@
+"""
+Parallel compilation benchmark.
+
+Generates a project of synthetic Jack classes and compiles it with
+1, 2, 4, ... jobs (up to the CPU count), checking that every run
+writes byte-identical .vm files.
+
+Usage:
+python benchmarks/parallel_benchmark.py [class_count] [max_jobs]
+"""
+
+
+import glob
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from jack_compiler import JackCompiler
+from synthetic import synthetic_class
+
+
+def read_outputs(directory):
+  outputs = {}
+
+  for vm_file in sorted(glob.glob(os.path.join(directory, "*.vm"))):
+    with open(vm_file, "rb") as file:
+      outputs[os.path.basename(vm_file)] = file.read()
+
+  return outputs
+
+
+def main():
+  class_count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+
+  max_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+
+  job_counts = [1]
+  while job_counts[-1] * 2 <= max_jobs:
+    job_counts.append(job_counts[-1] * 2)
+
+  with tempfile.TemporaryDirectory() as directory:
+    for n in range(class_count):
+      with open(os.path.join(directory, f"Class{n}.jack"), "w") as file:
+        file.write(synthetic_class(50_000, f"Class{n}"))
+
+    serial_outputs = None
+    serial_time = None
+
+    for jobs in job_counts:
+      start = time.perf_counter()
+      JackCompiler(directory, jobs = jobs)
+      elapsed = time.perf_counter() - start
+
+      outputs = read_outputs(directory)
+
+      if serial_outputs is None:
+        serial_outputs = outputs
+        serial_time = elapsed
+
+      identical = "identical" if outputs == serial_outputs else "DIFFERENT"
+      print(f"{jobs:>3} jobs {elapsed * 1000:>10.1f} ms {serial_time / elapsed:>6.2f}x  output {identical}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,77 @@
+"""
+Source reader benchmark.
+
+Compares the old front end (concatenating the file line by line, then running
+three whole-buffer re.sub passes to strip comments and newlines) with reading
+the file once and letting JackTokenizer skip comments itself.
+
+Reports wall time and peak memory for each on a large synthetic class.
+
+Usage:
+python benchmarks/reader_benchmark.py
+"""
+
+
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from jack_tokenizer import JackTokenizer
+from synthetic import synthetic_class
+
+
+# The front end as it used to be in JackCompiler.
+def legacy_front_end(jack_file):
+  jack_input = ""
+
+  with open(jack_file) as file:
+    for line in file.readlines():
+      line = re.sub(r"//(.*)", "", line)
+      jack_input += re.sub(r"/\*\*?(.*)\*/", "", line)
+
+  jack_input = re.sub("\n", "", jack_input)
+  jack_input = re.sub(r"/\*\*?(.*?)\*/", "", jack_input)
+
+  return JackTokenizer(jack_input)
+
+
+def streaming_front_end(jack_file):
+  with open(jack_file) as file:
+    return JackTokenizer(file.read())
+
+
+def run(name, front_end, jack_file):
+  # Time it first without tracemalloc, which slows everything down...
+  start = time.perf_counter()
+  tokenizer = front_end(jack_file)
+  elapsed = time.perf_counter() - start
+  del tokenizer
+
+  # ...then run it again just to measure peak memory.
+  tracemalloc.start()
+  tokenizer = front_end(jack_file)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  print(f"{name:<12} {elapsed * 1000:>10.1f} ms {peak / 1_000_000:>10.1f} MB peak {len(tokenizer.token_values):>9} tokens")
+
+
+def main():
+  with tempfile.TemporaryDirectory() as directory:
+    jack_file = os.path.join(directory, "Synthetic.jack")
+
+    with open(jack_file, "w") as file:
+      file.write(synthetic_class(2_000_000))
+
+    run("legacy", legacy_front_end, jack_file)
+    run("streaming", streaming_front_end, jack_file)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,73 @@
+"""
+SymbolTable lookup microbenchmark.
+
+Compares resolving variable references the old way
+(has_name() on each table, then kind_of() and index_of())
+with a single chained resolve() that returns a Symbol record.
+
+Usage:
+python benchmarks/symbol_table_benchmark.py
+"""
+
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from symbol_table import SymbolTable
+
+
+LOOKUPS = 1_000_000
+
+
+def build_tables():
+  class_symbol_table = SymbolTable()
+  subroutine_symbol_table = SymbolTable(parent = class_symbol_table)
+
+  for n in range(8):
+    class_symbol_table.define(f"field{n}", "int", "field")
+    subroutine_symbol_table.define(f"local{n}", "int", "local")
+
+  return class_symbol_table, subroutine_symbol_table
+
+
+# The lookups CompilationEngine used to do for every variable reference.
+def lookup_old(class_symbol_table, subroutine_symbol_table, name):
+  if subroutine_symbol_table.has_name(name):
+    return subroutine_symbol_table.kind_of(name), subroutine_symbol_table.index_of(name)
+
+  if class_symbol_table.has_name(name):
+    kind = class_symbol_table.kind_of(name)
+    kind = "this" if kind == "field" else kind
+
+    return kind, class_symbol_table.index_of(name)
+
+
+def lookup_new(class_symbol_table, subroutine_symbol_table, name):
+  symbol = subroutine_symbol_table.resolve(name)
+
+  return symbol.segment, symbol.index
+
+
+def run(name, lookup):
+  class_symbol_table, subroutine_symbol_table = build_tables()
+  names = ["local3", "field5"] * (LOOKUPS // 2)
+
+  start = time.perf_counter()
+  for variable in names:
+    lookup(class_symbol_table, subroutine_symbol_table, variable)
+  elapsed = time.perf_counter() - start
+
+  print(f"{name:<32} {LOOKUPS / elapsed:>14,.0f} lookups/sec")
+
+
+def main():
+  run("has_name + kind_of + index_of", lookup_old)
+  run("resolve", lookup_new)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,45 @@
+"""
+Synthetic Jack sources for benchmarks.
+
+The generated code only uses the subset of Jack that the compiler handles today,
+so the same sources can be pushed through every phase of the compiler.
+"""
+
+
+SUBROUTINE_TEMPLATE = """
+   /** Synthetic subroutine number {n}. */
+   method int step{n}(int a, int b) {{
+      var int total, count;
+      let total = a + b;
+      let count = 0;
+      while (count < {n}) {{
+         if (~(total > 1000)) {{
+            let total = total + count;
+         }}
+         else {{
+            let total = total - {n};
+         }}
+         let count = count + 1;
+      }}
+      do Output.printInt(total * 2);
+      return total;
+   }}
+"""
+
+
+# Build a single Jack class whose source is at least `target_bytes` long.
+def synthetic_class(target_bytes = 1_000_000, class_name = "Synthetic"):
+  parts = [f"class {class_name} {{\n   field int x, y;\n"]
+  size = len(parts[0])
+  n = 0
+
+  while size < target_bytes:
+    subroutine = SUBROUTINE_TEMPLATE.format(n = n)
+    parts.append(subroutine)
+    size += len(subroutine)
+    n += 1
+
+  parts.append("}\n")
+
+  return "".join(parts)
+
@@ -0,0 +1,52 @@
+"""
+Tokenizer throughput benchmark.
+
+Measures how many tokens/sec JackTokenizer produces on the examples/ corpus
+and on a synthetic ~1 MB Jack class.
+
+Usage:
+python benchmarks/tokenizer_benchmark.py
+"""
+
+
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from jack_tokenizer import JackTokenizer
+from synthetic import synthetic_class
+
+
+# Tokenize the given source and return the number of tokens produced.
+# The tokenizer lexes the whole input up front, so constructing it is the work we're timing.
+def count_tokens(source):
+  return len(JackTokenizer(source).token_values)
+
+
+def run(name, source, repeat = 3):
+  best = None
+
+  for _ in range(repeat):
+    start = time.perf_counter()
+    count = count_tokens(source)
+    elapsed = time.perf_counter() - start
+
+    best = elapsed if best is None else min(best, elapsed)
+
+  print(f"{name:<36} {len(source):>10} bytes {count:>9} tokens {count / best:>12,.0f} tokens/sec")
+
+
+def main():
+  for jack_file in sorted(glob.glob(os.path.join(ROOT, "examples", "*", "*.jack"))):
+    with open(jack_file) as file:
+      run(os.path.relpath(jack_file, ROOT), file.read())
+
+  run("synthetic (1 MB)", synthetic_class(1_000_000))
+
+
+if __name__ == "__main__":
+  main()
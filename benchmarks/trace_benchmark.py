@@ -0,0 +1,78 @@
+"""
+Tracing overhead benchmark.
+
+Compiles a synthetic Jack class with:
+- the old per-token "PROCESSED TOKEN" printing (sent to /dev/null),
+- tracing disabled,
+- tracing to an in-memory ring buffer, and
+- tracing to a file.
+
+Usage:
+python benchmarks/trace_benchmark.py
+"""
+
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from compilation_engine import CompilationEngine
+from jack_tokenizer import JackTokenizer
+from synthetic import synthetic_class
+from tracer import Tracer, DEFAULT_RING_SIZE
+from vm_writer import VMWriter
+
+
+# A tokenizer that prints every token, the way advance() used to.
+class PrintingTokenizer(JackTokenizer):
+  def advance(self):
+    super().advance()
+    print('PROCESSED TOKEN: ', self.current_token)
+
+
+def compile_once(source, jack_file, tokenizer_class, tracer):
+  tokenizer = tokenizer_class(source, tracer)
+  vm_writer = VMWriter(jack_file, tracer)
+  CompilationEngine(tokenizer, vm_writer, tracer).run()
+  vm_writer.close()
+
+
+def run(name, source, jack_file, tokenizer_class, make_tracer, repeat = 3):
+  best = None
+
+  for _ in range(repeat):
+    tracer = make_tracer()
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+      start = time.perf_counter()
+      compile_once(source, jack_file, tokenizer_class, tracer)
+      elapsed = time.perf_counter() - start
+
+    # Only the file tracer needs closing; the others would just print their counters.
+    if tracer.path:
+      tracer.close()
+    best = elapsed if best is None else min(best, elapsed)
+
+  print(f"{name:<28} {best * 1000:>10.1f} ms")
+
+
+def main():
+  source = synthetic_class(200_000)
+
+  with tempfile.TemporaryDirectory() as directory:
+    jack_file = os.path.join(directory, "Synthetic.jack")
+    trace_file = os.path.join(directory, "trace.txt")
+
+    run("print every token (before)", source, jack_file, PrintingTokenizer, Tracer)
+    run("tracing off", source, jack_file, JackTokenizer, Tracer)
+    run("tracing to ring buffer", source, jack_file, JackTokenizer, lambda: Tracer(ring_size = DEFAULT_RING_SIZE))
+    run("tracing to file", source, jack_file, JackTokenizer, lambda: Tracer(path = trace_file))
+
+
+if __name__ == "__main__":
+  main()
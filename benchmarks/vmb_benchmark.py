@@ -0,0 +1,87 @@
+"""
+Binary VM format benchmark.
+
+Compiles a large synthetic class and the examples, then compares
+.vm text against .vmb binary for:
+- size on disk
+- loading time (parse() of the text vs decode() of the binary)
+- writing time (serialize() vs encode())
+
+and checks that every class survives a round trip through .vmb unchanged.
+
+Usage:
+python benchmarks/vmb_benchmark.py
+"""
+
+
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import vm_binary
+from jack_compiler import compile_many
+from synthetic import synthetic_class
+from vm_instruction import parse, serialize
+
+
+def best_of(repeat, function):
+  best = None
+
+  for _ in range(repeat):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+
+  return best, result
+
+
+# Describe how the binary time compares to the text time, either way round.
+def compared(text_time, binary_time):
+  if binary_time <= text_time:
+    return f"{text_time / binary_time:.1f}x faster"
+
+  return f"{binary_time / text_time:.1f}x slower"
+
+
+def main():
+  sources = {"Synthetic": synthetic_class(1_000_000)}
+
+  for jack_file in sorted(glob.glob(os.path.join(ROOT, "examples", "*", "*.jack"))):
+    with open(jack_file) as file:
+      sources[os.path.basename(os.path.dirname(jack_file)) + "." + os.path.basename(jack_file)[:-5]] = file.read()
+
+  results = compile_many(sources)
+
+  print(f"{'class':<26} {'.vm bytes':>10} {'.vmb bytes':>10} {'ratio':>6} {'round trip':>11}")
+
+  for name, result in results.items():
+    text = result.getvalue()
+    data = vm_binary.encode(result.instructions)
+    lossless = vm_binary.binary_to_text(data) == text and vm_binary.text_to_binary(text) == data
+
+    print(f"{name:<26} {len(text):>10} {len(data):>10} {len(text) / len(data):>6.1f} {str(lossless):>11}")
+
+  instructions = results["Synthetic"].instructions
+  text = serialize(instructions)
+  data = vm_binary.encode(instructions)
+
+  parse_time, _ = best_of(5, lambda: parse(text))
+  decode_time, _ = best_of(5, lambda: vm_binary.decode(data))
+  serialize_time, _ = best_of(5, lambda: serialize(instructions))
+  encode_time, _ = best_of(5, lambda: vm_binary.encode(instructions))
+
+  print()
+  print(f"{len(instructions)} instructions in the synthetic class")
+  print(f"load  .vm  (parse)     {parse_time * 1000:>9.1f} ms")
+  print(f"load  .vmb (decode)    {decode_time * 1000:>9.1f} ms   {compared(parse_time, decode_time)}")
+  print(f"write .vm  (serialize) {serialize_time * 1000:>9.1f} ms")
+  print(f"write .vmb (encode)    {encode_time * 1000:>9.1f} ms   {compared(serialize_time, encode_time)}")
+
+
+if __name__ == "__main__":
+  main()
@@ -4,22 +4,181 @@
 
 """
 EXPECTED COMMAND:
-JackCompiler input
+JackCompiler input [-O] [--frontend engine|ast] [--intern-strings] [--tree-shake] [--inline | --inline-budget N] [--backend vm|vmb|asm] [--profile | --profile-json FILE] [--profile-subroutines] [--trace | --trace-file FILE] [-j N] [--incremental] [--watch] [--run [--keys KEYS] [--poke ADDRESS=VALUE]]
 
 input - fileName.jack or directory of .jack files
 output - fileName.vm or directory of .jack and .vm files
+
+-O - fold constant expressions, replace multiplication by constants with additions,
+     and run the peephole optimizer over the generated VM code.
+     Reports what each pass saved in each class.
+--frontend - "engine" (the default) compiles in a single pass;
+             "ast" parses each class into a syntax tree first, then generates code from it.
+             Both produce the same VM code.
+--intern-strings - build each distinct string constant in a class only once,
+                   the first time it's used, and reuse it from a hidden static after that.
+                   Reports how many literals were pooled and how many String calls that saves.
+                   Pooled strings are shared, so code that modifies a string constant
+                   shouldn't use this.
+--tree-shake - compile the whole program first, then leave out every subroutine
+               that Main.main (or Sys.init) can never call.
+               Reports the subroutines, instructions, and bytes removed from each class.
+               Every file is recompiled, even with --incremental, and it can't be used with --watch.
+--inline - paste small subroutines straight into their callers, across the whole program,
+           wherever the pasted code is at most 12 VM instructions and cheaper than the call.
+           With either --inline or --inline-budget, like --tree-shake, every file is recompiled,
+           and it can't be used with --watch.
+--inline-budget - the same, with a budget of N VM instructions instead of 12.
+                  Bigger budgets save more calls but make bigger code.
+--backend - "vm" (the default) writes a .vm file for each class;
+            "vmb" writes each class as compact binary VM code, in a .vmb file;
+            "asm" translates the whole program straight into a single Hack .asm file,
+            named after the input, with no separate VM translator needed.
+            Any other .vm or .vmb files next to the .jack files (such as the OS's) are included.
+            Like --tree-shake, every file is recompiled, and it can't be used with --watch.
+--profile - time every phase of every file (wall clock and CPU),
+            and print a table of the slowest files with their token and instruction counts.
+--profile-json - the same, and also write the full report to FILE as JSON.
+--profile-subroutines - with --profile, also time each subroutine, and list the slowest.
+--trace - trace the compiler's phases to an in-memory ring buffer,
+          which is printed if the compile fails.
+--trace-file - trace the compiler's phases to FILE instead.
+          The JACK_TRACE environment variable does the same as either one.
+-j, --jobs - compile up to N files at once (0 = one per CPU).
+--incremental - skip files whose source and .vm output haven't changed
+                since the last incremental build.
+--watch - keep running, and recompile each .jack file as soon as it's saved.
+--run - once the program is compiled, run it in the built-in VM emulator,
+        with a minimal Python stand-in for any OS classes it doesn't bring itself.
+        Reports the VM instructions, calls, and estimated Hack cycles it executed,
+        in total and for its busiest functions, along with anything it printed.
+        Can't be used with --backend asm or --watch.
+--keys - with --run, a comma-separated script of key codes for Keyboard.keyPressed
+         to return, one per call (0 = no key). The program stops when the script runs out.
+--poke - with --run, set RAM[ADDRESS] to VALUE before the program starts. Can be repeated.
 """
 
 
+import argparse
+import os
 import sys
 
-from jack_compiler import JackCompiler
+from compile_options import CompileOptions
+from inliner import DEFAULT_BUDGET
+from profiler import Profiler, format_report, write_report
+from jack_compiler import JackCompiler, CompilationError, read_library_classes
+from tracer import Tracer
+from vm_emulator import VMEmulator, format_report as format_run_report
+from watcher import Watcher, DEFAULT_INTERVAL
 
 
 def main():
-  jack_input = sys.argv[1]
+  parser = argparse.ArgumentParser(prog = "JackCompiler")
+  parser.add_argument("input", help = "a .jack file or a directory of .jack files")
+  parser.add_argument("-O", "--optimize", action = "store_true", help = "optimize the generated VM code")
+  parser.add_argument("--frontend", choices = ["engine", "ast"], default = "engine", help = "single-pass engine, or parse to an AST first")
+  parser.add_argument("--intern-strings", action = "store_true", help = "build each distinct string constant once and reuse it")
+  parser.add_argument("--tree-shake", action = "store_true", help = "leave out subroutines the program never calls")
+  parser.add_argument("--inline", action = "store_const", const = DEFAULT_BUDGET, default = 0, help = f"inline small subroutines (up to {DEFAULT_BUDGET} VM instructions)")
+  parser.add_argument("--inline-budget", type = int, dest = "inline", metavar = "N", help = "inline subroutines of up to N VM instructions")
+  parser.add_argument("--backend", choices = ["vm", "vmb", "asm"], default = "vm", help = "write a .vm or .vmb file per class, or one Hack .asm file")
+  parser.add_argument("--profile", action = "store_const", const = "", help = "time each phase of each file")
+  parser.add_argument("--profile-json", dest = "profile", metavar = "FILE", help = "like --profile, and write a JSON report to FILE")
+  parser.add_argument("--profile-subroutines", action = "store_true", help = "with --profile, also time each subroutine")
+  parser.add_argument("--trace", action = "store_const", const = "", help = "trace compiler phases to a ring buffer")
+  parser.add_argument("--trace-file", dest = "trace", metavar = "FILE", help = "trace compiler phases to FILE")
+  parser.add_argument("-j", "--jobs", type = int, default = 1, metavar = "N", help = "compile up to N files in parallel (0 = one per CPU)")
+  parser.add_argument("--incremental", action = "store_true", help = "skip files that haven't changed since the last build")
+  parser.add_argument("--watch", action = "store_true", help = "keep running and recompile files as they change")
+  parser.add_argument("--interval", type = float, default = DEFAULT_INTERVAL, metavar = "SECONDS", help = "how often --watch polls for changes")
+  parser.add_argument("--run", action = "store_true", help = "run the compiled program in the VM emulator and report what it executed")
+  parser.add_argument("--keys", default = "", metavar = "KEYS", help = "with --run, comma-separated key codes for Keyboard.keyPressed to return")
+  parser.add_argument("--poke", action = "append", default = [], metavar = "ADDRESS=VALUE", help = "with --run, set a RAM address before the program starts")
+  args = parser.parse_args()
+
+  # The watcher recompiles one file at a time, but inlining and tree shaking need the whole program.
+  if args.watch and (args.tree_shake or args.inline or args.backend == "asm"):
+    parser.error("--tree-shake, --inline, and --backend asm can't be used with --watch")
+
+  if args.watch and args.profile is not None:
+    parser.error("--profile can't be used with --watch")
+
+  if args.run and (args.watch or args.backend == "asm"):
+    parser.error("--run can't be used with --watch or --backend asm")
+
+  tracer = Tracer.from_settings(args.trace)
+  options = CompileOptions(optimize = args.optimize, frontend = args.frontend, intern_strings = args.intern_strings, tree_shake = args.tree_shake, inline_budget = args.inline, backend = args.backend)
+
+  if args.watch:
+    return watch(args, tracer, options)
+
+  profiler = Profiler(subroutines = args.profile_subroutines) if args.profile is not None else None
+
+  try:
+    compiler = JackCompiler(args.input, tracer, jobs = args.jobs, incremental = args.incremental, options = options, profiler = profiler)
+  except CompilationError as error:
+    # Show the most recent events leading up to the failure.
+    tracer.dump()
+
+    for result in error.failures:
+      print(f"{result.jack_file}: {result.error}", file = sys.stderr)
+
+    sys.exit(1)
+  finally:
+    tracer.close()
+
+  report(compiler.results)
+
+  if profiler:
+    profile(profiler, compiler.results, args.profile)
+
+  if args.run:
+    run(args)
+
+
+# Print any notes the optimization passes left for each compiled file.
+def report(results):
+  for result in results:
+    for note in result.notes:
+      print(f"{result.jack_file}: {note}")
+
+
+# Print the profiler's table, and write its JSON report if we were given a file.
+def profile(profiler, results, path):
+  profile_report = profiler.report(results)
+
+  print(format_report(profile_report))
+
+  if path:
+    write_report(path, profile_report)
+
+
+# Run every class in the input's directory (the OS's too, if it's there) in the VM emulator.
+def run(args):
+  directory = args.input if os.path.isdir(args.input) else os.path.dirname(args.input)
+  keys = [int(key) for key in args.keys.split(",") if key.strip()]
+  ram = {}
+
+  for poke in args.poke:
+    address, _, value = poke.partition("=")
+    ram[int(address)] = int(value)
+
+  try:
+    emulator = VMEmulator(read_library_classes(directory, ()), keys, ram)
+  except AssertionError as error:
+    print(f"{args.input}: {error}", file = sys.stderr)
+    sys.exit(1)
+
+  print(format_run_report(emulator.run().report()))
+
+
+def watch(args, tracer, options):
+  watcher = Watcher(args.input, tracer, options, interval = args.interval)
 
-  JackCompiler(jack_input)
+  try:
+    watcher.run()
+  finally:
+    tracer.close()
 
 
 if __name__ == "__main__":
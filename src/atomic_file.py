@@ -0,0 +1,36 @@
+"""
+Atomic file writes.
+
+Write to a temp file in the same directory, then os.replace() it over the target.
+Readers only ever see the old file or the complete new one, never a torn write.
+"""
+
+
+import os
+import tempfile
+
+
+# Read the process umask without changing it for good.
+def current_umask():
+  umask = os.umask(0)
+  os.umask(umask)
+
+  return umask
+
+
+# Write text (or bytes) to path atomically.
+def write_atomically(path, text):
+  directory = os.path.dirname(path) or "."
+  fd, temp_path = tempfile.mkstemp(dir = directory, prefix = os.path.basename(path), suffix = ".tmp")
+
+  try:
+    # mkstemp() creates files readable only by us; give the result normal permissions.
+    os.chmod(temp_path, 0o666 & ~current_umask())
+
+    with os.fdopen(fd, "wb" if isinstance(text, bytes) else "w") as file:
+      file.write(text)
+
+    os.replace(temp_path, path)
+  except BaseException:
+    os.unlink(temp_path)
+    raise
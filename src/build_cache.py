@@ -0,0 +1,145 @@
+"""
+BuildCache
+
+Remember which .jack files have already been compiled, so unchanged files can be skipped.
+
+The cache is a JSON manifest that sits next to the .vm outputs.
+For each .jack file, it stores:
+- the source's size, mtime, and SHA-256 hash
+- the output's size, mtime, and SHA-256 hash
+
+The manifest as a whole is stamped with a fingerprint of the compiler itself
+(a hash of its source code, plus any options that change its output).
+If the fingerprint changes, every entry is thrown away.
+
+A file is considered fresh if its source and output both still match the manifest.
+The cheap check is size + mtime; only if those differ do we fall back to hashing,
+so a no-op rebuild only costs a couple of stat() calls per file.
+
+Deleting the manifest (or passing a corrupt one) simply forces a full rebuild.
+"""
+
+
+import glob
+import hashlib
+import json
+import os
+
+from atomic_file import write_atomically
+
+
+MANIFEST_NAME = ".jack_build_manifest.json"
+
+MANIFEST_VERSION = 1
+
+
+# Hash the compiler's own source code, plus any output-affecting options.
+# Any change to the compiler invalidates every cached build.
+def compiler_fingerprint(options = ""):
+  digest = hashlib.sha256()
+
+  for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+    with open(path, "rb") as file:
+      digest.update(file.read())
+
+  digest.update(options.encode())
+
+  return digest.hexdigest()
+
+
+def hash_file(path):
+  with open(path, "rb") as file:
+    return hashlib.sha256(file.read()).hexdigest()
+
+
+class BuildCache:
+  def __init__(self, directory, fingerprint):
+    self.path = os.path.join(directory, MANIFEST_NAME)
+    self.fingerprint = fingerprint
+    self.entries = self.load()
+
+
+  # Load the manifest, ignoring it entirely if it's missing, corrupt, or stale.
+  def load(self):
+    try:
+      with open(self.path) as file:
+        manifest = json.load(file)
+    except (OSError, ValueError):
+      return {}
+
+    if not isinstance(manifest, dict):
+      return {}
+
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("fingerprint") != self.fingerprint:
+      return {}
+
+    entries = manifest.get("files")
+
+    return entries if isinstance(entries, dict) else {}
+
+
+  # Determine whether a .jack file's existing .vm output can be reused.
+  def is_fresh(self, jack_file, vm_file):
+    entry = self.entries.get(os.path.basename(jack_file))
+
+    if entry is None:
+      return False
+
+    try:
+      return self.matches(jack_file, entry["source"]) and self.matches(vm_file, entry["output"])
+    except (OSError, KeyError, TypeError):
+      return False
+
+
+  # Compare a file on disk against a stored {size, mtime, hash} record.
+  # If the file was only touched, refresh the record's mtime so we don't hash it again.
+  def matches(self, path, record):
+    stat = os.stat(path)
+
+    if stat.st_size != record["size"]:
+      return False
+
+    if stat.st_mtime_ns == record["mtime"]:
+      return True
+
+    if hash_file(path) != record["hash"]:
+      return False
+
+    record["mtime"] = stat.st_mtime_ns
+
+    return True
+
+
+  # Remember a freshly-compiled file and its output.
+  def record(self, jack_file, vm_file):
+    self.entries[os.path.basename(jack_file)] = {
+      "source": self.describe(jack_file),
+      "output": self.describe(vm_file)
+    }
+
+
+  # Forget a file, e.g. because it failed to compile.
+  def forget(self, jack_file):
+    self.entries.pop(os.path.basename(jack_file), None)
+
+
+  def describe(self, path):
+    stat = os.stat(path)
+
+    return {
+      "size": stat.st_size,
+      "mtime": stat.st_mtime_ns,
+      "hash": hash_file(path)
+    }
+
+
+  # Write the manifest atomically.
+  # A crash mid-write leaves the old manifest (or none) in place, never a torn one.
+  def save(self):
+    manifest = {
+      "version": MANIFEST_VERSION,
+      "fingerprint": self.fingerprint,
+      "files": self.entries
+    }
+
+    write_atomically(self.path, json.dumps(manifest, indent = 2, sort_keys = True))
@@ -0,0 +1,357 @@
+"""
+CodeGenerator
+
+Walk a FlatAST (built by JackParser) and write its VM code through a VMWriter.
+
+This is the second half of the AST front end.
+It makes exactly the same decisions as the CompilationEngine, in the same order,
+so both front ends produce identical VM code.
+"""
+
+
+from jack_ast import (
+  CLASS_VAR_DEC,
+  SUBROUTINE,
+  LET,
+  IF,
+  WHILE,
+  DO,
+  RETURN,
+  BINARY,
+  UNARY,
+  INT_CONSTANT,
+  STRING_CONSTANT,
+  KEYWORD_CONSTANT,
+  VARIABLE,
+  ARRAY_ACCESS,
+  CALL
+)
+from jack_grammar import ZERO_CONSTANTS
+from string_pool import StringPool
+from symbol_table import SymbolTable
+from tracer import Tracer
+
+
+class CodeGenerator:
+  def __init__(self, ast, tokenizer, vm_writer, tracer = None, intern_strings = False):
+    self.ast = ast
+    self.values = tokenizer.token_values
+    self.vm_writer = vm_writer
+    self.tracer = tracer or Tracer()
+
+    # Node columns, pulled out for quicker access.
+    self.kinds = ast.kinds
+    self.tokens = ast.tokens
+
+    self.class_symbol_table = SymbolTable()
+    self.subroutine_symbol_table = SymbolTable(parent = self.class_symbol_table)
+
+    self.string_pool = StringPool(self.class_symbol_table, vm_writer) if intern_strings else None
+
+    self.if_counter = 0
+    self.while_counter = 0
+
+    self.current_class_name = None
+    self.subroutine_type = None
+
+
+  def run(self):
+    self.generate_class(self.ast.root)
+
+
+  # Return the text of a node's token.
+  def text(self, node):
+    return self.values[self.tokens[node]]
+
+
+  ###################################################
+  # DECLARATIONS
+  ###################################################
+
+
+  def generate_class(self, node):
+    self.current_class_name = self.text(node)
+    self.class_symbol_table.reset()
+
+    if self.string_pool:
+      self.string_pool.reset()
+
+    for child in self.ast.children(node):
+      if self.kinds[child] == CLASS_VAR_DEC:
+        self.define_variables(self.class_symbol_table, child, self.text(child))
+      elif self.kinds[child] == SUBROUTINE:
+        self.generate_subroutine(child)
+
+    if self.string_pool:
+      self.string_pool.finish_class(self.current_class_name)
+
+    if self.tracer.enabled:
+      self.tracer.event("compile", f"class {self.current_class_name}")
+
+
+  # Add every name in a CLASS_VAR_DEC or VAR_DEC node to a symbol table.
+  # Returns the number of names defined.
+  def define_variables(self, symbol_table, node, kind):
+    typ, *names = self.ast.children(node)
+
+    for name in names:
+      symbol_table.define(self.text(name), self.text(typ), kind)
+
+    return len(names)
+
+
+  def generate_subroutine(self, node):
+    self.subroutine_symbol_table.reset()
+    self.subroutine_type = self.text(node)
+
+    return_type, name, parameter_list, *body = self.ast.children(node)
+    statements = body.pop()
+
+    # Just like the CompilationEngine, a method's implicit "this" argument
+    # is recorded with the subroutine's return type.
+    if self.subroutine_type == "method":
+      self.subroutine_symbol_table.define("this", self.text(return_type), "argument")
+
+    parameters = self.ast.children(parameter_list)
+
+    for typ, parameter in zip(parameters[0::2], parameters[1::2]):
+      self.subroutine_symbol_table.define(self.text(parameter), self.text(typ), "argument")
+
+    local_count = 0
+
+    for var_dec in body:
+      local_count += self.define_variables(self.subroutine_symbol_table, var_dec, "local")
+
+    full_name = f"{self.current_class_name}.{self.text(name)}"
+    self.vm_writer.write_function(full_name, local_count)
+
+    if self.tracer.enabled:
+      self.tracer.event("compile", f"{self.subroutine_type} {full_name}")
+
+    if self.string_pool:
+      self.string_pool.start_subroutine()
+
+    if self.subroutine_type == "constructor":
+      self.vm_writer.write_push("constant", self.class_symbol_table.var_count("field"))
+      self.vm_writer.write_call("Memory.alloc", 1)
+      self.vm_writer.write_pop("pointer", 0)
+    elif self.subroutine_type == "method":
+      self.vm_writer.write_push("argument", 0)
+      self.vm_writer.write_pop("pointer", 0)
+
+    self.generate_statements(statements)
+
+    if self.string_pool:
+      self.string_pool.finish_subroutine(self.current_class_name)
+
+
+  ###################################################
+  # STATEMENTS
+  ###################################################
+
+
+  def generate_statements(self, node):
+    for statement in self.ast.children(node):
+      kind = self.kinds[statement]
+
+      if kind == LET:
+        self.generate_let(statement)
+      elif kind == IF:
+        self.generate_if(statement)
+      elif kind == WHILE:
+        self.generate_while(statement)
+      elif kind == DO:
+        self.generate_call(self.ast.first_children[statement])
+        self.vm_writer.write_pop("temp", 0)
+      elif kind == RETURN:
+        self.generate_return(statement)
+
+
+  def generate_let(self, node):
+    self.generate_expression(self.ast.first_children[node])
+
+    name = self.text(node)
+    symbol = self.subroutine_symbol_table.resolve(name)
+
+    if symbol is None:
+      raise AssertionError(f"Undeclared variable found: {name}")
+
+    self.vm_writer.write_pop(symbol.segment, symbol.index)
+
+
+  def generate_if(self, node):
+    self.if_counter += 1
+
+    label_1 = f"IF_STATEMENT_{self.if_counter}_A"
+    label_2 = f"IF_STATEMENT_{self.if_counter}_B"
+
+    condition, statements, *else_statements = self.ast.children(node)
+
+    self.generate_expression(condition)
+    self.vm_writer.write_command("not")
+    self.vm_writer.write_if(label_1)
+
+    self.generate_statements(statements)
+
+    self.vm_writer.write_goto(label_2)
+    self.vm_writer.write_label(label_1)
+
+    if else_statements:
+      self.generate_statements(else_statements[0])
+
+    self.vm_writer.write_label(label_2)
+
+
+  def generate_while(self, node):
+    self.while_counter += 1
+
+    label_1 = f"WHILE_STATEMENT_{self.while_counter}_A"
+    label_2 = f"WHILE_STATEMENT_{self.while_counter}_B"
+
+    condition, statements = self.ast.children(node)
+
+    self.vm_writer.write_label(label_1)
+
+    self.generate_expression(condition)
+    self.vm_writer.write_command("not")
+    self.vm_writer.write_if(label_2)
+
+    self.generate_statements(statements)
+
+    self.vm_writer.write_goto(label_1)
+    self.vm_writer.write_label(label_2)
+
+
+  def generate_return(self, node):
+    expression = self.ast.first_children[node]
+
+    if expression == -1:
+      self.vm_writer.write_push("constant", 0)
+    else:
+      self.generate_expression(expression)
+
+    self.vm_writer.write_return()
+
+
+  ###################################################
+  # EXPRESSIONS
+  ###################################################
+
+
+  # Generate the code for an expression.
+  #
+  # Expressions can nest thousands deep in machine-written Jack
+  # (and a long operator chain is a deep tree of BINARY nodes on its left side),
+  # so rather than recursing into each subexpression, we walk the tree with an explicit stack.
+  # Each entry is either a node to generate, or a (write method, *arguments) tuple
+  # that finishes off a node once everything it contains has been generated.
+  def generate_expression(self, node):
+    kinds = self.kinds
+    first_children = self.ast.first_children
+    next_siblings = self.ast.next_siblings
+    vm_writer = self.vm_writer
+    stack = [node]
+
+    while stack:
+      node = stack.pop()
+
+      if type(node) is tuple:
+        node[0](*node[1:])
+        continue
+
+      kind = kinds[node]
+
+      # Children go on the stack last-first, so they're generated first-last.
+      if kind == BINARY:
+        left = first_children[node]
+        stack.append((vm_writer.write_binary_op, self.text(node)))
+        stack.append(next_siblings[left])
+        stack.append(left)
+
+      elif kind == UNARY:
+        stack.append((vm_writer.write_unary_op, self.text(node)))
+        stack.append(first_children[node])
+
+      elif kind == INT_CONSTANT:
+        vm_writer.write_push("constant", int(self.text(node)))
+
+      elif kind == KEYWORD_CONSTANT:
+        keyword = self.text(node)
+
+        if keyword in ZERO_CONSTANTS:
+          vm_writer.write_push("constant", 0)
+        elif keyword == "true":
+          vm_writer.write_push("constant", 1)
+          vm_writer.write_command("neg")
+        else:
+          vm_writer.write_push("pointer", 0)
+
+      elif kind == VARIABLE:
+        name = self.text(node)
+        symbol = self.subroutine_symbol_table.resolve(name)
+
+        if symbol is None:
+          raise AssertionError(f"Unknown identifier: {name}")
+
+        vm_writer.write_push(symbol.segment, symbol.index)
+
+      elif kind == CALL:
+        name, arg_count, prefixed, expressions = self.start_call(node)
+        stack.append((self.finish_call, name, arg_count + len(expressions), prefixed))
+        stack.extend(reversed(expressions))
+
+      elif kind == ARRAY_ACCESS:
+        # Array access isn't supported yet; like the CompilationEngine,
+        # we only evaluate the index expression.
+        stack.append(first_children[node])
+
+      elif kind == STRING_CONSTANT:
+        string = self.text(node)[1:-1]
+
+        if self.string_pool:
+          self.string_pool.write_string(string)
+        else:
+          vm_writer.write_string(string)
+
+
+  def generate_call(self, node):
+    name, arg_count, prefixed, expressions = self.start_call(node)
+
+    for expression in expressions:
+      self.generate_expression(expression)
+
+    self.finish_call(name, arg_count + len(expressions), prefixed)
+
+
+  # Work out a call's full name, and push the object for object.method(...).
+  # Returns (name, arg_count so far, whether it was prefixed, argument expressions).
+  def start_call(self, node):
+    name = self.text(node)
+    *method, expression_list = self.ast.children(node)
+    arg_count = 0
+
+    if method:
+      # For object.method(...), the object is pushed as the first argument
+      # and the call goes to its class. Otherwise, "name" is a class name.
+      symbol = self.subroutine_symbol_table.resolve(name)
+
+      if symbol is not None:
+        arg_count += 1
+        self.vm_writer.write_push(symbol.segment, symbol.index)
+        name = symbol.type
+
+      name = f"{name}.{self.text(method[0])}"
+    else:
+      name = f"{self.current_class_name}.{name}"
+
+    return name, arg_count, bool(method), self.ast.children(expression_list)
+
+
+  # Write a call, once its arguments have been generated.
+  def finish_call(self, name, arg_count, prefixed):
+    # Like the CompilationEngine, an unprefixed call pushes "this" after its arguments.
+    if not prefixed:
+      self.vm_writer.write_push("pointer", 0)
+      arg_count += 1
+
+    self.vm_writer.write_call(name, arg_count)
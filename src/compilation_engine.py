@@ -3,11 +3,48 @@ CompilationEngine
 """
 
 
+from jack_grammar import (
+  CLASS_VAR_KINDS,
+  SUBROUTINE_KINDS,
+  ZERO_CONSTANTS,
+  BINARY_OP_SET,
+  UNARY_OP_SET,
+  CALL_OPENERS,
+  EXPRESSION_LIST_ENDS
+)
+from jack_tokenizer import KEYWORD, SYMBOL, IDENTIFIER, INT_CONST, STRING_CONST
+from string_pool import StringPool
 from symbol_table import SymbolTable
+from tracer import Tracer
+
+
+# The method that compiles each kind of statement, by its keyword.
+STATEMENT_METHODS = {
+  "let": "compile_let",
+  "if": "compile_if_statement",
+  "while": "compile_while_statement",
+  "do": "compile_do",
+  "return": "compile_return"
+}
+
+# The method that compiles a simple term, by the type of its first token.
+TERM_METHODS = {
+  IDENTIFIER: "compile_variable",
+  INT_CONST: "compile_integer_constant",
+  KEYWORD: "compile_keyword_constant",
+  STRING_CONST: "compile_string_constant"
+}
+
+# The kinds of frame on compile_expression()'s explicit stack.
+EXPRESSION_FRAME = 0
+UNARY_FRAME = 1
+PAREN_FRAME = 2
+INDEX_FRAME = 3
+CALL_FRAME = 4
 
 
 class CompilationEngine:
-  def __init__(self, tokenizer, vm_writer):
+  def __init__(self, tokenizer, vm_writer, tracer = None, intern_strings = False):
     # We will use the passed-in JackTokenizer to parse the given Jack code.
     self.tokenizer = tokenizer
 
@@ -18,8 +55,11 @@ class CompilationEngine:
     # When handling Jack variable declarations, you need two symbol tables:
     # - a SymbolTable for the class scope, and
     # - a SymbolTable for the subroutine scope.
+    #
+    # The subroutine scope is nested inside the class scope,
+    # so resolving a name in it falls back to the class scope automatically.
     self.class_symbol_table = SymbolTable()
-    self.subroutine_symbol_table = SymbolTable()
+    self.subroutine_symbol_table = SymbolTable(parent = self.class_symbol_table)
 
     # Even though a class can contain multiple different subroutines,
     # we only ever need one subroutine symbol table.
@@ -27,6 +67,23 @@ class CompilationEngine:
     # We can simply reset the subroutine symbol table
     # every time we encounter a new subroutine!
 
+    # Tracing happens once per class and subroutine, never per token.
+    self.tracer = tracer or Tracer()
+
+    self.intern_strings = intern_strings
+
+    # Statements and terms are compiled by looking up the method for them,
+    # rather than testing for each possibility in turn.
+    self.statement_compilers = {keyword: getattr(self, method) for keyword, method in STATEMENT_METHODS.items()}
+    self.term_compilers = {typ: getattr(self, method) for typ, method in TERM_METHODS.items()}
+
+    self.reset()
+
+
+  # Get ready to compile another file.
+  # The tokenizer and VMWriter should have been reset to the new file already.
+  # This lets one CompilationEngine be reused for any number of files.
+  def reset(self):
     # We will use simple counters to create distinct labels
     # for each if/while statement in the compiled VM code.
     self.if_counter = 0
@@ -40,6 +97,10 @@ class CompilationEngine:
     # Its value is always one of ["function", "method", "constructor"].
     self.subroutine_type = None
 
+    # When interning strings, each class's string constants are built once
+    # and kept in hidden statics (see string_pool.py).
+    self.string_pool = StringPool(self.class_symbol_table, self.vm_writer) if self.intern_strings else None
+
 
   def run(self):
     # Advance to the first token in the .jack file.
@@ -55,30 +116,43 @@ class CompilationEngine:
   ###################################################
 
 
+  # Describe the current token and where it is, for error messages.
+  def found(self):
+    return f"{self.tokenizer.current_token} ({self.tokenizer.location()})"
+
+
+  # These run for nearly every token, so they check the token's type directly,
+  # and only build an error message once a check has failed.
+  #
+  # keyword and symbol can be a single token, or a frozenset of allowed tokens.
   def assert_identifier(self):
-    assert self.tokenizer.identifier(), f"Expected an identifier but found: {self.tokenizer.current_token}"
+    assert self.tokenizer.token_type == IDENTIFIER, f"Expected an identifier but found: {self.found()}"
 
 
   def assert_keyword(self, keyword = None):
-    if keyword and type(keyword) is list:
-      assert self.tokenizer.keyword() and self.tokenizer.current_token in keyword, f"Expected one of keywords {keyword} but found: {self.tokenizer.current_token}"
+    tokenizer = self.tokenizer
+
+    if type(keyword) is frozenset:
+      assert tokenizer.token_type == KEYWORD and tokenizer.current_token in keyword, f"Expected one of keywords {sorted(keyword)} but found: {self.found()}"
     elif keyword:
-      assert self.tokenizer.keyword() and self.tokenizer.current_token == keyword, f"Expected keyword {keyword} but found: {self.tokenizer.current_token}"
+      assert tokenizer.token_type == KEYWORD and tokenizer.current_token == keyword, f"Expected keyword {keyword} but found: {self.found()}"
     else:
-      assert self.tokenizer.keyword(), f"Expected a keyword but found: {self.tokenizer.current_token}"
+      assert tokenizer.token_type == KEYWORD, f"Expected a keyword but found: {self.found()}"
 
 
   def assert_return_type(self):
-    assert self.tokenizer.keyword() or self.tokenizer.identifier(), f"Expected a keyword or identifier as the return type but found: {self.tokenizer.current_token}"
+    assert self.tokenizer.token_type in (KEYWORD, IDENTIFIER), f"Expected a keyword or identifier as the return type but found: {self.found()}"
 
 
   def assert_symbol(self, symbol = None):
-    if symbol and type(symbol) is list:
-      assert self.tokenizer.symbol() and self.tokenizer.current_token in symbol, f"Expected one of symbols {symbol} but found: {self.tokenizer.current_token}"
+    tokenizer = self.tokenizer
+
+    if type(symbol) is frozenset:
+      assert tokenizer.token_type == SYMBOL and tokenizer.current_token in symbol, f"Expected one of symbols {sorted(symbol)} but found: {self.found()}"
     elif symbol:
-      assert self.tokenizer.symbol() and self.tokenizer.current_token == symbol, f"Expected symbol \"{symbol}\" but found: {self.tokenizer.current_token}"
+      assert tokenizer.token_type == SYMBOL and tokenizer.current_token == symbol, f"Expected symbol \"{symbol}\" but found: {self.found()}"
     else:
-      assert self.tokenizer.symbol(), f"Expected a symbol but found: {self.tokenizer.current_token}"
+      assert tokenizer.token_type == SYMBOL, f"Expected a symbol but found: {self.found()}"
 
 
 
@@ -102,28 +176,39 @@ class CompilationEngine:
     # there are multiple classes defined in a .jack file.
     self.class_symbol_table.reset()
 
+    if self.string_pool:
+      self.string_pool.reset()
+
     # At this point, we may encounter class-level field or static variables.
     # We will compile those as needed.
-    self.tokenizer.advance()
-    while self.tokenizer.keyword() and self.tokenizer.current_token in ['field', 'static']:
+    tokenizer = self.tokenizer
+    tokenizer.advance()
+    while tokenizer.token_type == KEYWORD and tokenizer.current_token in CLASS_VAR_KINDS:
       self.compile_class_var_dec()
-      self.tokenizer.advance()
+      tokenizer.advance()
 
     # We will compile each class's subroutines one at a time.
-    while self.tokenizer.keyword() and self.tokenizer.current_token in ['constructor', 'function', 'method']:
+    while tokenizer.token_type == KEYWORD and tokenizer.current_token in SUBROUTINE_KINDS:
       # We can safely reset the subroutine-level symbol table for each new subroutine.
       # There's no need to keep the old table.
       self.subroutine_symbol_table.reset()
 
       self.compile_subroutine_dec()
-      self.tokenizer.advance()
+      tokenizer.advance()
 
     self.assert_symbol('}')
 
+    # The pooled string literals are built in a function of their own, after the class's own.
+    if self.string_pool:
+      self.string_pool.finish_class(self.current_class_name)
+
+    if self.tracer.enabled:
+      self.tracer.event("compile", f"class {self.current_class_name}")
+
 
   def compile_class_var_dec(self):
     # We will store the variable kind, which should always be one of ['field', 'static'].
-    self.assert_keyword(['field', 'static'])
+    self.assert_keyword(CLASS_VAR_KINDS)
     kind = self.tokenizer.current_token
     self.tokenizer.advance()
 
@@ -167,26 +252,154 @@ class CompilationEngine:
     self.vm_writer.write_pop('temp', 0)
 
 
+  # Jack expressions are a chain of terms joined by binary operators,
+  # evaluated strictly left to right (there's no operator precedence):
+  # a + b * c is (a + b) * c.
+  #
+  # Terms can nest expressions of their own, inside parentheses, array indexes,
+  # and subroutine call arguments, and machine-written Jack can nest them thousands deep.
+  # Recursing once per level would run out of Python stack,
+  # so instead we keep our own explicit stack of the constructs we're partway through:
+  # - [EXPRESSION_FRAME, op]: an expression, and the binary op waiting on its next term (if any)
+  # - (UNARY_FRAME, op): a unary op waiting on its term
+  # - (PAREN_FRAME,) and (INDEX_FRAME,): a nested expression, waiting on its ")" or "]"
+  # - [CALL_FRAME, name, arg_count, has_prefix]: a subroutine call, partway through its arguments
+  #
+  # Each pass around the loop compiles one term, then finishes off
+  # every construct that term completes.
+  # We start on the expression's first token, and end on the token just after it.
   def compile_expression(self):
-    self.compile_term()
-
-    self.tokenizer.advance()
-
-    if self.tokenizer.binary_op():
-      binary_op = self.tokenizer.current_token
+    tokenizer = self.tokenizer
+    vm_writer = self.vm_writer
+    stack = [[EXPRESSION_FRAME, None]]
 
-      self.tokenizer.advance()
-      self.compile_term()
+    while True:
+      token = tokenizer.current_token
+      typ = tokenizer.token_type
 
-      self.vm_writer.write_binary_op(binary_op)
+      # First, the terms that open up a nested construct.
+      # Each one pushes a frame and goes back around for the term (or expression) inside it.
+      #
+      # A unary operation, such as "-" (negate, or neg) or "~" (not).
+      # Examples: -3, ~(~(x))
+      if typ == SYMBOL and token in UNARY_OP_SET:
+        stack.append((UNARY_FRAME, token))
+        tokenizer.advance()
+        continue
+
+      # We can always have expressions inside of parentheses.
+      # Examples: (x + 3), ((x + 2) > 9)
+      if typ == SYMBOL and token == '(':
+        stack.append((PAREN_FRAME,))
+        stack.append([EXPRESSION_FRAME, None])
+        tokenizer.advance()
+        continue
+
+      if typ == IDENTIFIER:
+        next_token = tokenizer.peek()
+
+        # The next token is either a period or left parens,
+        # which means we're in a subroutine call!
+        #
+        # Examples: Memory.alloc(), myObj.doAThing(), doSomethingElse()
+        if next_token in CALL_OPENERS:
+          call = [CALL_FRAME, *self.start_subroutine_call()]
+          tokenizer.advance()
+
+          # Each argument is an expression of its own.
+          if self.next_argument(call):
+            stack.append(call)
+            stack.append([EXPRESSION_FRAME, None])
+            continue
+
+          self.finish_subroutine_call(*call[1:])
+
+        # The next token is a left bracket, which means
+        # we're trying to access an array.
+        #
+        # Examples: myArray[3], myArray[x + (y - 2)]
+        elif next_token == '[':
+          tokenizer.advance()
+          self.assert_symbol('[')
+
+          stack.append((INDEX_FRAME,))
+          stack.append([EXPRESSION_FRAME, None])
+          tokenizer.advance()
+          continue
+
+        else:
+          self.compile_term()
+
+      # Everything else is a simple term: a constant or a variable.
+      else:
+        self.compile_term()
+
+      # We've just finished a term, and we're sitting on its last token.
+      # Let's finish off everything that was waiting on it.
+      while True:
+        frame = stack[-1]
+
+        # A unary op applies to just the term right after it.
+        if frame[0] == UNARY_FRAME:
+          stack.pop()
+          vm_writer.write_unary_op(frame[1])
+          continue
+
+        # Otherwise, the term belongs to an expression.
+        # If it was the right-hand side of a binary op, that op can be written now.
+        if frame[1]:
+          vm_writer.write_binary_op(frame[1])
+
+        tokenizer.advance()
+
+        # Another binary op means another term to go.
+        if tokenizer.current_token in BINARY_OP_SET:
+          frame[1] = tokenizer.current_token
+          tokenizer.advance()
+          break
+
+        # Otherwise, the expression is done, and we hand it to whatever it's inside of.
+        stack.pop()
+
+        if not stack:
+          return
+
+        frame = stack[-1]
+
+        # A parenthesized expression or an array index is a finished term of its own.
+        if frame[0] == PAREN_FRAME:
+          stack.pop()
+          self.assert_symbol(')')
+        elif frame[0] == INDEX_FRAME:
+          stack.pop()
+          self.assert_symbol(']')
+
+        # A subroutine call goes on to its next argument, or is finished.
+        elif self.next_argument(frame):
+          stack.append([EXPRESSION_FRAME, None])
+          break
+        else:
+          stack.pop()
+          self.finish_subroutine_call(*frame[1:])
+
+
+  # Move past any commas to the start of a call's next argument, counting it.
+  # Returns False once we reach the end of the argument list instead.
+  def next_argument(self, call):
+    while self.tokenizer.current_token not in EXPRESSION_LIST_ENDS:
+      if self.tokenizer.current_token == ',':
+        self.tokenizer.advance()
+      else:
+        call[2] += 1
+        return True
 
-      self.tokenizer.advance()
+    return False
 
 
   def compile_expression_list(self):
     expression_count = 0
 
-    while self.tokenizer.current_token not in [')', '}']:
+    while self.tokenizer.current_token not in EXPRESSION_LIST_ENDS:
       if self.tokenizer.current_token == ',':
         self.tokenizer.advance()
       else:
@@ -275,19 +488,13 @@ class CompilationEngine:
 
     self.assert_symbol(';')
 
-    if self.subroutine_symbol_table.has_name(name):
-      self.vm_writer.write_pop(
-        self.subroutine_symbol_table.kind_of(name),
-        self.subroutine_symbol_table.index_of(name)
-      )
-    elif self.class_symbol_table.has_name(name):
-      kind = self.class_symbol_table.kind_of(name)
-      kind = "this" if kind == "field" else kind
+    symbol = self.subroutine_symbol_table.resolve(name)
 
-      self.vm_writer.write_pop(kind, self.class_symbol_table.index_of(name))
-    else:
+    if symbol is None:
       raise AssertionError(f"Undeclared variable found: {name}")
 
+    self.vm_writer.write_pop(symbol.segment, symbol.index)
+
 
   def compile_parameter_list(self):
     # We'll keep a running list of the contents inside of a subroutine's params.
@@ -342,32 +549,23 @@ class CompilationEngine:
 
 
   def compile_statement(self):
-    if self.tokenizer.current_token == 'do':
-      return self.compile_do()
-
-    if self.tokenizer.current_token == 'let':
-      return self.compile_let()
+    compiler = self.statement_compilers.get(self.tokenizer.current_token)
 
-    if self.tokenizer.current_token == 'if':
-      return self.compile_if_statement()
+    if compiler:
+      return compiler()
 
-    if self.tokenizer.current_token == 'while':
-      return self.compile_while_statement()
-
-    if self.tokenizer.current_token == 'return':
-      return self.compile_return()
-
-    raise AssertionError(f"Unrecognized token in compile_statement(): {self.tokenizer.current_token}")
+    raise AssertionError(f"Unrecognized token in compile_statement(): {self.found()}")
 
 
   def compile_statements(self):
-    while self.tokenizer.current_token != '}':
-      if self.tokenizer.symbol():
-        pass
-      else:
+    tokenizer = self.tokenizer
+
+    # Stray symbols (like an extra ";") between statements are skipped.
+    while tokenizer.current_token != '}':
+      if tokenizer.token_type != SYMBOL:
         self.compile_statement()
 
-      self.tokenizer.advance()
+      tokenizer.advance()
 
 
   def compile_subroutine_body(self):
@@ -396,6 +594,13 @@ class CompilationEngine:
     # we can finally declare our function in VM bytecode.
     self.vm_writer.write_function(f"{self.current_class_name}.{self.current_subroutine_name}", local_count)
 
+    if self.tracer.enabled:
+      self.tracer.event("compile", f"{self.subroutine_type} {self.current_class_name}.{self.current_subroutine_name}")
+
+    # If the subroutine uses pooled strings, their guard will go right here.
+    if self.string_pool:
+      self.string_pool.start_subroutine()
+
     # Edge case!
     if self.subroutine_type == 'constructor':
       # If we're compiling a constructor, we'll need to do some initialization
@@ -425,12 +630,33 @@ class CompilationEngine:
     # We'll now compile every statement inside of the subroutine.
     self.compile_statements()
 
+    if self.string_pool:
+      self.string_pool.finish_subroutine(self.current_class_name)
+
     # Finally, we'll do another sanity check to ensure we've hit the
     # end of our statement block.
     self.assert_symbol('}')
 
 
   def compile_subroutine_call(self):
+    name, arg_count, has_prefix = self.start_subroutine_call()
+
+    # We'll need to compile every expression inside of the subroutine call.
+    #
+    # We'll also get the number of expressions in the call,
+    # which will increase our argument counter.
+    #
+    # Example: myObj.doAThing(exp1, exp2, exp3...)
+    self.tokenizer.advance()
+    arg_count += self.compile_expression_list()
+
+    self.finish_subroutine_call(name, arg_count, has_prefix)
+
+
+  # Compile the start of a subroutine call, up to its "(".
+  # Returns the call's (name, arg_count, has_prefix) so far;
+  # finish_subroutine_call() writes the call once its arguments are compiled.
+  def start_subroutine_call(self):
     # We'll keep a running tally of the argument count.
     # This is required for the call VM code.
     # Example: call {subroutine_name} {arg_count}
@@ -452,15 +678,14 @@ class CompilationEngine:
     has_prefix = True
 
     self.tokenizer.advance()
-    self.assert_symbol(['(', '.'])
+    self.assert_symbol(CALL_OPENERS)
 
     # If the current token is a period, then this is a method call.
     #
     # At this point in time, the name is either a class name or an object,
     # like MyClass or myObj.
     if self.tokenizer.current_token == '.':
-      obj_in_sub_symbol_table = self.subroutine_symbol_table.has_name(name)
-      obj_in_class_symbol_table = self.class_symbol_table.has_name(name)
+      symbol = self.subroutine_symbol_table.resolve(name)
 
       # If the current token is an object, we need to do something special.
       # Specifically, we need to push the current object onto the stack.
@@ -471,33 +696,14 @@ class CompilationEngine:
       # myObj.doAThing(a, b) -> doAThing(myObj, a, b)
       #
       # From a VM perspective, the procedural version is easier to compile.
-      if obj_in_sub_symbol_table or obj_in_class_symbol_table:
+      if symbol is not None:
         arg_count += 1
 
-        # First, we'll for the object identifier in the subroutine symbol table.
-        if obj_in_sub_symbol_table:
-          # Push the object to the stack.
-          self.vm_writer.write_push(
-            self.subroutine_symbol_table.kind_of(name),
-            self.subroutine_symbol_table.index_of(name)
-          )
+        # Push the object to the stack.
+        self.vm_writer.write_push(symbol.segment, symbol.index)
 
-          # We'll need to replace our current name with the object's type (aka class).
-          name = self.subroutine_symbol_table.type_of(name)
-
-        # Next, we'll check for the object identifier in the class symbol table.
-        elif obj_in_class_symbol_table:
-          kind = self.class_symbol_table.kind_of(name)
-          kind = "this" if kind == "field" else kind
-
-          # Push the object to the stack.
-          self.vm_writer.write_push(
-            kind,
-            self.class_symbol_table.index_of(name)
-          )
-
-          # We'll need to replace our current name with the object's type (aka class).
-          name = self.class_symbol_table.type_of(name)
+        # We'll need to replace our current name with the object's type (aka class).
+        name = symbol.type
 
       name += "."
 
@@ -520,15 +726,10 @@ class CompilationEngine:
 
     self.assert_symbol('(')
 
-    # We'll need to compile every expression inside of the subroutine call.
-    #
-    # We'll also get the number of expressions in the call,
-    # which will increase our argument counter.
-    #
-    # Example: myObj.doAThing(exp1, exp2, exp3...)
-    self.tokenizer.advance()
-    arg_count += self.compile_expression_list()
+    return name, arg_count, has_prefix
+
 
+  def finish_subroutine_call(self, name, arg_count, has_prefix):
     self.assert_symbol(')')
 
     if not has_prefix:
@@ -545,7 +746,7 @@ class CompilationEngine:
 
 
   def compile_subroutine_dec(self):
-    self.assert_keyword(['constructor', 'method', 'function'])
+    self.assert_keyword(SUBROUTINE_KINDS)
     self.subroutine_type = self.tokenizer.current_token
 
     self.tokenizer.advance()
@@ -573,119 +774,66 @@ class CompilationEngine:
     self.compile_subroutine_body()
 
 
+  # Compile a simple term: a constant or a variable.
+  # Terms with something nested inside them (unary ops, parentheses, array indexes,
+  # and subroutine calls) are handled by compile_expression() itself.
   def compile_term(self):
-    # We need to compile each individual term to VM code as needed.
-    #
-    # The definition for "term" in this context is quite broad,
-    # so bear with me as we go through each possible term!
+    # The type of the term's first token is enough to tell which kind of term it is,
+    # so we hand it straight to the method for that kind.
+    compiler = self.term_compilers.get(self.tokenizer.token_type)
 
-    # First, if we have an identifier on our hands, we'll need to peek one token ahead.
-    #
-    # The token ahead could be one of the following:
-    # - a period, indicating that the identifier is a class name or object
-    # - a left parens, indicating that the identifier is a subroutine
-    # - a left bracket, indiciating that the identifier is an array
-    if self.tokenizer.identifier() and self.tokenizer.peek() in ['.', '(', '[']:
-      next_token = self.tokenizer.peek()
-
-      # The next token is either a period or left parens,
-      # which means we're in a subroutine call!
-      #
-      # Examples: Memory.alloc(), myObj.doAThing(), doSomethingElse()
-      if next_token in ['.', '(']:
-        self.compile_subroutine_call()
+    if compiler is None:
+      raise AssertionError(f"Unsure how to handle parse the current token as a term: {self.found()}")
 
-      # The next token is a left bracket, which means
-      # we're trying to access an array.
-      #
-      # Examples: myArray[3], myArray[x + (y - 2)]
-      elif next_token == '[':
-        # TODO: Handle identifier.
+    compiler()
 
-        self.tokenizer.advance()
-        self.assert_symbol('[')
 
-        self.tokenizer.advance()
-        self.compile_expression()
+  # If we have an identifier at this point, we can safely assume that
+  # its a standalone variable, not part of a subroutine call or array access.
+  #
+  # We will leverage our symbol tables to write the VM code here.
+  def compile_variable(self):
+    name = self.tokenizer.current_token
 
-        self.assert_symbol(']')
+    # The symbol tables check the subroutine scope first, then the class scope.
+    # The symbol already knows its VM segment (fields live in "this").
+    symbol = self.subroutine_symbol_table.resolve(name)
 
-    # Let's check if the current token is a unary operation,
-    # such as "-" (negate, or neg) or "~" (not).
-    #
-    # Examples: -3, ~(~(x))
-    elif self.tokenizer.unary_op():
-      unary_op = self.tokenizer.current_token
+    if symbol is None:
+      raise AssertionError(f"Unknown identifier: {name}")
 
-      self.tokenizer.advance()
-      self.compile_term()
+    self.vm_writer.write_push(symbol.segment, symbol.index)
 
-      self.vm_writer.write_unary_op(unary_op)
 
-    # We can always have expressions inside of parentheses.
-    # We can treat this like its own term.
-    # Examples: (x + 3), ((x + 2) > 9)
-    elif self.tokenizer.current_token == '(':
-      self.tokenizer.advance()
-      self.compile_expression()
+  # If we encounter a number, we simply write "push constant {number}".
+  def compile_integer_constant(self):
+    self.vm_writer.write_push("constant", self.tokenizer.int_val())
 
-      self.assert_symbol(')')
-
-    # Now we've reached some simpler terms!
-    # If we encounter a number, we simply write "push constant {number}".
-    elif self.tokenizer.int_val() or self.tokenizer.int_val() == 0:
-      self.vm_writer.write_push("constant", self.tokenizer.current_token)
-
-    # We need to consider some special keyword expressions.
-    # Most of keywords ultimately resolve to simple "push constant" VM commands.
-    elif self.tokenizer.keyword():
-      # null and false keywords map to constant 0.
-      if self.tokenizer.current_token in ["null", "false"]:
-        self.vm_writer.write_push("constant", 0)
-      # The true keyword maps to constant -1.
-      elif self.tokenizer.current_token == "true":
-        self.vm_writer.write_push("constant", 1)
-        self.vm_writer.write_command("neg")
-      # The this keyword indicates a reference to the current object in the THIS address.
-      elif self.tokenizer.current_token == "this":
-        self.vm_writer.write_push("pointer", 0)
-
-    # If we have an identifer at this point, we can safely assume that
-    # its a standalone variable, not part of a subroutine call or array access.
-    #
-    # We will leverage our symbol tables to write the VM code here.
-    elif self.tokenizer.identifier():
-      name = self.tokenizer.current_token
 
-      # First, let's check the subroutine symbol table for the identifier.
-      if self.subroutine_symbol_table.has_name(name):
-        # If we find it, we can now write the VM push code.
-        self.vm_writer.write_push(
-          self.subroutine_symbol_table.kind_of(name),
-          self.subroutine_symbol_table.index_of(name)
-        )
-
-      # Next, we'll check the class symbol table for the identifier.
-      elif self.class_symbol_table.has_name(name):
-        # We need to make a small tweak to address _field_s.
-        kind = self.class_symbol_table.kind_of(name)
-        kind = "this" if kind == "field" else kind
-
-        # We can now write the VM push code.
-        self.vm_writer.write_push(
-          kind,
-          self.class_symbol_table.index_of(name)
-        )
-      else:
-        raise AssertionError(f"Unknown identifier: {name}")
+  # We need to consider some special keyword expressions.
+  # Most of keywords ultimately resolve to simple "push constant" VM commands.
+  def compile_keyword_constant(self):
+    keyword = self.tokenizer.current_token
+
+    # null and false keywords map to constant 0.
+    if keyword in ZERO_CONSTANTS:
+      self.vm_writer.write_push("constant", 0)
+    # The true keyword maps to constant -1.
+    elif keyword == "true":
+      self.vm_writer.write_push("constant", 1)
+      self.vm_writer.write_command("neg")
+    # The this keyword indicates a reference to the current object in the THIS address.
+    elif keyword == "this":
+      self.vm_writer.write_push("pointer", 0)
 
-    # TODO
-    # For strings, we'll need to call String.new() and String.appendChar().
-    elif self.tokenizer.string_val():
-      pass
 
+  # For strings, we'll need to call String.new() and String.appendChar(),
+  # or reuse the class's pooled copy when interning.
+  def compile_string_constant(self):
+    if self.string_pool:
+      self.string_pool.write_string(self.tokenizer.string_val())
     else:
-      raise AssertionError(f"Unsure how to handle parse the current token as a term: {self.tokenizer.current_token}")
+      self.vm_writer.write_string(self.tokenizer.string_val())
 
 
   def compile_var_dec(self):
@@ -0,0 +1,50 @@
+"""
+CompileOptions
+
+The settings that change what the compiler produces for a given .jack file.
+
+They're bundled together so they can be handed to worker processes in one piece,
+and so the BuildCache can tell when a cached .vm was built with different settings.
+"""
+
+
+class CompileOptions:
+  __slots__ = ("optimize", "frontend", "intern_strings", "tree_shake", "inline_budget", "backend")
+
+  def __init__(self, optimize = False, frontend = "engine", intern_strings = False, tree_shake = False, inline_budget = 0, backend = "vm"):
+    # Run constant folding, strength reduction, and the peephole optimizer over each class's VM code.
+    self.optimize = optimize
+
+    # How Jack code becomes VM code:
+    # - "engine" parses and emits code in a single pass with the CompilationEngine
+    # - "ast" parses into a FlatAST first, then walks it with the CodeGenerator
+    self.frontend = frontend
+
+    # Build each class's distinct string constants once, on first use,
+    # and keep them in hidden statics (see string_pool.py).
+    self.intern_strings = intern_strings
+
+    # Compile the whole program before writing anything,
+    # and leave out the subroutines it can never call (see tree_shaking.py).
+    self.tree_shake = tree_shake
+
+    # Inline subroutines of up to this many VM instructions into their callers,
+    # across the whole program (see inliner.py). 0 turns inlining off.
+    # A bigger budget saves more calls, at the cost of bigger code.
+    self.inline_budget = inline_budget
+
+    # What the compiler writes:
+    # - "vm" writes a .vm file for each class
+    # - "vmb" writes a binary .vmb file for each class (see vm_binary.py)
+    # - "asm" translates the whole program into a single Hack .asm file (see hack_writer.py)
+    self.backend = backend
+
+
+  # Determine whether any option needs the whole program's code before anything is written.
+  def whole_program(self):
+    return self.tree_shake or self.inline_budget > 0 or self.backend == "asm"
+
+
+  # Describe every option as a string, for the build cache's fingerprint.
+  def fingerprint(self):
+    return ",".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
@@ -0,0 +1,112 @@
+"""
+CompileSession
+
+Compile Jack source text to VM instructions, entirely in memory.
+
+A session keeps one JackTokenizer, VMWriter, and CompilationEngine warm,
+and resets them for each new source instead of building new ones.
+The JackCompiler and the Watcher each keep one session for every .jack file
+they compile, and compile_source() / compile_many() in jack_compiler.py use one
+to compile text that never touches the disk.
+"""
+
+
+import peephole
+from code_generator import CodeGenerator
+from compilation_engine import CompilationEngine
+from compile_options import CompileOptions
+from constant_folding import fold_constants
+from jack_parser import JackParser
+from jack_tokenizer import JackTokenizer
+from strength_reduction import reduce_strength
+from tracer import Tracer
+from vm_writer import VMWriter
+
+
+class CompileSession:
+  def __init__(self, options = None, tracer = None):
+    self.options = options or CompileOptions()
+    self.tracer = tracer or Tracer()
+
+    self.tokenizer = JackTokenizer("", self.tracer)
+    self.vm_writer = VMWriter(tracer = self.tracer)
+
+    # The CodeGenerator works on one AST, so it's built fresh for each source.
+    # The CompilationEngine only needs resetting.
+    if self.options.frontend == "engine":
+      self.engine = CompilationEngine(self.tokenizer, self.vm_writer, self.tracer, self.options.intern_strings)
+    else:
+      self.engine = None
+
+
+  # Compile one class's source text, filling in result.instructions (and any notes).
+  # With a FileProfile, each phase is timed on it.
+  # Errors are raised; it's up to the caller to record them.
+  def compile(self, source, result, profile = None):
+    tokenizer = self.tokenizer
+    vm_writer = self.vm_writer
+
+    tokenizer.reset(source)
+    vm_writer.reset()
+
+    if profile:
+      profile.tokens = len(tokenizer.token_values)
+      profile.lap("tokenize")
+
+    if self.engine:
+      compiler = self.engine
+      compiler.reset()
+    else:
+      ast = JackParser(tokenizer).parse()
+      compiler = CodeGenerator(ast, tokenizer, vm_writer, self.tracer, self.options.intern_strings)
+
+      if profile:
+        profile.lap("parse")
+
+    timing_subroutines = profile and profile.subroutines is not None
+
+    if timing_subroutines:
+      method_name = "compile_subroutine_dec" if self.engine else "generate_subroutine"
+      profile.time_subroutines(compiler, method_name, vm_writer)
+
+    try:
+      compiler.run()
+    finally:
+      # Put the engine's own method back, so the next source isn't timed twice over.
+      if timing_subroutines:
+        delattr(compiler, method_name)
+
+    if profile:
+      profile.lap("compile" if self.engine else "generate")
+
+    if compiler.string_pool:
+      result.notes.extend(compiler.string_pool.describe())
+
+    if self.options.optimize:
+      optimize(vm_writer, result)
+
+      if profile:
+        profile.lap("optimize")
+
+    result.instructions = vm_writer.instructions
+
+    if profile:
+      profile.instructions = len(result.instructions)
+
+    return result
+
+
+# Run the optimization passes over a VMWriter's instructions,
+# noting what each pass saved on the result.
+def optimize(vm_writer, result):
+  size = len(vm_writer.instructions)
+  vm_writer.instructions = fold_constants(vm_writer.instructions)
+  result.notes.append(f"constant folding removed {size - len(vm_writer.instructions)} instructions")
+
+  vm_writer.instructions, savings = reduce_strength(vm_writer.instructions)
+  for function_name, saved in savings.items():
+    result.notes.append(f"strength reduction saves ~{saved} cycles per pass through {function_name}")
+
+  size = len(vm_writer.instructions)
+  vm_writer.instructions = peephole.optimize(vm_writer.instructions)
+  result.notes.append(f"peephole removed {size - len(vm_writer.instructions)} instructions")
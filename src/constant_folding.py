@@ -0,0 +1,147 @@
+"""
+Constant folding
+
+Evaluate constant subexpressions at compile time.
+
+The CompilationEngine emits stack code for every operand and operator as it sees them,
+so something like x + (3 * 4) becomes:
+
+push local 0
+push constant 3
+push constant 4
+call Math.multiply 2
+add
+
+This pass walks the VM code while tracking which values on top of the stack are known constants.
+Whenever an operator (or a call to a pure OS function) only has constant operands,
+we evaluate it right here and push the result instead:
+
+push local 0
+push constant 12
+add
+
+All arithmetic follows the Hack platform's 16-bit two's complement rules, wraparound included.
+"""
+
+
+import math
+
+from vm_instruction import VMInstruction, PUSH, CALL
+
+
+# Wrap an integer into a signed 16-bit value.
+def to_int16(value):
+  value &= 0xFFFF
+
+  return value - 0x10000 if value & 0x8000 else value
+
+
+# Jack booleans: true is -1 (all bits set), false is 0.
+def to_boolean(value):
+  return -1 if value else 0
+
+
+# Integer division that truncates toward zero, like the Jack OS's Math.divide.
+def divide(x, y):
+  quotient = abs(x) // abs(y)
+
+  return quotient if (x < 0) == (y < 0) else -quotient
+
+
+BINARY_COMMANDS = {
+  "add": lambda x, y: x + y,
+  "sub": lambda x, y: x - y,
+  "and": lambda x, y: x & y,
+  "or": lambda x, y: x | y,
+  "eq": lambda x, y: to_boolean(x == y),
+  "gt": lambda x, y: to_boolean(x > y),
+  "lt": lambda x, y: to_boolean(x < y)
+}
+
+
+UNARY_COMMANDS = {
+  "neg": lambda x: -x,
+  "not": lambda x: ~x
+}
+
+
+# OS functions with no side effects, keyed by name and argument count.
+# Each returns None when it can't be safely evaluated at compile time
+# (e.g. dividing by zero, which has to stay a runtime error).
+PURE_FUNCTIONS = {
+  ("Math.multiply", 2): lambda x, y: x * y,
+  ("Math.divide", 2): lambda x, y: divide(x, y) if y != 0 else None,
+  ("Math.abs", 1): lambda x: abs(x),
+  ("Math.min", 2): lambda x, y: min(x, y),
+  ("Math.max", 2): lambda x, y: max(x, y),
+  ("Math.sqrt", 1): lambda x: math.isqrt(x) if x >= 0 else None
+}
+
+
+# Return the list of instructions with every constant subexpression folded.
+def fold_constants(instructions):
+  # Each entry is either a VMInstruction we're keeping as-is,
+  # or a plain int: a constant that's been pushed (and possibly folded) but not yet emitted.
+  folded = []
+
+  for instruction in instructions:
+    command = instruction.command
+
+    if command == PUSH and instruction.arg1 == "constant":
+      folded.append(to_int16(instruction.arg2))
+      continue
+
+    if command in UNARY_COMMANDS and has_constants(folded, 1):
+      folded[-1] = to_int16(UNARY_COMMANDS[command](folded[-1]))
+      continue
+
+    if command in BINARY_COMMANDS and has_constants(folded, 2):
+      y = folded.pop()
+      folded[-1] = to_int16(BINARY_COMMANDS[command](folded[-1], y))
+      continue
+
+    if command == CALL and (instruction.arg1, instruction.arg2) in PURE_FUNCTIONS and has_constants(folded, instruction.arg2):
+      arg_count = instruction.arg2
+      value = PURE_FUNCTIONS[(instruction.arg1, arg_count)](*folded[-arg_count:])
+
+      if value is not None:
+        del folded[-arg_count:]
+        folded.append(to_int16(value))
+        continue
+
+    folded.append(instruction)
+
+  optimized = []
+
+  for entry in folded:
+    if isinstance(entry, int):
+      optimized.extend(push_constant(entry))
+    else:
+      optimized.append(entry)
+
+  return optimized
+
+
+# Determine whether the top `count` entries are all known constants.
+def has_constants(folded, count):
+  if len(folded) < count:
+    return False
+
+  for i in range(1, count + 1):
+    if not isinstance(folded[-i], int):
+      return False
+
+  return True
+
+
+# Return the shortest VM code that pushes a signed 16-bit constant.
+# "push constant" only takes 0..32767, so negative values need a neg (or a not).
+def push_constant(value):
+  if value >= 0:
+    return [VMInstruction(PUSH, "constant", value)]
+
+  # -32768 can't be negated from a positive constant, but it is ~32767.
+  if value == -32768:
+    return [VMInstruction(PUSH, "constant", 32767), VMInstruction("not")]
+
+  return [VMInstruction(PUSH, "constant", -value), VMInstruction("neg")]
@@ -0,0 +1,443 @@
+"""
+HackWriter
+
+Translate a whole program's VMInstructions straight into Hack assembly,
+without writing .vm files and running them through a separate VM translator.
+
+Since we see the whole program at once, the translation can do better than
+a line-by-line VM translator in two ways.
+
+Shared call/return trampolines:
+Every call and return does the same work (saving and restoring LCL, ARG, THIS, and THAT),
+so that code is written once, in the $CALL and $RETURN routines.
+A call site only loads its argument count, target, and return address, then jumps to $CALL.
+A return is a single jump to $RETURN, with the return value in D.
+
+Stack-top caching:
+The value on top of the stack is kept in the D register for as long as possible,
+instead of being written to memory by every push and read back by the next instruction.
+So "push local 0, push constant 1, add, pop local 0" becomes
+
+  @LCL, A=M, D=M           // push local 0 (into D)
+  @SP, AM=M+1, A=A-1, M=D  // push constant 1: the old top finally goes to memory...
+  D=1                      // ...and the new top stays in D
+  @SP, AM=M-1, D=D+M       // add
+  @LCL, A=M, M=D           // pop local 0
+
+The memory stack is only brought up to date where it has to be:
+before labels (where control flow joins), jumps, and calls.
+
+The usual Hack memory map applies:
+SP, LCL, ARG, THIS, THAT in RAM[0..4], temp in RAM[5..12],
+scratch registers R13-R15, and statics as Class.index symbols from RAM[16].
+"""
+
+
+import os
+
+from vm_instruction import (
+  PUSH,
+  POP,
+  LABEL,
+  GOTO,
+  IF_GOTO,
+  FUNCTION,
+  CALL,
+  RETURN
+)
+
+
+# Where a program starts running, in order of preference.
+# With the OS, Sys.init sets things up and calls Main.main;
+# without it, we call Main.main ourselves.
+ENTRY_POINTS = ("Sys.init", "Main.main")
+
+# The segments that live at an offset from a pointer.
+POINTER_SEGMENTS = {
+  "local": "LCL",
+  "argument": "ARG",
+  "this": "THIS",
+  "that": "THAT"
+}
+
+TEMP_BASE = 5
+
+# Offsets up to these are reached by bumping A, one instruction per step,
+# rather than by adding the offset (which needs D, and so a round trip through R13/R14).
+PUSH_OFFSET_LIMIT = 3
+POP_OFFSET_LIMIT = 8
+
+BINARY_OPERATIONS = {
+  "add": "D=D+M",
+  "sub": "D=M-D",
+  "and": "D=D&M",
+  "or": "D=D|M"
+}
+
+UNARY_OPERATIONS = {
+  "neg": "D=-D",
+  "not": "D=!D"
+}
+
+# Comparisons jump on the sign of x - y; see write_comparison() for how gt and lt avoid overflow.
+COMPARISON_JUMPS = {
+  "eq": "JEQ",
+  "gt": "JGT",
+  "lt": "JLT"
+}
+
+
+# Return the .asm file that a given .jack file or directory of .jack files compiles to.
+def asm_file_for(argv1):
+  if os.path.isdir(argv1):
+    # abspath() first, so "." is named after the directory it stands for.
+    return os.path.join(argv1, os.path.basename(os.path.abspath(argv1)) + ".asm")
+
+  return os.path.splitext(argv1)[0] + ".asm"
+
+
+class HackWriter:
+  def __init__(self):
+    self.lines = []
+
+    # Whether the value on top of the stack is in D rather than in memory.
+    self.cached = False
+
+    # The class and function being translated, for static and label names.
+    self.class_name = None
+    self.function_name = None
+
+    # Counters for the labels we make up ourselves.
+    self.return_counter = 0
+    self.comparison_counter = 0
+
+
+  # Return the assembly written so far.
+  def getvalue(self):
+    return "".join([f"{line}\n" for line in self.lines])
+
+
+  # Count the instructions that will end up in ROM (labels don't take up any space).
+  def rom_size(self):
+    return sum(1 for line in self.lines if not line.startswith("("))
+
+
+  def emit(self, *lines):
+    self.lines.extend(lines)
+
+
+  ###################################################
+  # PROGRAM STRUCTURE
+  ###################################################
+
+
+  # Translate a whole program, given as a list of (class name, instructions).
+  def write_program(self, classes):
+    defined = {
+      instruction.arg1
+      for _, instructions in classes
+      for instruction in instructions
+      if instruction.command == FUNCTION
+    }
+
+    called = {
+      instruction.arg1
+      for _, instructions in classes
+      for instruction in instructions
+      if instruction.command == CALL
+    }
+
+    # An undefined function would silently become a RAM variable in the assembler,
+    # and calling it would jump somewhere random.
+    undefined = sorted(called - defined)
+    assert not undefined, f"Calls to undefined functions (are the OS's .vm files missing?): {', '.join(undefined)}"
+
+    entry = next((name for name in ENTRY_POINTS if name in defined), None)
+    assert entry, "The program has no Sys.init or Main.main to start from"
+
+    self.write_bootstrap(entry)
+    self.write_runtime()
+
+    for class_name, instructions in classes:
+      self.write_class(class_name, instructions)
+
+
+  # Set up the stack and call the entry point.
+  # If it ever returns, we halt.
+  def write_bootstrap(self, entry):
+    self.emit("@256", "D=A", "@SP", "M=D")
+    self.write_call_to(entry, 0, "$HALT")
+    self.emit("($HALT)", "@$HALT", "0;JMP")
+
+
+  # The shared routines behind every call and return.
+  def write_runtime(self):
+    # $CALL expects D = the return address, R13 = the argument count, R14 = the function's address.
+    self.emit(
+      "($CALL)",
+      "@SP", "A=M", "M=D",
+      "@LCL", "D=M", "@SP", "AM=M+1", "M=D",
+      "@ARG", "D=M", "@SP", "AM=M+1", "M=D",
+      "@THIS", "D=M", "@SP", "AM=M+1", "M=D",
+      "@THAT", "D=M", "@SP", "AM=M+1", "M=D",
+      "@SP", "MD=M+1",
+      "@LCL", "M=D",
+      "@R13", "D=D-M", "@5", "D=D-A", "@ARG", "M=D",
+      "@R14", "A=M", "0;JMP"
+    )
+
+    # $RETURN expects D = the return value.
+    # The return address is read before the return value overwrites ARG[0],
+    # which is the same slot when the function took no arguments.
+    self.emit(
+      "($RETURN)",
+      "@R13", "M=D",
+      "@LCL", "D=M", "@R14", "M=D",
+      "@5", "A=D-A", "D=M", "@R15", "M=D",
+      "@R13", "D=M", "@ARG", "A=M", "M=D",
+      "@ARG", "D=M+1", "@SP", "M=D",
+      "@R14", "AM=M-1", "D=M", "@THAT", "M=D",
+      "@R14", "AM=M-1", "D=M", "@THIS", "M=D",
+      "@R14", "AM=M-1", "D=M", "@ARG", "M=D",
+      "@R14", "AM=M-1", "D=M", "@LCL", "M=D",
+      "@R15", "A=M", "0;JMP"
+    )
+
+
+  def write_class(self, class_name, instructions):
+    self.class_name = class_name
+
+    for instruction in instructions:
+      command = instruction.command
+
+      if command == PUSH:
+        self.write_push(instruction.arg1, instruction.arg2)
+      elif command == POP:
+        self.write_pop(instruction.arg1, instruction.arg2)
+      elif command in BINARY_OPERATIONS:
+        self.write_binary(BINARY_OPERATIONS[command])
+      elif command in UNARY_OPERATIONS:
+        self.write_unary(UNARY_OPERATIONS[command])
+      elif command in COMPARISON_JUMPS:
+        self.write_comparison(COMPARISON_JUMPS[command])
+      elif command == LABEL:
+        self.write_label(instruction.arg1)
+      elif command == GOTO:
+        self.write_goto(instruction.arg1)
+      elif command == IF_GOTO:
+        self.write_if(instruction.arg1)
+      elif command == FUNCTION:
+        self.write_function(instruction.arg1, instruction.arg2)
+      elif command == CALL:
+        self.write_call(instruction.arg1, instruction.arg2)
+      elif command == RETURN:
+        self.write_return()
+      else:
+        raise AssertionError(f"Unrecognized VM command: {instruction}")
+
+
+  ###################################################
+  # THE STACK
+  ###################################################
+
+
+  # Write the cached top of the stack out to memory, if it's in D.
+  def flush(self):
+    if self.cached:
+      self.emit("@SP", "AM=M+1", "A=A-1", "M=D")
+      self.cached = False
+
+
+  # Make sure the top of the stack is in D, popping it from memory if need be.
+  # Afterwards, it's no longer on the stack at all.
+  def pop_to_d(self):
+    if not self.cached:
+      self.emit("@SP", "AM=M-1", "D=M")
+
+    self.cached = False
+
+
+  # Point A at segment[index], leaving D alone.
+  # Only for pointer segments with small offsets, or direct segments.
+  def address_into_a(self, segment, index):
+    if segment in POINTER_SEGMENTS:
+      self.emit(f"@{POINTER_SEGMENTS[segment]}", "A=M+1" if index else "A=M")
+      self.emit(*["A=A+1"] * (index - 1))
+    elif segment == "static":
+      self.emit(f"@{self.class_name}.{index}")
+    elif segment == "temp":
+      self.emit(f"@R{TEMP_BASE + index}")
+    elif segment == "pointer":
+      self.emit("@THAT" if index else "@THIS")
+    else:
+      raise AssertionError(f"Invalid segment: {segment}")
+
+
+  def write_push(self, segment, index):
+    self.flush()
+
+    if segment == "constant":
+      if index in (0, 1):
+        self.emit(f"D={index}")
+      else:
+        self.emit(f"@{index}", "D=A")
+    elif segment in POINTER_SEGMENTS and index > PUSH_OFFSET_LIMIT:
+      self.emit(f"@{POINTER_SEGMENTS[segment]}", "D=M", f"@{index}", "A=D+A", "D=M")
+    else:
+      self.address_into_a(segment, index)
+      self.emit("D=M")
+
+    self.cached = True
+
+
+  def write_pop(self, segment, index):
+    if segment in POINTER_SEGMENTS and index > POP_OFFSET_LIMIT:
+      # Work the address out first, while D is free.
+      if self.cached:
+        self.emit("@R13", "M=D")
+
+      self.emit(f"@{POINTER_SEGMENTS[segment]}", "D=M", f"@{index}", "D=D+A", "@R14", "M=D")
+
+      if self.cached:
+        self.emit("@R13", "D=M")
+        self.cached = False
+      else:
+        self.pop_to_d()
+
+      self.emit("@R14", "A=M", "M=D")
+    else:
+      self.pop_to_d()
+      self.address_into_a(segment, index)
+      self.emit("M=D")
+
+
+  ###################################################
+  # ARITHMETIC
+  ###################################################
+
+
+  # x op y, where y is the top of the stack and x is just below it.
+  def write_binary(self, operation):
+    self.pop_to_d()
+    self.emit("@SP", "AM=M-1", operation)
+    self.cached = True
+
+
+  def write_unary(self, operation):
+    self.pop_to_d()
+    self.emit(operation)
+    self.cached = True
+
+
+  # eq, gt, or lt, leaving true (-1) or false (0) in D.
+  #
+  # x - y can overflow (32767 - -32767 wraps around to a negative number),
+  # so for gt and lt we only subtract when x and y have the same sign.
+  # When their signs differ, the negative one is the smaller, whatever its size.
+  # Either way, D ends up with the same sign as the true difference, and we jump on that.
+  def write_comparison(self, jump):
+    prefix = f"$CMP{self.comparison_counter}"
+    true_label = f"{prefix}.TRUE"
+    end_label = f"{prefix}.END"
+    self.comparison_counter += 1
+
+    if jump == "JEQ":
+      # Equality doesn't care about overflow: x - y is 0 exactly when x = y.
+      self.write_binary(BINARY_OPERATIONS["sub"])
+    else:
+      self.pop_to_d()
+      self.emit(
+        "@R13", "M=D",
+        "@SP", "AM=M-1", "D=M",
+        f"@{prefix}.NEGATIVE", "D;JLT",
+        # x >= 0: if y < 0 too, x > y.
+        "@R13", "D=M", f"@{prefix}.SAME", "D;JGE",
+        "D=1", f"@{prefix}.DECIDE", "0;JMP",
+        # x < 0: if y >= 0, x < y.
+        f"({prefix}.NEGATIVE)",
+        "@R13", "D=M", f"@{prefix}.SAME", "D;JLT",
+        "D=-1", f"@{prefix}.DECIDE", "0;JMP",
+        # Same signs, so x - y can't overflow.
+        f"({prefix}.SAME)",
+        "@SP", "A=M", "D=M", "@R13", "D=D-M",
+        f"({prefix}.DECIDE)"
+      )
+
+    self.emit(
+      f"@{true_label}", f"D;{jump}",
+      "D=0", f"@{end_label}", "0;JMP",
+      f"({true_label})", "D=-1",
+      f"({end_label})"
+    )
+    self.cached = True
+
+
+  ###################################################
+  # CONTROL FLOW
+  ###################################################
+
+
+  # VM labels are local to their function.
+  def label_name(self, label):
+    return f"{self.function_name}${label}"
+
+
+  def write_label(self, label):
+    self.flush()
+    self.emit(f"({self.label_name(label)})")
+
+
+  def write_goto(self, label):
+    self.flush()
+    self.emit(f"@{self.label_name(label)}", "0;JMP")
+
+
+  def write_if(self, label):
+    self.pop_to_d()
+    self.emit(f"@{self.label_name(label)}", "D;JNE")
+
+
+  def write_function(self, name, local_count):
+    # Every function ends in a jump or a return, so nothing is ever cached here.
+    self.cached = False
+    self.function_name = name
+
+    self.emit(f"({name})")
+
+    # Zero the locals, then move SP past them in one go.
+    if local_count:
+      self.emit("@SP", "A=M", "M=0")
+
+      for _ in range(local_count - 1):
+        self.emit("A=A+1", "M=0")
+
+      self.emit("D=A+1", "@SP", "M=D")
+
+
+  def write_call(self, name, arg_count):
+    self.flush()
+
+    return_label = f"{self.function_name}$ret.{self.return_counter}"
+    self.return_counter += 1
+
+    self.write_call_to(name, arg_count, return_label)
+    self.emit(f"({return_label})")
+
+
+  # Load $CALL's parameters and jump to it.
+  def write_call_to(self, name, arg_count, return_label):
+    if arg_count in (0, 1):
+      self.emit("@R13", f"M={arg_count}")
+    else:
+      self.emit(f"@{arg_count}", "D=A", "@R13", "M=D")
+
+    self.emit(
+      f"@{name}", "D=A", "@R14", "M=D",
+      f"@{return_label}", "D=A",
+      "@$CALL", "0;JMP"
+    )
+
+
+  def write_return(self):
+    self.pop_to_d()
+    self.emit("@$RETURN", "0;JMP")
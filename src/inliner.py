@@ -0,0 +1,232 @@
+"""
+Inliner
+
+Replace calls to small subroutines with a copy of their code.
+
+Jack classes are full of one-line getters and wrappers:
+
+  method int getX() { return x; }
+
+compiles to three VM instructions, but every call to it still pays for
+a full call/return frame, which is far more Hack code than the getter itself.
+
+Once every class in the program has been compiled, we know every subroutine's code,
+so we can paste small ones straight into their callers, across classes.
+The callee's arguments and locals move into fresh locals at the end of the caller's frame:
+
+  call Square.getX 1       pop local 3           // this, the only argument
+                     ->    push pointer 0        // save the caller's this
+                           pop local 4
+                           push local 3          // the getter's body, remapped
+                           pop pointer 0
+                           push this 0
+                           push local 4          // restore the caller's this
+                           pop pointer 0
+
+and the caller's "function" line is updated to declare the extra locals.
+
+We only inline callees that are:
+- straight-line code (no labels or jumps), ending in their one and only return
+- no longer than the budget, in VM instructions, once pasted in: that counts the code
+  that moves the arguments into locals, zeroes the callee's locals, and saves the pointers,
+  not just the callee's body
+- cheaper inlined than called, by our rough cycle estimate
+- from the same class as the caller, if they use static variables,
+  since statics belong to the .vm file they're compiled into
+"""
+
+
+from strength_reduction import cost_of_all
+from tree_shaking import split_functions
+from vm_instruction import (
+  VMInstruction,
+  PUSH,
+  POP,
+  LABEL,
+  GOTO,
+  IF_GOTO,
+  FUNCTION,
+  CALL,
+  RETURN
+)
+
+
+# The default budget, in VM instructions, for the code that replaces a call.
+DEFAULT_BUDGET = 12
+
+# Commands that make a subroutine something other than straight-line code.
+BRANCHES = frozenset([LABEL, GOTO, IF_GOTO])
+
+# Roughly how many Hack instructions a call costs: pushing the return address
+# and the caller's frame, jumping to the callee, and then restoring it all on return.
+CALL_FRAME_COST = 100
+
+
+# Determine whether a subroutine's code could be inlined within the given budget.
+# The body alone has to fit; inline_calls() checks the code each call actually expands to.
+def is_inlinable(body, budget):
+  if len(body) - 2 > budget or body[-1].command != RETURN:
+    return False
+
+  return all(
+    instruction.command not in BRANCHES and instruction.command != RETURN
+    for instruction in body[1:-1]
+  )
+
+
+# Determine whether a subroutine's code touches the given segment.
+def uses_segment(body, segment):
+  return any(
+    instruction.command in (PUSH, POP) and instruction.arg1 == segment
+    for instruction in body
+  )
+
+
+# Return the highest argument index a subroutine's code uses, or -1 if none.
+def max_argument(body):
+  return max(
+    (instruction.arg2 for instruction in body if instruction.command in (PUSH, POP) and instruction.arg1 == "argument"),
+    default = -1
+  )
+
+
+# Return the code that replaces a call to the given callee,
+# with the callee's frame starting at local number base.
+# Returns (code, locals used).
+def expand(body, arg_count, base):
+  callee_locals = body[0].arg2
+  local_base = base + arg_count
+
+  # The pointers the callee changes, which we need to save and restore around it.
+  saved_pointers = [
+    index for index in (0, 1)
+    if any(instruction == VMInstruction(POP, "pointer", index) for instruction in body)
+  ]
+  save_base = local_base + callee_locals
+
+  code = []
+
+  # The arguments are on the stack, last one on top.
+  for index in reversed(range(arg_count)):
+    code.append(VMInstruction(POP, "local", base + index))
+
+  # A real call starts its locals off at 0, so we do too.
+  for index in range(callee_locals):
+    code.append(VMInstruction(PUSH, "constant", 0))
+    code.append(VMInstruction(POP, "local", local_base + index))
+
+  for offset, index in enumerate(saved_pointers):
+    code.append(VMInstruction(PUSH, "pointer", index))
+    code.append(VMInstruction(POP, "local", save_base + offset))
+
+  for instruction in body[1:-1]:
+    if instruction.command in (PUSH, POP) and instruction.arg1 == "argument":
+      instruction = VMInstruction(instruction.command, "local", base + instruction.arg2)
+    elif instruction.command in (PUSH, POP) and instruction.arg1 == "local":
+      instruction = VMInstruction(instruction.command, "local", local_base + instruction.arg2)
+
+    code.append(instruction)
+
+  # The return value is on top of the stack, and stays there.
+  for offset, index in enumerate(saved_pointers):
+    code.append(VMInstruction(PUSH, "local", save_base + offset))
+    code.append(VMInstruction(POP, "pointer", index))
+
+  return code, arg_count + callee_locals + len(saved_pointers)
+
+
+# Inline small subroutines across a whole program,
+# given as a dict mapping each file to its instructions.
+#
+# Returns (programs, inlined), where programs maps each file to its new instructions,
+# and inlined maps each file to a dict of {caller: (calls inlined, estimated cycles saved)}.
+def inline(programs, budget = DEFAULT_BUDGET):
+  functions = {jack_file: split_functions(instructions) for jack_file, instructions in programs.items()}
+
+  owners = {}
+  candidates = {}
+
+  for jack_file, class_functions in functions.items():
+    for name, body in class_functions.items():
+      owners[name] = jack_file
+
+      if is_inlinable(body, budget):
+        candidates[name] = body
+
+  inlined_programs = {}
+  inlined = {}
+
+  for jack_file, class_functions in functions.items():
+    inlined_programs[jack_file] = []
+    inlined[jack_file] = {}
+
+    for name, body in class_functions.items():
+      body, calls, saved = inline_calls(name, body, jack_file, candidates, owners, budget)
+      inlined_programs[jack_file].extend(body)
+
+      if calls:
+        inlined[jack_file][name] = (calls, saved)
+
+  return inlined_programs, inlined
+
+
+# Inline every eligible call in one subroutine.
+# Every inlined call reuses the same extra locals, since their frames never overlap:
+# each one is finished with its locals before the next one starts.
+#
+# Returns (new body, calls inlined, estimated cycles saved).
+def inline_calls(name, body, jack_file, candidates, owners, budget = DEFAULT_BUDGET):
+  header = body[0]
+  new_body = [header]
+  extra_locals = 0
+  calls = 0
+  saved = 0
+
+  for instruction in body[1:]:
+    callee = candidates.get(instruction.arg1) if instruction.command == CALL else None
+
+    if callee is not None and can_inline(name, instruction, callee, jack_file, owners):
+      code, used = expand(callee, instruction.arg2, header.arg2)
+
+      # The callee's body runs either way; what we trade is the call frame
+      # for the code that shuffles its arguments and locals around.
+      call_saved = CALL_FRAME_COST - cost_of_all(code) + cost_of_all(callee[1:-1])
+
+      if len(code) <= budget and call_saved > 0:
+        new_body.extend(code)
+
+        extra_locals = max(extra_locals, used)
+        calls += 1
+        saved += call_saved
+        continue
+
+    new_body.append(instruction)
+
+  if extra_locals:
+    new_body[0] = VMInstruction(FUNCTION, header.arg1, header.arg2 + extra_locals)
+
+  return new_body, calls, saved
+
+
+# Determine whether a particular call can be replaced by its callee's code.
+def can_inline(caller, call, callee, jack_file, owners):
+  callee_name = call.arg1
+
+  # Recursion can't be straight-line code, but let's not find out the hard way.
+  if callee_name == caller:
+    return False
+
+  if owners[callee_name] != jack_file and uses_segment(callee, "static"):
+    return False
+
+  # A callee that reads arguments it wasn't passed is broken anyway;
+  # leave it as a call, so it breaks the same way.
+  return max_argument(callee) < call.arg2
+
+
+# Describe what was inlined into one file, for the compile report.
+def describe(inlined):
+  return [
+    f"inlining replaced {calls} calls in {name}, saving ~{saved} cycles per pass"
+    for name, (calls, saved) in inlined.items()
+  ]
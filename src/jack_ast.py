@@ -0,0 +1,131 @@
+"""
+FlatAST
+
+A compact abstract syntax tree for a single Jack class.
+
+Rather than one Python object (or dict) per node, the tree lives in four parallel arrays,
+one entry per node:
+- kinds: what sort of node it is (see NODE KINDS below)
+- tokens: the index of the node's defining token in the JackTokenizer's token arrays
+- first_children: the node's first child, or NONE
+- next_siblings: the node's next sibling, or NONE
+
+A node is just an index into these arrays.
+Nodes are created children-first, so building the tree never needs to move anything.
+"""
+
+
+from array import array
+
+
+NONE = -1
+
+
+# NODE KINDS
+# The token column holds the token noted next to each kind.
+CLASS = 0               # class name        children: CLASS_VAR_DEC*, SUBROUTINE*
+CLASS_VAR_DEC = 1       # field/static      children: TYPE, NAME+
+SUBROUTINE = 2          # constructor/...   children: TYPE, NAME, PARAMETER_LIST, VAR_DEC*, STATEMENTS
+PARAMETER_LIST = 3      # (                 children: (TYPE, NAME)*
+VAR_DEC = 4             # var               children: TYPE, NAME+
+TYPE = 5                # type name
+NAME = 6                # identifier
+STATEMENTS = 7          # {                 children: statements
+LET = 8                 # variable name     children: expression
+IF = 9                  # if                children: expression, STATEMENTS, STATEMENTS?
+WHILE = 10              # while             children: expression, STATEMENTS
+DO = 11                 # do                children: CALL
+RETURN = 12             # return            children: expression?
+BINARY = 13             # operator          children: expression, expression
+UNARY = 14              # operator          children: expression
+INT_CONSTANT = 15       # integer
+STRING_CONSTANT = 16    # string
+KEYWORD_CONSTANT = 17   # true/false/null/this
+VARIABLE = 18           # variable name
+ARRAY_ACCESS = 19       # array name        children: expression
+CALL = 20               # first identifier  children: NAME? (the method, if prefixed), EXPRESSION_LIST
+EXPRESSION_LIST = 21    # (                 children: expressions
+
+
+KIND_NAMES = [
+  "class",
+  "classVarDec",
+  "subroutine",
+  "parameterList",
+  "varDec",
+  "type",
+  "name",
+  "statements",
+  "let",
+  "if",
+  "while",
+  "do",
+  "return",
+  "binary",
+  "unary",
+  "integerConstant",
+  "stringConstant",
+  "keywordConstant",
+  "variable",
+  "arrayAccess",
+  "call",
+  "expressionList"
+]
+
+
+class FlatAST:
+  def __init__(self):
+    self.kinds = array("B")
+    self.tokens = array("i")
+    self.first_children = array("i")
+    self.next_siblings = array("i")
+
+    # The root CLASS node, once parsing is done.
+    self.root = NONE
+
+
+  # Create a node whose children are the given (already created) nodes, in order.
+  def add(self, kind, token, children = ()):
+    node = len(self.kinds)
+
+    self.kinds.append(kind)
+    self.tokens.append(token)
+    self.first_children.append(children[0] if children else NONE)
+    self.next_siblings.append(NONE)
+
+    for child, sibling in zip(children, children[1:]):
+      self.next_siblings[child] = sibling
+
+    return node
+
+
+  # Return a node's children, in order.
+  def children(self, node):
+    children = []
+    child = self.first_children[node]
+
+    while child != NONE:
+      children.append(child)
+      child = self.next_siblings[child]
+
+    return children
+
+
+  def __len__(self):
+    return len(self.kinds)
+
+
+  # The memory used by the node arrays themselves.
+  def nbytes(self):
+    return sum(column.itemsize * len(column) for column in (self.kinds, self.tokens, self.first_children, self.next_siblings))
+
+
+  # Render the tree as indented text, for debugging.
+  def dump(self, token_values, node = None, depth = 0):
+    node = self.root if node is None else node
+    lines = [f"{'  ' * depth}{KIND_NAMES[self.kinds[node]]} {token_values[self.tokens[node]]}"]
+
+    for child in self.children(node):
+      lines.append(self.dump(token_values, child, depth + 1))
+
+    return "\n".join(lines)
@@ -4,88 +4,437 @@ JackCompiler
 Given the path for a single .jack file or directory of .jack files:
 - Create a JackTokenizer for each .jack file
 - Use SymbolTable, CompilationEngine, and VMWriter to write the VM code into the output .vm file
+
+Every Jack class compiles independently into its own .vm file,
+so with jobs > 1 the files are spread across a pool of worker processes.
+Results always come back in file order, so output and error reports
+are the same no matter how many jobs we use.
+
+With the optimize option, each class's VM code also goes through
+constant folding, strength reduction, and the peephole optimizer.
+
+In incremental mode, a BuildCache manifest next to the outputs lets us
+skip any file whose source and .vm output haven't changed since the last build.
+
+The whole-program options (inlining and tree shaking) hold off writing anything
+until every file has compiled. Then small subroutines are inlined into their callers
+(see inliner.py), unreachable ones are shaken out (see tree_shaking.py),
+and each class's remaining code is written out.
+With the vmb backend, each class is written as compact binary VM code (see vm_binary.py),
+and with the asm backend, the whole program is translated into a single
+Hack .asm file instead (see hack_writer.py).
+
+compile_source() and compile_many() do the same work on source text in memory,
+without reading or writing any files. The JackCompiler (and so the command line)
+is a thin layer of file handling on top of the same CompileSession.
 """
 
 
+import concurrent.futures
+import itertools
 import os
-import re
 
-from jack_tokenizer import JackTokenizer
-from vm_writer import VMWriter
-from compilation_engine import CompilationEngine
+import inliner
+import tree_shaking
+from atomic_file import write_atomically
+from build_cache import BuildCache, compiler_fingerprint
+from compile_options import CompileOptions
+from compile_session import CompileSession
+from hack_writer import HackWriter, asm_file_for
+import vm_binary
+from vm_instruction import serialize, parse
+from vm_writer import vm_file_for
+from tracer import Tracer, DEFAULT_RING_SIZE
+
+
+# The outcome of compiling a single .jack file (or, in memory, a single class's source).
+class CompileResult:
+  __slots__ = ("jack_file", "error", "skipped", "notes", "instructions", "profile", "trace_events", "trace_counters")
+
+  def __init__(self, jack_file, error = None, skipped = False):
+    self.jack_file = jack_file
+
+    # A "ExceptionType: message" string if compilation failed.
+    self.error = error
+
+    # Whether the file was up to date and never recompiled.
+    self.skipped = skipped
+
+    # Human-readable notes from optimization passes, e.g. how much they removed.
+    self.notes = []
+
+    # The compiled VMInstructions.
+    # Compiling to files, they're dropped once written to the .vm file
+    # (with the whole-program options, that's once the whole program is linked).
+    self.instructions = None
+
+    # Where the time went, as a FileProfile, when profiling.
+    self.profile = None
+
+    # Trace data collected in a worker process, to be replayed by the parent's tracer.
+    self.trace_events = []
+    self.trace_counters = {}
+
+
+  # Return the compiled VM code as text.
+  def getvalue(self):
+    return serialize(self.instructions)
+
+
+# Raised once every file has been attempted, if any of them failed.
+class CompilationError(Exception):
+  def __init__(self, failures):
+    self.failures = failures
+
+    super().__init__("\n".join(f"{result.jack_file}: {result.error}" for result in failures))
 
 
 class JackCompiler:
-  def __init__(self, argv1):
+  def __init__(self, argv1, tracer = None, jobs = 1, incremental = False, options = None, profiler = None):
+    self.tracer = tracer or Tracer()
+    self.options = options or CompileOptions()
+    self.profiler = profiler
+    self.argv1 = argv1
+
+    # jobs = 0 means "one job per CPU".
+    self.jobs = jobs or os.cpu_count() or 1
+
     self.jack_files = self.handle_file_vs_dir(argv1)
 
-    for jack_file in self.jack_files:
-      self.jack_input = ""
-      self.xml_output = ""
+    # Without a cache, every file is stale.
+    self.build_cache = self.load_build_cache(argv1) if incremental else None
+    stale_files = [jack_file for jack_file in self.jack_files if not self.is_fresh(jack_file)]
+
+    if self.jobs > 1 and len(stale_files) > 1:
+      compiled = self.compile_in_parallel(stale_files)
+    else:
+      session = CompileSession(self.options, self.tracer)
+      compiled = [compile_file(jack_file, self.tracer, self.options, self.profiler, session) for jack_file in stale_files]
+
+    # Stitch the compiled and skipped files back together, in file order.
+    compiled = {result.jack_file: result for result in compiled}
+    self.results = [
+      compiled.get(jack_file) or CompileResult(jack_file, skipped = True)
+      for jack_file in self.jack_files
+    ]
 
-      with open(jack_file) as file:
-        for line in file.readlines():
-          self.jack_input += self.strip_comment_from_line(line)
+    failures = [result for result in self.results if result.error]
 
-      self.strip_newlines()
-      self.strip_multiline_comments()
+    # A program with errors in it has no reliable call graph,
+    # so we don't write anything at all.
+    linked = self.options.whole_program() and not failures
 
-      self.build_tokenizer()
-      self.build_vm_writer(jack_file)
+    if linked:
+      if self.profiler:
+        self.profiler.time_phase("link", self.link_and_write)
+      else:
+        self.link_and_write()
 
-      self.run_compilation_engine()
+    # The asm backend doesn't write a file per class, so there's nothing to record.
+    # Neither is there when the whole-program link didn't run: no outputs were written.
+    if self.build_cache and self.options.backend != "asm" and (linked or not self.options.whole_program()):
+      self.update_build_cache()
 
-      self.vm_writer.close()
+    if failures:
+      raise CompilationError(failures)
 
 
   # Given a Jack file name or a directory of Jack files,
   # return an array of Jack file names.
   def handle_file_vs_dir(self, argv1):
-    if os.path.isdir(argv1):
-      return [
-        f"{argv1}/{file}"
-        for file in os.listdir(argv1)
-        if len(file) > 5 and file[-5:] == '.jack'
-      ]
-    else:
-      return [argv1]
+    return find_jack_files(argv1)
+
+
+  # Load the build cache that lives alongside the output .vm files.
+  def load_build_cache(self, argv1):
+    directory = argv1 if os.path.isdir(argv1) else os.path.dirname(argv1)
+
+    return BuildCache(directory or ".", compiler_fingerprint(self.options.fingerprint()))
+
+
+  # Determine whether a file's existing output can be reused.
+  #
+  # With the whole-program options, what ends up in one class's .vm file
+  # depends on every other class, so we always need the whole program's code.
+  def is_fresh(self, jack_file):
+    if self.options.whole_program():
+      return False
+
+    return self.build_cache is not None and self.build_cache.is_fresh(jack_file, output_file_for(jack_file, self.options))
+
+
+  # Run the whole-program passes over every class's code, then write out each class's .vm file
+  # (or the program's .asm file).
+  # A class with nothing left in it gets an empty .vm file,
+  # so a stale one from an earlier build doesn't linger.
+  def link_and_write(self):
+    link(self.results, self.options)
+
+    if self.options.backend == "asm":
+      return self.write_asm()
+
+    for result in self.results:
+      write_output(result, self.options)
+
+      if self.tracer.enabled:
+        self.tracer.event("link", result.jack_file)
+
+
+  # Translate the whole program into Hack assembly, in a single .asm file.
+  #
+  # Any other .vm files alongside the .jack files (such as the OS's) are translated with it,
+  # so the .asm file is a complete ROM image.
+  # Translation errors (such as calls to functions that aren't anywhere)
+  # are reported against the .asm file.
+  def write_asm(self):
+    asm_file = asm_file_for(self.argv1)
+    classes = [(class_name_of(result.jack_file), result.instructions) for result in self.results]
+    classes.extend(read_library_classes(os.path.dirname(asm_file), [name for name, _ in classes]))
+
+    hack_writer = HackWriter()
+
+    try:
+      hack_writer.write_program(classes)
+    except AssertionError as error:
+      raise CompilationError([CompileResult(asm_file, error = f"{type(error).__name__}: {error}")])
+
+    write_atomically(asm_file, hack_writer.getvalue())
+
+    for result in self.results:
+      result.instructions = None
+
+    self.results[0].notes.append(f"wrote {asm_file}: {hack_writer.rom_size()} Hack instructions")
+
+    if self.tracer.enabled:
+      self.tracer.event("link", asm_file)
+
+
+  # Record every file whose output was written in the build cache, and forget every other.
+  def update_build_cache(self):
+    for result in self.results:
+      if result.skipped:
+        continue
+
+      output_file = output_file_for(result.jack_file, self.options)
+
+      # Only outputs that were actually written can be reused next time.
+      written = not result.error and os.path.exists(output_file)
+
+      if written:
+        self.build_cache.record(result.jack_file, output_file)
+      else:
+        self.build_cache.forget(result.jack_file)
+
+      if self.tracer.enabled:
+        self.tracer.event("cache", f"{'record' if written else 'forget'} {result.jack_file}")
+
+    self.build_cache.save()
+
+
+  # Compile the given files in a process pool.
+  # executor.map() hands results back in submission order, not completion order.
+  def compile_in_parallel(self, jack_files):
+    tracing = self.tracer.enabled
+    workers = min(self.jobs, len(jack_files))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers = workers) as executor:
+      results = list(executor.map(
+        compile_file_in_worker,
+        jack_files,
+        itertools.repeat(tracing),
+        itertools.repeat(self.options),
+        itertools.repeat(self.profiler)
+      ))
+
+    # Replay each worker's trace into our own tracer, in file order.
+    if tracing:
+      for result in results:
+        self.tracer.replay(result.trace_events, result.trace_counters)
+
+    return results
+
+
+# Given a Jack file name or a directory of Jack files,
+# return an array of Jack file names.
+# Directory listings are sorted so every run sees the files in the same order.
+def find_jack_files(argv1):
+  if os.path.isdir(argv1):
+    return [
+      f"{argv1}/{file}"
+      for file in sorted(os.listdir(argv1))
+      if len(file) > 5 and file[-5:] == '.jack'
+    ]
+  else:
+    return [argv1]
+
+
+# Return the class a .jack or .vm file holds, going by its name.
+def class_name_of(path):
+  return os.path.splitext(os.path.basename(path))[0]
+
+
+# Return the file a .jack file's code is written to: its .vm file, or its .vmb file.
+def output_file_for(jack_file, options):
+  vm_file = vm_file_for(jack_file)
+
+  return vm_file + "b" if options.backend == "vmb" else vm_file
+
+
+# Write a compiled class's code to its .vm (or .vmb) file, and let go of its instructions.
+def write_output(result, options):
+  if options.backend == "vmb":
+    write_atomically(output_file_for(result.jack_file, options), vm_binary.encode(result.instructions))
+  else:
+    write_atomically(vm_file_for(result.jack_file), result.getvalue())
+
+  result.instructions = None
+
+
+# Read every .vm or .vmb file in a directory that isn't one of the given classes,
+# and return them as a list of (class name, instructions), in file name order.
+# If a class has both, the .vmb file wins.
+def read_library_classes(directory, class_names):
+  libraries = {}
+
+  for file in sorted(os.listdir(directory or ".")):
+    class_name, extension = os.path.splitext(file)
+    path = os.path.join(directory, file)
+
+    if class_name in class_names:
+      continue
+
+    if extension == ".vmb":
+      with open(path, "rb") as vmb_file:
+        libraries[class_name] = vm_binary.decode(vmb_file.read())
+    elif extension == ".vm" and class_name not in libraries:
+      with open(path) as vm_file:
+        libraries[class_name] = parse(vm_file.read())
+
+  return list(libraries.items())
+
+
+# Compile a single .jack file into its .vm file.
+#
+# Errors are caught and recorded on the result rather than raised,
+# so one bad file doesn't stop the others from compiling.
+#
+# With a Profiler, each phase is timed on the result's FileProfile.
+# Pass a CompileSession to reuse it, instead of building one just for this file.
+def compile_file(jack_file, tracer, options = None, profiler = None, session = None):
+  options = options or CompileOptions()
+  result = CompileResult(jack_file)
+  profile = result.profile = profiler.start_file(jack_file) if profiler else None
+
+  try:
+    if tracer.enabled:
+      tracer.event("read", jack_file)
+
+    jack_input = read_jack_file(jack_file)
+
+    if profile:
+      profile.lap("read")
+
+    (session or CompileSession(options, tracer)).compile(jack_input, result, profile)
+
+    # With the whole-program options, the JackCompiler writes the file once it has the whole program.
+    if not options.whole_program():
+      write_output(result, options)
+
+      if profile:
+        profile.lap("write")
+  except Exception as error:
+    result.error = f"{type(error).__name__}: {error}"
+
+  return result
+
+
+# The process pool's entry point.
+# Tracers can't cross process boundaries, so each worker traces into its own
+# ring buffer and ships the events back on the result.
+def compile_file_in_worker(jack_file, tracing, options, profiler):
+  tracer = Tracer(ring_size = DEFAULT_RING_SIZE) if tracing else Tracer()
+
+  result = compile_file(jack_file, tracer, options, profiler)
+
+  if tracing:
+    result.trace_events = tracer.recent_events()
+    result.trace_counters = dict(tracer.counters)
+
+  return result
+
 
+# Compile one class's source text in memory, and return its CompileResult.
+# result.instructions holds the VMInstructions, and result.getvalue() the VM code.
+#
+# The whole-program options apply, but with only one class to look at.
+# Raises a CompilationError if the source doesn't compile.
+def compile_source(source, options = None, name = "Main"):
+  return compile_many({name: source}, options)[name]
 
-  # Remove comments from a given line of Jack code.
-  def strip_comment_from_line(self, line):
-    # Strip everything after //
-    line = re.sub(r"//(.*)", "", line)
 
-    # Strip everything between /* */ and /** */
-    return re.sub(r"/\*\*?(.*)\*/", "", line)
+# Compile a batch of classes in memory.
+# Takes a dict mapping each class name to its source text,
+# and returns a dict mapping each class name to its CompileResult, in the same order.
+#
+# Every class is compiled by the same CompileSession, so the tokenizer, VMWriter,
+# and CompilationEngine are only built once for the whole batch.
+# With the whole-program options, the batch is treated as one program.
+#
+# Like the JackCompiler, every class is attempted before a CompilationError is raised.
+def compile_many(sources, options = None, tracer = None):
+  options = options or CompileOptions()
+  session = CompileSession(options, tracer)
+  results = {}
 
+  for name, source in sources.items():
+    result = results[name] = CompileResult(name)
 
-  # Remove multiline comments.
-  def strip_multiline_comments(self):
-    self.jack_input = re.sub(r"/\*\*?(.*?)\*/", "", self.jack_input)
+    try:
+      session.compile(source, result)
+    except Exception as error:
+      result.error = f"{type(error).__name__}: {error}"
 
+  failures = [result for result in results.values() if result.error]
 
-  # Remove newlines.
-  def strip_newlines(self):
-    self.jack_input = re.sub("\n", "", self.jack_input)
+  if failures:
+    raise CompilationError(failures)
 
+  if options.whole_program():
+    link(list(results.values()), options)
 
-  # Initialize the JackTokenizer.
-  def build_tokenizer(self):
-    self.tokenizer = JackTokenizer(self.jack_input)
+  return results
 
 
-  # Initialize the JackTokenizer.
-  def build_vm_writer(self, jack_file):
-    self.vm_writer = VMWriter(jack_file)
+# Run the whole-program passes over every result's instructions, in place,
+# noting what each pass did on the results.
+#
+# Inlining goes first, so that subroutines which were only ever inlined can be shaken out.
+def link(results, options):
+  programs = {result.jack_file: result.instructions for result in results}
+  inlined = removed = {}
 
+  if options.inline_budget:
+    programs, inlined = inliner.inline(programs, options.inline_budget)
 
-  # Run the CompilationEngine.
-  def run_compilation_engine(self):
-    CompilationEngine(self.tokenizer, self.vm_writer).run()
+  if options.tree_shake:
+    programs, removed = tree_shaking.shake(programs)
 
+    if removed is None:
+      results[0].notes.append("tree shaking skipped: the program has no Main.main or Sys.init")
 
+  for result in results:
+    if inlined:
+      result.notes.extend(inliner.describe(inlined[result.jack_file]))
 
+    if removed and removed[result.jack_file]:
+      result.notes.append(tree_shaking.describe(removed[result.jack_file]))
 
+    result.instructions = programs[result.jack_file]
 
 
+# Read a Jack file in one go.
+# Comments and white space are left in place; the JackTokenizer skips them
+# while keeping track of each token's line and column.
+def read_jack_file(jack_file):
+  with open(jack_file) as file:
+    return file.read()
@@ -0,0 +1,37 @@
+"""
+Jack grammar
+
+The parts of the Jack grammar the parsers decide things with,
+as frozen sets and tables built once at import time.
+
+Both front ends (the CompilationEngine and the JackParser) look tokens up here,
+instead of comparing them against one string after another,
+or building a new list to test membership on every call.
+
+See "Program structure", "Statements", and "Expressions" in jack-grammer.png
+"""
+
+
+from jack_tokenizer import BINARY_OPS, UNARY_OPS
+
+
+# classVarDec: ('static' | 'field') type varName (',' varName)* ';'
+CLASS_VAR_KINDS = frozenset(["field", "static"])
+
+# subroutineDec: ('constructor' | 'function' | 'method') ('void' | type) subroutineName ...
+SUBROUTINE_KINDS = frozenset(["constructor", "function", "method"])
+
+# KeywordConstant: 'true' | 'false' | 'null' | 'this'
+KEYWORD_CONSTANTS = frozenset(["true", "false", "null", "this"])
+
+# The keyword constants that are simply pushed as 0.
+ZERO_CONSTANTS = frozenset(["null", "false"])
+
+BINARY_OP_SET = frozenset(BINARY_OPS)
+UNARY_OP_SET = frozenset(UNARY_OPS)
+
+# subroutineCall: subroutineName '(' ... | (className | varName) '.' subroutineName '(' ...
+CALL_OPENERS = frozenset([".", "("])
+
+# The tokens that end an expressionList.
+EXPRESSION_LIST_ENDS = frozenset([")", "}"])
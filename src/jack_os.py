@@ -0,0 +1,447 @@
+"""
+JackOS
+
+A minimal stand-in for the Jack OS, written in Python, for the VM emulator.
+
+Each OS subroutine is a plain Python method that takes the call's arguments
+and returns its value, so an OS call costs the emulator a single step
+instead of thousands of VM instructions.
+Only subroutines a program doesn't define itself are taken from here,
+so a program can still bring its own (or the real) Memory, Math, and so on.
+
+It's deliberately minimal:
+- Memory hands out heap blocks from a simple bump allocator, and never reuses them.
+- Strings live on the Python side. String.new still allocates a heap block,
+  so every string has its own address, but its characters aren't stored in RAM.
+- Output collects everything printed as text, instead of drawing characters.
+- Screen draws into the screen memory map, one pixel at a time.
+- Keyboard replays a script of key codes: each call to Keyboard.keyPressed
+  returns the next one, and the program halts once the script runs out.
+  That's what lets interactive programs (like Square) run to completion headless.
+"""
+
+
+# The heap, as laid out by the real OS.
+HEAP_BASE = 2048
+HEAP_END = 16384
+
+SCREEN = 16384
+SCREEN_WIDTH = 512
+SCREEN_HEIGHT = 256
+WORDS_PER_ROW = SCREEN_WIDTH // 16
+
+# The real String object has a few fields; we only need an address.
+STRING_SIZE = 3
+
+NEW_LINE = 128
+BACKSPACE = 129
+DOUBLE_QUOTE = 34
+
+# Sys.error codes, from the OS spec.
+ERRORS = {
+  1: "Sys.wait duration must be positive",
+  2: "Array size must be positive",
+  3: "Division by zero",
+  4: "Cannot compute square root of a negative number",
+  5: "Allocated memory size must be positive",
+  6: "Heap overflow",
+  14: "String index out of bounds",
+  17: "Illegal string length"
+}
+
+
+# Raised by an OS subroutine to stop the program: Sys.halt, Sys.error,
+# or the keyboard script running out.
+class Halt(Exception):
+  pass
+
+
+# Wrap a Python int to a signed 16-bit word.
+def word(value):
+  return ((value + 32768) & 0xFFFF) - 32768
+
+
+class JackOS:
+  def __init__(self, ram, keys = ()):
+    self.ram = ram
+    self.keys = list(keys)
+    self.key_index = 0
+
+    self.heap = HEAP_BASE
+    self.strings = {}
+    self.output = []
+    self.color = True
+
+
+  # The OS subroutines, by their Jack names.
+  def functions(self):
+    return {
+      "Memory.alloc": self.alloc,
+      "Memory.deAlloc": self.de_alloc,
+      "Memory.peek": self.peek,
+      "Memory.poke": self.poke,
+      "Array.new": self.array_new,
+      "Array.dispose": self.array_dispose,
+      "Math.multiply": self.multiply,
+      "Math.divide": self.divide,
+      "Math.min": min,
+      "Math.max": max,
+      "Math.abs": self.absolute,
+      "Math.sqrt": self.sqrt,
+      "String.new": self.string_new,
+      "String.dispose": self.string_dispose,
+      "String.length": self.string_length,
+      "String.charAt": self.char_at,
+      "String.setCharAt": self.set_char_at,
+      "String.appendChar": self.append_char,
+      "String.eraseLastChar": self.erase_last_char,
+      "String.intValue": self.int_value,
+      "String.setInt": self.set_int,
+      "String.newLine": lambda: NEW_LINE,
+      "String.backSpace": lambda: BACKSPACE,
+      "String.doubleQuote": lambda: DOUBLE_QUOTE,
+      "Output.moveCursor": self.move_cursor,
+      "Output.printChar": self.print_char,
+      "Output.printString": self.print_string,
+      "Output.printInt": self.print_int,
+      "Output.println": self.println,
+      "Output.backSpace": self.back_space,
+      "Screen.clearScreen": self.clear_screen,
+      "Screen.setColor": self.set_color,
+      "Screen.drawPixel": self.draw_pixel,
+      "Screen.drawLine": self.draw_line,
+      "Screen.drawRectangle": self.draw_rectangle,
+      "Screen.drawCircle": self.draw_circle,
+      "Keyboard.keyPressed": self.key_pressed,
+      "Keyboard.readChar": self.read_char,
+      "Keyboard.readLine": self.read_line,
+      "Keyboard.readInt": self.read_int,
+      "Sys.halt": self.halt,
+      "Sys.error": self.error,
+      "Sys.wait": self.wait
+    }
+
+
+  # Everything printed so far, as text.
+  def text(self):
+    return "".join(self.output)
+
+
+  ###################################################
+  # MEMORY
+  ###################################################
+
+
+  def alloc(self, size):
+    if size <= 0:
+      self.error(5)
+
+    if self.heap + size > HEAP_END:
+      self.error(6)
+
+    address = self.heap
+    self.heap += size
+
+    return address
+
+
+  def de_alloc(self, address):
+    pass
+
+
+  def peek(self, address):
+    return self.ram[address]
+
+
+  def poke(self, address, value):
+    self.ram[address] = value
+
+
+  def array_new(self, size):
+    if size <= 0:
+      self.error(2)
+
+    return self.alloc(size)
+
+
+  def array_dispose(self, address):
+    pass
+
+
+  ###################################################
+  # MATH
+  ###################################################
+
+
+  def multiply(self, x, y):
+    return word(x * y)
+
+
+  def divide(self, x, y):
+    if y == 0:
+      self.error(3)
+
+    # Jack division truncates toward zero.
+    quotient = abs(x) // abs(y)
+    return word(quotient if (x < 0) == (y < 0) else -quotient)
+
+
+  def absolute(self, x):
+    return word(abs(x))
+
+
+  def sqrt(self, x):
+    if x < 0:
+      self.error(4)
+
+    root = 0
+    while (root + 1) * (root + 1) <= x:
+      root += 1
+
+    return root
+
+
+  ###################################################
+  # STRING
+  ###################################################
+
+
+  def string_new(self, max_length):
+    if max_length < 0:
+      self.error(17)
+
+    address = self.alloc(STRING_SIZE)
+    self.strings[address] = []
+
+    return address
+
+
+  def string_dispose(self, address):
+    self.strings.pop(address, None)
+
+
+  def string_length(self, address):
+    return len(self.strings[address])
+
+
+  def char_at(self, address, index):
+    characters = self.strings[address]
+
+    if not 0 <= index < len(characters):
+      self.error(14)
+
+    return characters[index]
+
+
+  def set_char_at(self, address, index, character):
+    characters = self.strings[address]
+
+    if not 0 <= index < len(characters):
+      self.error(14)
+
+    characters[index] = character
+
+
+  def append_char(self, address, character):
+    self.strings[address].append(character)
+    return address
+
+
+  def erase_last_char(self, address):
+    characters = self.strings[address]
+
+    if characters:
+      characters.pop()
+
+
+  def int_value(self, address):
+    characters = self.strings[address]
+    sign = 1
+    value = 0
+    index = 0
+
+    if characters and characters[0] == ord("-"):
+      sign = -1
+      index = 1
+
+    while index < len(characters) and ord("0") <= characters[index] <= ord("9"):
+      value = value * 10 + characters[index] - ord("0")
+      index += 1
+
+    return word(sign * value)
+
+
+  def set_int(self, address, value):
+    self.strings[address] = [ord(character) for character in str(value)]
+
+
+  ###################################################
+  # OUTPUT
+  ###################################################
+
+
+  def move_cursor(self, row, column):
+    pass
+
+
+  def print_char(self, character):
+    if character == NEW_LINE:
+      self.println()
+    elif character == BACKSPACE:
+      self.back_space()
+    else:
+      self.output.append(chr(character))
+
+
+  def print_string(self, address):
+    for character in self.strings[address]:
+      self.print_char(character)
+
+
+  def print_int(self, value):
+    self.output.append(str(value))
+
+
+  def println(self):
+    self.output.append("\n")
+
+
+  def back_space(self):
+    if self.output and self.output[-1] != "\n":
+      self.output.pop()
+
+
+  ###################################################
+  # SCREEN
+  ###################################################
+
+
+  def clear_screen(self):
+    self.ram[SCREEN:SCREEN + SCREEN_HEIGHT * WORDS_PER_ROW] = [0] * (SCREEN_HEIGHT * WORDS_PER_ROW)
+
+
+  def set_color(self, color):
+    self.color = color != 0
+
+
+  def draw_pixel(self, x, y):
+    if not (0 <= x < SCREEN_WIDTH and 0 <= y < SCREEN_HEIGHT):
+      return
+
+    address = SCREEN + y * WORDS_PER_ROW + x // 16
+    bits = self.ram[address] & 0xFFFF
+    mask = 1 << (x % 16)
+    bits = bits | mask if self.color else bits & ~mask
+
+    self.ram[address] = word(bits)
+
+
+  def draw_line(self, x1, y1, x2, y2):
+    # Bresenham's line algorithm.
+    dx = abs(x2 - x1)
+    dy = -abs(y2 - y1)
+    step_x = 1 if x1 < x2 else -1
+    step_y = 1 if y1 < y2 else -1
+    error = dx + dy
+
+    while True:
+      self.draw_pixel(x1, y1)
+
+      if x1 == x2 and y1 == y2:
+        return
+
+      if 2 * error >= dy:
+        error += dy
+        x1 += step_x
+
+      if 2 * error <= dx:
+        error += dx
+        y1 += step_y
+
+
+  def draw_rectangle(self, x1, y1, x2, y2):
+    for y in range(y1, y2 + 1):
+      for x in range(x1, x2 + 1):
+        self.draw_pixel(x, y)
+
+
+  def draw_circle(self, x, y, radius):
+    for dy in range(-radius, radius + 1):
+      dx = 0
+      while (dx + 1) * (dx + 1) + dy * dy <= radius * radius:
+        dx += 1
+
+      for column in range(x - dx, x + dx + 1):
+        self.draw_pixel(column, y + dy)
+
+
+  ###################################################
+  # KEYBOARD
+  ###################################################
+
+
+  def key_pressed(self):
+    if self.key_index == len(self.keys):
+      raise Halt("the keyboard script ran out")
+
+    key = self.keys[self.key_index]
+    self.key_index += 1
+
+    return key
+
+
+  # Wait for a key to be pressed and released, echoing it like the real OS.
+  def read_char(self):
+    key = 0
+    while key == 0:
+      key = self.key_pressed()
+
+    while self.key_index < len(self.keys) and self.keys[self.key_index] == key:
+      self.key_index += 1
+
+    self.print_char(key)
+    return key
+
+
+  def read_line(self, message):
+    self.print_string(message)
+    characters = []
+
+    while True:
+      key = self.read_char()
+
+      if key == NEW_LINE:
+        break
+
+      if key == BACKSPACE:
+        if characters:
+          characters.pop()
+      else:
+        characters.append(key)
+
+    address = self.string_new(len(characters))
+    self.strings[address] = characters
+
+    return address
+
+
+  def read_int(self, message):
+    return self.int_value(self.read_line(message))
+
+
+  ###################################################
+  # SYS
+  ###################################################
+
+
+  def halt(self):
+    raise Halt("Sys.halt")
+
+
+  def error(self, code):
+    raise Halt(f"Sys.error({code}): {ERRORS.get(code, 'unknown error')}")
+
+
+  def wait(self, duration):
+    if duration < 0:
+      self.error(1)
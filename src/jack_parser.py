@@ -0,0 +1,467 @@
+"""
+JackParser
+
+Parse a tokenized Jack class into a FlatAST, without generating any code.
+
+This is the first half of the AST front end; see CodeGenerator for the second half.
+Together they produce exactly the same VM code as the CompilationEngine,
+but having the whole class as a tree in between opens the door to
+whole-function analysis, caching, and generating code in parallel.
+
+The parser reads straight from the JackTokenizer's token arrays,
+so moving to the next token is just an index increment.
+"""
+
+
+from jack_ast import (
+  FlatAST,
+  NONE,
+  CLASS,
+  CLASS_VAR_DEC,
+  SUBROUTINE,
+  PARAMETER_LIST,
+  VAR_DEC,
+  TYPE,
+  NAME,
+  STATEMENTS,
+  LET,
+  IF,
+  WHILE,
+  DO,
+  RETURN,
+  BINARY,
+  UNARY,
+  INT_CONSTANT,
+  STRING_CONSTANT,
+  KEYWORD_CONSTANT,
+  VARIABLE,
+  ARRAY_ACCESS,
+  CALL,
+  EXPRESSION_LIST
+)
+from jack_grammar import (
+  CLASS_VAR_KINDS,
+  SUBROUTINE_KINDS,
+  KEYWORD_CONSTANTS,
+  BINARY_OP_SET,
+  UNARY_OP_SET,
+  CALL_OPENERS,
+  EXPRESSION_LIST_ENDS
+)
+from jack_tokenizer import KEYWORD, SYMBOL, IDENTIFIER, INT_CONST, STRING_CONST
+
+
+# The kinds of frame on parse_expression()'s explicit stack.
+EXPRESSION_FRAME = 0
+UNARY_FRAME = 1
+PAREN_FRAME = 2
+INDEX_FRAME = 3
+CALL_FRAME = 4
+
+# The method that parses each kind of statement, by its keyword.
+STATEMENT_METHODS = {
+  "let": "parse_let",
+  "if": "parse_if",
+  "while": "parse_while",
+  "do": "parse_do",
+  "return": "parse_return"
+}
+
+
+class JackParser:
+  def __init__(self, tokenizer):
+    self.tokenizer = tokenizer
+    self.values = tokenizer.token_values
+    self.types = tokenizer.token_types
+
+    # The index of the current token.
+    self.index = 0
+
+    self.ast = FlatAST()
+
+    self.statement_parsers = {keyword: getattr(self, method) for keyword, method in STATEMENT_METHODS.items()}
+
+
+  # Parse the whole class and return its FlatAST.
+  def parse(self):
+    self.ast.root = self.parse_class()
+
+    return self.ast
+
+
+  ###################################################
+  # TOKEN HELPERS
+  ###################################################
+
+
+  def current(self):
+    return self.values[self.index] if self.index < len(self.values) else ""
+
+
+  def current_type(self):
+    return self.types[self.index] if self.index < len(self.types) else None
+
+
+  def peek(self):
+    index = self.index + 1
+
+    return self.values[index] if index < len(self.values) else ""
+
+
+  # Describe the current token and where it is, for error messages.
+  def found(self):
+    self.tokenizer.seek(self.index)
+
+    return f"{self.tokenizer.current_token} ({self.tokenizer.location()})"
+
+
+  # Assert that the current token has the given type (and value, if given),
+  # then move past it and return its index.
+  def expect(self, typ, value = None):
+    if self.current_type() != typ or (value is not None and self.current() != value):
+      description = f"\"{value}\"" if value is not None else f"a {typ}"
+      raise AssertionError(f"Expected {description} but found: {self.found()}")
+
+    index = self.index
+    self.index += 1
+
+    return index
+
+
+  # Move past the current token, whatever it is, and return its index.
+  def take(self):
+    index = self.index
+    self.index += 1
+
+    return index
+
+
+  ###################################################
+  # PARSER METHODS
+  ###################################################
+
+
+  def parse_class(self):
+    self.expect(KEYWORD, "class")
+    name = self.expect(IDENTIFIER)
+    self.expect(SYMBOL, "{")
+
+    children = []
+
+    while self.current_type() == KEYWORD and self.current() in CLASS_VAR_KINDS:
+      children.append(self.parse_var_dec(CLASS_VAR_DEC))
+
+    while self.current_type() == KEYWORD and self.current() in SUBROUTINE_KINDS:
+      children.append(self.parse_subroutine())
+
+    self.expect(SYMBOL, "}")
+
+    return self.ast.add(CLASS, name, children)
+
+
+  # Parse "field int x, y;", "static int x;", or "var int x, y;".
+  def parse_var_dec(self, kind):
+    keyword = self.take()
+
+    children = [self.ast.add(TYPE, self.take()), self.ast.add(NAME, self.take())]
+
+    while self.current() != ";":
+      self.expect(SYMBOL, ",")
+      children.append(self.ast.add(NAME, self.take()))
+
+    self.take()
+
+    return self.ast.add(kind, keyword, children)
+
+
+  def parse_subroutine(self):
+    keyword = self.take()
+
+    if self.current_type() not in (KEYWORD, IDENTIFIER):
+      raise AssertionError(f"Expected a keyword or identifier as the return type but found: {self.found()}")
+
+    return_type = self.ast.add(TYPE, self.take())
+    name = self.ast.add(NAME, self.expect(IDENTIFIER))
+
+    children = [return_type, name, self.parse_parameter_list()]
+
+    self.expect(SYMBOL, "{")
+
+    while self.current() == "var":
+      children.append(self.parse_var_dec(VAR_DEC))
+
+    children.append(self.parse_statements())
+
+    return self.ast.add(SUBROUTINE, keyword, children)
+
+
+  # Parse "(int x, char y)" into alternating TYPE and NAME children.
+  def parse_parameter_list(self):
+    paren = self.expect(SYMBOL, "(")
+
+    children = []
+    kind = TYPE
+
+    while self.current() != ")":
+      if self.current() != ",":
+        children.append(self.ast.add(kind, self.take()))
+        kind = NAME if kind == TYPE else TYPE
+      else:
+        self.take()
+
+    self.take()
+
+    return self.ast.add(PARAMETER_LIST, paren, children)
+
+
+  # Parse statements up to and including the closing "}".
+  # The opening "{" has already been consumed.
+  def parse_statements(self):
+    brace = self.index - 1
+    children = []
+
+    while self.current() != "}":
+      # Stray symbols (like an extra ";") between statements are skipped.
+      if self.current_type() == SYMBOL:
+        self.take()
+      else:
+        children.append(self.parse_statement())
+
+    self.take()
+
+    return self.ast.add(STATEMENTS, brace, children)
+
+
+  def parse_statement(self):
+    parser = self.statement_parsers.get(self.current())
+
+    if parser:
+      return parser()
+
+    raise AssertionError(f"Unrecognized token in compile_statement(): {self.found()}")
+
+
+  def parse_let(self):
+    self.take()
+    name = self.expect(IDENTIFIER)
+    self.expect(SYMBOL, "=")
+
+    value = self.parse_expression()
+    self.expect(SYMBOL, ";")
+
+    return self.ast.add(LET, name, [value])
+
+
+  def parse_if(self):
+    keyword = self.take()
+
+    self.expect(SYMBOL, "(")
+    condition = self.parse_expression()
+    self.expect(SYMBOL, ")")
+
+    self.expect(SYMBOL, "{")
+    children = [condition, self.parse_statements()]
+
+    if self.current() == "else":
+      self.take()
+      self.expect(SYMBOL, "{")
+      children.append(self.parse_statements())
+
+    return self.ast.add(IF, keyword, children)
+
+
+  def parse_while(self):
+    keyword = self.take()
+
+    self.expect(SYMBOL, "(")
+    condition = self.parse_expression()
+    self.expect(SYMBOL, ")")
+
+    self.expect(SYMBOL, "{")
+    body = self.parse_statements()
+
+    return self.ast.add(WHILE, keyword, [condition, body])
+
+
+  def parse_do(self):
+    keyword = self.take()
+
+    call = self.parse_subroutine_call()
+    self.expect(SYMBOL, ";")
+
+    return self.ast.add(DO, keyword, [call])
+
+
+  def parse_return(self):
+    keyword = self.take()
+    children = []
+
+    if self.current() != ";":
+      children.append(self.parse_expression())
+
+    self.expect(SYMBOL, ";")
+
+    return self.ast.add(RETURN, keyword, children)
+
+
+  # Parse a chain of terms joined by binary operators.
+  # Jack has no operator precedence, so a + b * c is (a + b) * c:
+  # each BINARY node's left child is everything before its operator.
+  #
+  # Terms can nest expressions of their own (in parentheses, array indexes,
+  # and call arguments) thousands deep in machine-written Jack,
+  # so rather than recursing, we keep an explicit stack of what we're partway through:
+  # - [EXPRESSION_FRAME, left, op]: an expression so far, and the op waiting on its next term
+  # - (UNARY_FRAME, op): a unary op waiting on its term
+  # - (PAREN_FRAME,) and (INDEX_FRAME, name): a nested expression, waiting on its ")" or "]"
+  # - (CALL_FRAME, first, name, paren, arguments): a subroutine call, partway through its arguments
+  def parse_expression(self):
+    ast = self.ast
+    stack = [[EXPRESSION_FRAME, NONE, None]]
+
+    while True:
+      typ = self.current_type()
+      value = self.current()
+
+      # Terms that open up a nested construct push a frame,
+      # and go back around for the term (or expression) inside.
+      if typ == SYMBOL and value in UNARY_OP_SET:
+        stack.append((UNARY_FRAME, self.take()))
+        continue
+
+      if typ == SYMBOL and value == "(":
+        self.take()
+        stack.append((PAREN_FRAME,))
+        stack.append([EXPRESSION_FRAME, NONE, None])
+        continue
+
+      next_token = self.peek() if typ == IDENTIFIER else None
+
+      if next_token in CALL_OPENERS:
+        call = self.start_subroutine_call()
+
+        if self.next_argument():
+          stack.append(call)
+          stack.append([EXPRESSION_FRAME, NONE, None])
+          continue
+
+        term = self.finish_subroutine_call(*call[1:])
+
+      elif next_token == "[":
+        name = self.take()
+        self.take()
+        stack.append((INDEX_FRAME, name))
+        stack.append([EXPRESSION_FRAME, NONE, None])
+        continue
+
+      else:
+        term = self.parse_term()
+
+      # We've just finished a term. Let's finish off everything that was waiting on it.
+      while True:
+        frame = stack[-1]
+
+        if frame[0] == UNARY_FRAME:
+          stack.pop()
+          term = ast.add(UNARY, frame[1], [term])
+          continue
+
+        frame[1] = term if frame[2] is None else ast.add(BINARY, frame[2], [frame[1], term])
+
+        if self.current() in BINARY_OP_SET:
+          frame[2] = self.take()
+          break
+
+        # The expression is done; hand it to whatever it's inside of.
+        stack.pop()
+        expression = frame[1]
+
+        if not stack:
+          return expression
+
+        frame = stack[-1]
+
+        if frame[0] == PAREN_FRAME:
+          stack.pop()
+          self.expect(SYMBOL, ")")
+          term = expression
+        elif frame[0] == INDEX_FRAME:
+          stack.pop()
+          self.expect(SYMBOL, "]")
+          term = ast.add(ARRAY_ACCESS, frame[1], [expression])
+        else:
+          frame[4].append(expression)
+
+          if self.next_argument():
+            stack.append([EXPRESSION_FRAME, NONE, None])
+            break
+
+          stack.pop()
+          term = self.finish_subroutine_call(*frame[1:])
+
+
+  # Parse a simple term: a variable or a constant.
+  # Everything with an expression nested inside it is handled by parse_expression().
+  def parse_term(self):
+    typ = self.current_type()
+    value = self.current()
+
+    if typ == IDENTIFIER:
+      return self.ast.add(VARIABLE, self.take())
+
+    if typ == INT_CONST:
+      return self.ast.add(INT_CONSTANT, self.take())
+
+    if typ == KEYWORD and value in KEYWORD_CONSTANTS:
+      return self.ast.add(KEYWORD_CONSTANT, self.take())
+
+    if typ == STRING_CONST:
+      return self.ast.add(STRING_CONSTANT, self.take())
+
+    raise AssertionError(f"Unsure how to handle parse the current token as a term: {self.found()}")
+
+
+  # Parse "name(...)", "Class.name(...)", or "object.name(...)".
+  def parse_subroutine_call(self):
+    call = self.start_subroutine_call()
+
+    while self.next_argument():
+      call[4].append(self.parse_expression())
+
+    return self.finish_subroutine_call(*call[1:])
+
+
+  # Parse a call up to and including its "(".
+  # Returns a CALL_FRAME for the arguments to be added to.
+  def start_subroutine_call(self):
+    first = self.expect(IDENTIFIER)
+    name = NONE
+
+    if self.current() == ".":
+      self.take()
+      name = self.ast.add(NAME, self.expect(IDENTIFIER))
+
+    paren = self.expect(SYMBOL, "(")
+
+    return (CALL_FRAME, first, name, paren, [])
+
+
+  # Move past any commas to the start of a call's next argument.
+  # Returns False once we reach the end of the argument list instead.
+  def next_argument(self):
+    while self.current() not in EXPRESSION_LIST_ENDS:
+      if self.current() == ",":
+        self.take()
+      else:
+        return True
+
+    return False
+
+
+  # Parse a call's ")", and build its CALL node.
+  def finish_subroutine_call(self, first, name, paren, arguments):
+    self.expect(SYMBOL, ")")
+
+    expression_list = self.ast.add(EXPRESSION_LIST, paren, arguments)
+
+    return self.ast.add(CALL, first, [expression_list] if name == NONE else [name, expression_list])
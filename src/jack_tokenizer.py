@@ -2,7 +2,8 @@
 JackTokenizer
 
 Given the compiler's input, advance the input one token at a time.
-Ignore white space!
+Ignore white space and comments!
+Keep track of where each token came from, so errors can point at a line and column.
 Get the current *value* and *type* of the current token.
 
 NOTES:
@@ -13,8 +14,11 @@ See "Lexical elements" in jack-grammer.png
 """
 
 
+import bisect
 import re
 
+from tracer import Tracer
+
 
 # TOKEN TYPES
 KEYWORD = 'keyword'
@@ -91,105 +95,196 @@ UNARY_OPS = [
 ]
 
 
+# The lexer is driven by a single compiled "master" regex.
+#
+# Every match skips any leading junk (white space, comments, or anything that can't start a token)
+# and then captures exactly one token in one of the groups below.
+# The group that matched tells us the token's type, so there's no per-character work in Python.
+#
+# Two of the groups never produce tokens:
+# - UNTERMINATED_GROUP catches a string or block comment that never closes
+# - END_GROUP matches the end of the input, so the regex always succeeds
+#   and never backtracks into a comment looking for something to match
+STRING_GROUP = 1
+UNTERMINATED_GROUP = 2
+SYMBOL_GROUP = 3
+WORD_GROUP = 4
+END_GROUP = 5
+
+SYMBOL_CHARS = re.escape("".join(SYMBOLS))
+
+TOKEN_REGEX = re.compile(
+  rf'(?:[^\w"{SYMBOL_CHARS}]+|//[^\n]*|/\*[\s\S]*?\*/)*'
+  rf'(?:("[^"\n]*")|("|/\*)|([{SYMBOL_CHARS}])|(\w+)|(\Z))'
+)
+
+KEYWORD_SET = frozenset(KEYWORDS)
+
+
 class JackTokenizer:
-  def __init__(self, input_stream):
+  def __init__(self, input_stream, tracer = None):
+    # Tracing is off unless we're handed an enabled Tracer.
+    self.tracer = tracer or Tracer()
+
+    self.reset(input_stream)
+
+
+  # Start over on a new input stream.
+  # This lets one JackTokenizer be reused for any number of sources.
+  def reset(self, input_stream):
     # Store input file contents as a string stream.
     self.input_stream = input_stream
 
+    # Offsets of the start of each line, built the first time we need a line/column.
+    self.line_starts = None
+
+    # The whole input is lexed up front into parallel arrays,
+    # one entry per token: its value, its type, and its offset in the input stream.
+    # Advancing, peeking, and rewinding are then just index moves.
+    self.token_values = []
+    self.token_types = []
+    self.token_offsets = []
+    self.tokenize()
+
+    if self.tracer.enabled:
+      self.trace_tokens()
+
+    # Store the index of the current token.
+    # We start *before* the first token, so the first advance() lands on it.
+    self.token_index = -1
+
     # Store the current token.
     self.current_token = ""
 
-    # Store the position of the next possible token.
-    self.token_pos = 0
-
     # Store the token type.
     self.token_type = None
 
-    # Store in state whether the tokenizer is currently in a string.
-    self.string_mode = False
+
+  # Lex the entire input stream in a single pass.
+  def tokenize(self):
+    values = self.token_values
+    types = self.token_types
+    offsets = self.token_offsets
+    pos = 0
+
+    for match in TOKEN_REGEX.finditer(self.input_stream):
+      group = match.lastindex
+
+      if group == END_GROUP:
+        return
+
+      # finditer() will happily skip over input it can't match,
+      # so make sure each token picks up exactly where the last one ended.
+      if group == UNTERMINATED_GROUP or match.start() != pos:
+        break
+
+      value = match.group(group)
+
+      values.append(value)
+      types.append(self.determine_token_type(group, value))
+      offsets.append(match.start(group))
+
+      pos = match.end()
+
+    offset = match.start(group)
+    line, column = self.line_column(offset)
+    raise AssertionError(f"Unterminated string or comment at line {line}, column {column}")
+
+
+  # Emit one trace event per token, after the fact.
+  # This keeps tracing entirely out of the lexing loop.
+  def trace_tokens(self):
+    for value, typ, offset in zip(self.token_values, self.token_types, self.token_offsets):
+      self.tracer.event("tokenize", f"{offset}: {typ} {value}")
 
 
   # Determine whether tokenization is complete.
   def has_more_tokens(self):
-    return self.token_pos < len(self.input_stream)
+    return self.token_index + 1 < len(self.token_values)
 
 
-  # Advance to the next token.
-  def advance(self, reset = True):
-    if not self.has_more_tokens():
-      return
+  # Move to the token at the given index.
+  def seek(self, index):
+    self.token_index = index
 
-    if reset:
+    if 0 <= index < len(self.token_values):
+      self.current_token = self.token_values[index]
+      self.token_type = self.token_types[index]
+    else:
+      # Mirror the old behavior of producing an empty token once we run out of input.
       self.current_token = ""
+      self.token_type = None
+
+
+  # Advance to the next token.
+  # This runs once per token, so the common case skips seek()'s bounds checks.
+  def advance(self):
+    index = self.token_index + 1
 
-    current_char = self.input_stream[self.token_pos]
-    self.token_pos += 1
+    if index < len(self.token_values):
+      self.token_index = index
+      self.current_token = self.token_values[index]
+      self.token_type = self.token_types[index]
+    elif self.token_index < len(self.token_values):
+      self.seek(index)
 
-    # Handle quotations, which indicate strings.
-    # Note that it could be an opening or closing quotation.
-    if current_char == '"':
-      self.current_token += '"'
 
-      if self.string_mode:
-        self.string_mode = False
-      else:
-        self.string_mode = True
-        self.advance(reset = False)
+  # Step back by the given number of tokens.
+  def rewind(self, count = 1):
+    self.seek(max(self.token_index - count, -1))
 
-    # Handle alphanumeric characters and underscores.
-    if re.search(r"\w", current_char) or self.string_mode:
-      self.current_token += current_char
-      self.advance(reset = False)
 
-    # Handle symbols.
-    if current_char in SYMBOLS:
-      if self.current_token:
-        self.token_pos -= 1
-      else:
-        self.current_token = current_char
+  # Look ahead at the token k positions past the current one.
+  def peek(self, k = 1):
+    index = self.token_index + k
 
-    # Advance further if current token is empty.
-    if not self.current_token:
-      self.advance()
+    if index < len(self.token_values):
+      return self.token_values[index]
 
-    print('PROCESSED TOKEN: ', self.current_token)
-    self.determine_token_type()
+    return ""
 
 
-  # Look ahead at the next token.
-  def peek(self):
-    # Store the current state.
-    current_token = self.current_token
-    token_pos = self.token_pos
-    token_type = self.token_type
+  # Return the input stream offset of the current token.
+  def offset(self):
+    if 0 <= self.token_index < len(self.token_offsets):
+      return self.token_offsets[self.token_index]
 
-    self.advance()
+    return len(self.input_stream)
 
-    next_token = self.current_token
 
-    # Reset to current state.
-    self.current_token = current_token
-    self.token_pos = token_pos
-    self.token_type = token_type
+  # Convert an input stream offset into a 1-based (line, column) pair.
+  def line_column(self, offset):
+    if self.line_starts is None:
+      self.line_starts = [0] + [match.end() for match in re.finditer("\n", self.input_stream)]
 
-    return next_token
+    line = bisect.bisect_right(self.line_starts, offset)
 
+    return line, offset - self.line_starts[line - 1] + 1
 
-  # Determine the current token's type.
+
+  # Describe where the current token is, e.g. "line 3, column 7".
+  def location(self):
+    line, column = self.line_column(self.offset())
+
+    return f"line {line}, column {column}"
+
+
+  # Determine a token's type from the master regex group that matched it.
   # See TOKEN TYPES at the top of the file for a full list.
-  def determine_token_type(self):
-    if self.current_token == "":
-      self.token_type = None
-    elif self.current_token in SYMBOLS:
-      self.token_type = SYMBOL
-    elif self.current_token in KEYWORDS:
-      self.token_type = KEYWORD
-    elif re.search(r"\D", self.current_token) == None:
-      self.token_type = INT_CONST
-    elif self.current_token[0] == '"':
-      self.token_type = STRING_CONST
-    else:
-      self.token_type = IDENTIFIER
+  def determine_token_type(self, group, value):
+    if group == SYMBOL_GROUP:
+      return SYMBOL
+
+    if group == STRING_GROUP:
+      return STRING_CONST
+
+    if value in KEYWORD_SET:
+      return KEYWORD
+
+    if value.isdecimal():
+      return INT_CONST
+
+    return IDENTIFIER
 
 
   # Return the current token as a keyword.
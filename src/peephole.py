@@ -0,0 +1,184 @@
+"""
+Peephole optimizer
+
+Clean up the VM code that the CompilationEngine emits, a few instructions at a time.
+
+The engine's code generation is deliberately simple, so it leaves behind patterns like:
+- push constant 1, neg, not              (~true, i.e. false)
+- push constant 0, if-goto L             (a jump that can never happen)
+- push constant 1, neg, if-goto L        (a jump that always happens)
+- push local 0, pop local 0              (a no-op round trip)
+- not, not                               (double negation)
+- goto L, label L                        (a jump to the very next instruction)
+- instructions right after a goto/return (unreachable until the next label)
+- labels that nothing jumps to
+
+We keep making passes over the code until nothing changes.
+"""
+
+
+from vm_instruction import (
+  VMInstruction,
+  PUSH,
+  POP,
+  LABEL,
+  GOTO,
+  IF_GOTO,
+  FUNCTION,
+  RETURN
+)
+
+
+# Commands that unconditionally leave the current instruction stream.
+JUMPS = frozenset([GOTO, RETURN])
+
+# Unary commands that cancel themselves out when applied twice.
+INVOLUTIONS = frozenset(["not", "neg"])
+
+
+# Return the optimized list of instructions.
+def optimize(instructions):
+  instructions = list(instructions)
+
+  while True:
+    size = len(instructions)
+
+    instructions = fold_constant_conditions(instructions)
+    instructions = remove_redundant_pairs(instructions)
+    instructions = remove_unreachable_code(instructions)
+    instructions = remove_jumps_to_next(instructions)
+    instructions = remove_unused_labels(instructions)
+
+    if len(instructions) == size:
+      return instructions
+
+
+# If the instructions ending at index i push a known constant, return (value, length).
+# Recognizes "push constant c", "push constant c, neg", and "push constant c, not".
+# Otherwise, return (None, 0).
+def constant_at(instructions, i):
+  instruction = instructions[i]
+
+  if instruction.command == PUSH and instruction.arg1 == "constant":
+    return instruction.arg2, 1
+
+  if i > 0 and instruction.command in INVOLUTIONS:
+    previous = instructions[i - 1]
+
+    if previous.command == PUSH and previous.arg1 == "constant":
+      value = -previous.arg2 if instruction.command == "neg" else ~previous.arg2
+      return value, 2
+
+  return None, 0
+
+
+# Turn jumps on constant conditions into plain gotos (or nothing at all),
+# and fold "~true" into "false".
+def fold_constant_conditions(instructions):
+  optimized = []
+
+  for instruction in instructions:
+    if instruction.command == IF_GOTO and optimized:
+      value, length = constant_at(optimized, len(optimized) - 1)
+
+      if value is not None:
+        del optimized[-length:]
+
+        # A non-zero condition always jumps; a zero condition never does.
+        if value != 0:
+          optimized.append(VMInstruction(GOTO, instruction.arg1))
+
+        continue
+
+    # push constant 1, neg, not -> push constant 0
+    if instruction.command == "not" and len(optimized) >= 2:
+      value, length = constant_at(optimized, len(optimized) - 1)
+
+      if value == -1 and length == 2:
+        del optimized[-2:]
+        optimized.append(VMInstruction(PUSH, "constant", 0))
+        continue
+
+    optimized.append(instruction)
+
+  return optimized
+
+
+# Remove "push X, pop X" round trips and "not, not" / "neg, neg" pairs.
+def remove_redundant_pairs(instructions):
+  optimized = []
+
+  for instruction in instructions:
+    if optimized:
+      previous = optimized[-1]
+
+      is_round_trip = (
+        instruction.command == POP and
+        previous.command == PUSH and
+        previous.arg1 == instruction.arg1 and
+        previous.arg2 == instruction.arg2
+      )
+
+      is_double_negation = (
+        instruction.command in INVOLUTIONS and
+        previous.command == instruction.command
+      )
+
+      if is_round_trip or is_double_negation:
+        optimized.pop()
+        continue
+
+    optimized.append(instruction)
+
+  return optimized
+
+
+# Drop everything between an unconditional jump and the next label or function.
+def remove_unreachable_code(instructions):
+  optimized = []
+  reachable = True
+
+  for instruction in instructions:
+    if instruction.command in (LABEL, FUNCTION):
+      reachable = True
+
+    if reachable:
+      optimized.append(instruction)
+
+    if instruction.command in JUMPS:
+      reachable = False
+
+  return optimized
+
+
+# Drop "goto L" when L is the very next instruction.
+def remove_jumps_to_next(instructions):
+  optimized = []
+
+  for i, instruction in enumerate(instructions):
+    is_jump_to_next = (
+      instruction.command == GOTO and
+      i + 1 < len(instructions) and
+      instructions[i + 1].command == LABEL and
+      instructions[i + 1].arg1 == instruction.arg1
+    )
+
+    if not is_jump_to_next:
+      optimized.append(instruction)
+
+  return optimized
+
+
+# Drop labels that no goto or if-goto refers to.
+def remove_unused_labels(instructions):
+  referenced = {
+    instruction.arg1
+    for instruction in instructions
+    if instruction.command in (GOTO, IF_GOTO)
+  }
+
+  return [
+    instruction
+    for instruction in instructions
+    if instruction.command != LABEL or instruction.arg1 in referenced
+  ]
@@ -0,0 +1,220 @@
+"""
+Profiler
+
+Measure where a build's time goes: per file, per phase, and optionally per subroutine.
+
+Profiling is off by default, and turned on with --profile.
+Each file's FileProfile records wall-clock and CPU time for every phase it goes through:
+- read       reading the .jack file
+- tokenize   the JackTokenizer
+- compile    the CompilationEngine (with the engine front end)
+- parse      JackParser (with the AST front end)
+- generate   the CodeGenerator (with the AST front end)
+- optimize   the -O passes
+- write      writing the .vm file
+along with its token and VM instruction counts.
+
+FileProfiles travel back from worker processes on each CompileResult,
+and the Profiler gathers them into a report once the build is done.
+
+When profiling is off, the compiler only pays for a handful of
+"is there a profile?" checks per file.
+"""
+
+
+import json
+import time
+
+from atomic_file import write_atomically
+
+
+# The order phases are shown in, whichever of them a build actually went through.
+PHASES = ("read", "tokenize", "compile", "parse", "generate", "optimize", "write")
+
+# How many of the slowest subroutines to show in the table.
+SUBROUTINE_ROWS = 20
+
+
+class FileProfile:
+  __slots__ = ("jack_file", "tokens", "instructions", "phases", "subroutines", "wall", "cpu")
+
+  def __init__(self, jack_file, subroutines = False):
+    self.jack_file = jack_file
+    self.tokens = 0
+    self.instructions = 0
+
+    # {phase: [wall seconds, CPU seconds]}
+    self.phases = {}
+
+    # (function name, wall seconds, CPU seconds, VM instructions), in compile order.
+    # None unless we're drilling down into subroutines.
+    self.subroutines = [] if subroutines else None
+
+    # When the phase in progress started.
+    self.wall = time.perf_counter()
+    self.cpu = time.process_time()
+
+
+  # Record the time since the last lap as the given phase, and start the next one.
+  def lap(self, phase):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+
+    self.phases[phase] = [wall - self.wall, cpu - self.cpu]
+
+    self.wall = wall
+    self.cpu = cpu
+
+
+  # Time every call to one of a compiler's per-subroutine methods
+  # (compile_subroutine_dec or generate_subroutine).
+  #
+  # Like the VMWriter's traced emit(), we swap the method out on this one instance,
+  # so unprofiled compiles never pay for it. Deleting the instance attribute afterwards
+  # puts the original back.
+  # The first instruction each subroutine emits is its "function" line, which names it.
+  def time_subroutines(self, compiler, method_name, vm_writer):
+    method = getattr(compiler, method_name)
+
+    def timed(*args):
+      start = len(vm_writer.instructions)
+      wall = time.perf_counter()
+      cpu = time.process_time()
+
+      method(*args)
+
+      wall = time.perf_counter() - wall
+      cpu = time.process_time() - cpu
+      name = vm_writer.instructions[start].arg1
+      self.subroutines.append((name, wall, cpu, len(vm_writer.instructions) - start))
+
+    setattr(compiler, method_name, timed)
+
+
+  def as_dict(self):
+    wall = sum(wall for wall, _ in self.phases.values())
+    cpu = sum(cpu for _, cpu in self.phases.values())
+
+    profile = {
+      "file": self.jack_file,
+      "tokens": self.tokens,
+      "instructions": self.instructions,
+      "wall": wall,
+      "cpu": cpu,
+      "tokens_per_sec": self.tokens / wall if wall else 0,
+      "phases": {phase: {"wall": wall, "cpu": cpu} for phase, (wall, cpu) in self.phases.items()}
+    }
+
+    if self.subroutines is not None:
+      profile["subroutines"] = [
+        {"name": name, "wall": wall, "cpu": cpu, "instructions": instructions}
+        for name, wall, cpu, instructions in self.subroutines
+      ]
+
+    return profile
+
+
+class Profiler:
+  def __init__(self, subroutines = False):
+    # Whether to time each subroutine, as well as each phase.
+    self.subroutines = subroutines
+
+    # Whole-program phases (e.g. linking) that don't belong to any one file.
+    # {phase: [wall seconds, CPU seconds]}
+    self.program_phases = {}
+
+    self.wall = time.perf_counter()
+    self.cpu = time.process_time()
+
+
+  def start_file(self, jack_file):
+    return FileProfile(jack_file, self.subroutines)
+
+
+  # Time a whole-program phase, by calling function().
+  def time_phase(self, phase, function):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+
+    function()
+
+    self.program_phases[phase] = [time.perf_counter() - wall, time.process_time() - cpu]
+
+
+  # Gather every compiled file's profile into a report, slowest files first.
+  #
+  # Wall time is for the whole build. CPU time only counts this process,
+  # so with -j it leaves out the workers; the per-file numbers have those.
+  def report(self, results):
+    files = sorted(
+      (result.profile.as_dict() for result in results if result.profile),
+      key = lambda profile: profile["wall"],
+      reverse = True
+    )
+
+    tokens = sum(profile["tokens"] for profile in files)
+    wall = time.perf_counter() - self.wall
+
+    return {
+      "wall": wall,
+      "cpu": time.process_time() - self.cpu,
+      "files": files,
+      "skipped": sum(1 for result in results if result.skipped),
+      "tokens": tokens,
+      "instructions": sum(profile["instructions"] for profile in files),
+      "tokens_per_sec": tokens / wall if wall else 0,
+      "program_phases": {phase: {"wall": wall, "cpu": cpu} for phase, (wall, cpu) in self.program_phases.items()}
+    }
+
+
+# Write a report as JSON.
+def write_report(path, report):
+  write_atomically(path, json.dumps(report, indent = 2) + "\n")
+
+
+# Format a report as a table, slowest files first, all times in milliseconds.
+def format_report(report):
+  phases = [phase for phase in PHASES if any(phase in profile["phases"] for profile in report["files"])]
+
+  lines = [
+    f"{'file':<32} {'tokens':>8} {'instrs':>8} " + " ".join(f"{phase:>9}" for phase in phases)
+    + f" {'wall':>9} {'cpu':>9} {'tokens/sec':>11}"
+  ]
+
+  for profile in report["files"]:
+    times = " ".join(
+      f"{profile['phases'][phase]['wall'] * 1000:>9.2f}" if phase in profile["phases"] else f"{'-':>9}"
+      for phase in phases
+    )
+
+    lines.append(
+      f"{profile['file'][-32:]:<32} {profile['tokens']:>8} {profile['instructions']:>8} {times}"
+      + f" {profile['wall'] * 1000:>9.2f} {profile['cpu'] * 1000:>9.2f} {profile['tokens_per_sec']:>11,.0f}"
+    )
+
+  for phase, timing in report["program_phases"].items():
+    lines.append(f"{phase} (whole program): {timing['wall'] * 1000:.2f} ms wall, {timing['cpu'] * 1000:.2f} ms cpu")
+
+  lines.append(
+    f"total: {len(report['files'])} files compiled, {report['skipped']} skipped, "
+    + f"{report['tokens']} tokens, {report['instructions']} instructions "
+    + f"in {report['wall'] * 1000:.2f} ms ({report['tokens_per_sec']:,.0f} tokens/sec)"
+  )
+
+  subroutines = sorted(
+    (subroutine for profile in report["files"] for subroutine in profile.get("subroutines", ())),
+    key = lambda subroutine: subroutine["wall"],
+    reverse = True
+  )
+
+  if subroutines:
+    lines.append("")
+    lines.append(f"{'subroutine':<40} {'wall':>9} {'cpu':>9} {'instrs':>8}")
+
+    for subroutine in subroutines[:SUBROUTINE_ROWS]:
+      lines.append(
+        f"{subroutine['name'][-40:]:<40} {subroutine['wall'] * 1000:>9.3f}"
+        + f" {subroutine['cpu'] * 1000:>9.3f} {subroutine['instructions']:>8}"
+      )
+
+  return "\n".join(lines)
@@ -0,0 +1,211 @@
+"""
+Strength reduction
+
+Replace multiplication (and a little division) by constants with cheaper VM code.
+
+The CompilationEngine always lowers * and / to "call Math.multiply 2" and "call Math.divide 2".
+Those calls cost a full call/return frame plus a loop over all 16 bits,
+which is a lot to pay for something like x * 2.
+
+When one operand is a constant, we can instead build the product out of additions
+using the binary digits of the constant (shift-and-add, where a "shift" is x + x):
+
+x * 2  ->  pop temp 6, push temp 6, push temp 6, add
+x * 5  ->  x, doubled twice, plus x
+
+When x is just a variable, we push it again instead of stashing it in a temp:
+
+x * 2  ->  push local 0, push local 0, add
+
+Division is trickier, since the VM has no shift instructions.
+The only divisions we can safely rewrite are x / 1 (a no-op) and x / -1 (a neg).
+
+A simple cost model estimates the Hack instructions executed by each VM command.
+We only inline a sequence when it's estimated to be faster than the call,
+and short enough not to bloat the code.
+"""
+
+
+from vm_instruction import VMInstruction, PUSH, POP, CALL, FUNCTION
+
+
+# Scratch temp registers, kept clear of temp 0 (used to discard do-statement results).
+DOUBLING_TEMP = 6
+MULTIPLICAND_TEMP = 7
+
+# The longest sequence we're willing to inline in place of a single call.
+MAX_SEQUENCE_LENGTH = 32
+
+
+# Rough Hack instruction counts for each VM command.
+# These only need to be good enough to compare alternatives.
+PUSH_COST = 10
+POP_COST = 12
+BINARY_COST = 6
+UNARY_COST = 4
+
+# A call to Math.multiply or Math.divide: frame setup and teardown,
+# plus the OS routine's loop over all 16 bits.
+CALL_COSTS = {
+  "Math.multiply": 2000,
+  "Math.divide": 3000
+}
+
+
+def cost_of(instruction):
+  command = instruction.command
+
+  if command == PUSH:
+    return PUSH_COST
+
+  if command == POP:
+    return POP_COST
+
+  if command == CALL:
+    return CALL_COSTS.get(instruction.arg1, 100)
+
+  if command in ("neg", "not"):
+    return UNARY_COST
+
+  return BINARY_COST
+
+
+def cost_of_all(instructions):
+  return sum(cost_of(instruction) for instruction in instructions)
+
+
+# Return (instructions, savings), where savings maps each function name
+# to the estimated Hack instructions saved per execution of every rewritten site.
+def reduce_strength(instructions):
+  optimized = []
+  savings = {}
+  function_name = None
+
+  for instruction in instructions:
+    if instruction.command == FUNCTION:
+      function_name = instruction.arg1
+
+    if instruction.command == CALL and instruction.arg2 == 2 and instruction.arg1 in CALL_COSTS:
+      rewrite = rewrite_call(optimized, instruction)
+
+      if rewrite is not None:
+        length, replacement = rewrite
+        original = optimized[-length:] + [instruction]
+        saved = cost_of_all(original) - cost_of_all(replacement)
+
+        if saved > 0 and len(replacement) <= MAX_SEQUENCE_LENGTH:
+          del optimized[-length:]
+          optimized.extend(replacement)
+          savings[function_name] = savings.get(function_name, 0) + saved
+          continue
+
+    optimized.append(instruction)
+
+  return optimized, savings
+
+
+# If the instructions just before a multiply/divide call let us rewrite it,
+# return (the number of preceding instructions to replace, the replacement).
+# Otherwise, return None.
+def rewrite_call(preceding, call):
+  constant, length = trailing_constant(preceding)
+
+  if constant is not None:
+    # The constant is the second operand: x * c or x / c.
+    # Only the constant's instructions (and the call) are replaced; x is already on the stack.
+    if call.arg1 == "Math.multiply":
+      operand = preceding[-length - 1] if len(preceding) > length else None
+      return length, multiply_by(constant, operand if is_simple_push(operand) else None)
+
+    if constant == 1:
+      return length, []
+
+    if constant == -1:
+      return length, [VMInstruction("neg")]
+
+    return None
+
+  # The constant is the first operand of a multiply, and the second is a simple push: c * x.
+  # Multiplication commutes, so we can push x first and multiply it by c.
+  if call.arg1 == "Math.multiply" and len(preceding) >= 2 and is_simple_push(preceding[-1]):
+    constant, length = trailing_constant(preceding[:-1])
+
+    if constant is not None:
+      return length + 1, [preceding[-1]] + multiply_by(constant, preceding[-1])
+
+  return None
+
+
+# If the preceding instructions end by pushing a constant, return (value, length).
+# Recognizes "push constant c" and "push constant c, neg".
+def trailing_constant(preceding):
+  if not preceding:
+    return None, 0
+
+  last = preceding[-1]
+
+  if last.command == PUSH and last.arg1 == "constant":
+    return last.arg2, 1
+
+  if last.command == "neg" and len(preceding) >= 2:
+    previous = preceding[-2]
+
+    if previous.command == PUSH and previous.arg1 == "constant":
+      return -previous.arg2, 2
+
+  return None, 0
+
+
+# A single push of a variable (not a constant) that we can safely reorder or repeat.
+# Our own scratch temps don't count, since the multiplication sequence overwrites them.
+def is_simple_push(instruction):
+  return (
+    instruction is not None and
+    instruction.command == PUSH and
+    instruction.arg1 != "constant" and
+    not (instruction.arg1 == "temp" and instruction.arg2 in (DOUBLING_TEMP, MULTIPLICAND_TEMP))
+  )
+
+
+# Return the VM code that multiplies the value on top of the stack (x) by a constant.
+# If x was pushed by a simple push, pass that instruction as the operand,
+# and we'll re-push it whenever we need x again.
+def multiply_by(constant, operand = None):
+  if constant < 0:
+    return multiply_by(-constant, operand) + [VMInstruction("neg")]
+
+  # x * 0: we still evaluated x (which may have had side effects), but throw it away.
+  if constant == 0:
+    return [VMInstruction(POP, "temp", DOUBLING_TEMP), VMInstruction(PUSH, "constant", 0)]
+
+  bits = bin(constant)[3:]
+
+  sequence = []
+  push_x = None
+
+  if operand is not None:
+    push_x = operand
+
+  # We only need to hold on to x if we'll add it back in after doubling.
+  elif "1" in bits:
+    push_x = VMInstruction(PUSH, "temp", MULTIPLICAND_TEMP)
+    sequence += [VMInstruction(POP, "temp", MULTIPLICAND_TEMP), push_x]
+
+  # Walk the remaining bits from most to least significant:
+  # double the running product, then add x back in for every 1 bit.
+  for i, bit in enumerate(bits):
+    if i == 0 and push_x is not None:
+      # The running product is still just x, so doubling it is x + x.
+      sequence += [push_x, VMInstruction("add")]
+    else:
+      sequence += [
+        VMInstruction(POP, "temp", DOUBLING_TEMP),
+        VMInstruction(PUSH, "temp", DOUBLING_TEMP),
+        VMInstruction(PUSH, "temp", DOUBLING_TEMP),
+        VMInstruction("add")
+      ]
+
+    if bit == "1":
+      sequence += [push_x, VMInstruction("add")]
+
+  return sequence
@@ -0,0 +1,139 @@
+"""
+StringPool
+
+Intern a class's string constants, so each distinct literal is built only once.
+
+Without a pool, every evaluation of "Hello" calls String.new() and then
+String.appendChar() once per character, even inside a loop.
+With a pool, each distinct literal gets its own hidden static variable,
+and every use site compiles to a single:
+
+  push static N
+
+The literals are all built in one hidden function at the end of the class:
+
+  function Main.$strings 0
+  <String.new / String.appendChar calls>
+  pop static N
+  ...
+  push constant 0
+  return
+
+and every subroutine that uses a pooled literal starts by making sure it has run:
+
+  push static N              // the class's first pooled literal
+  if-goto STRING_POOL_READY  // already built? skip ahead
+  call Main.$strings 0
+  pop temp 0
+  label STRING_POOL_READY
+
+so the strings are built the first time any of them is needed,
+and after that, each call pays for one check, however many literals it uses.
+
+The catch is that pooled strings are shared: a subroutine that changes
+(or disposes of) a pooled string changes it for every other use of that literal.
+That's why pooling is opt-in.
+"""
+
+
+from vm_instruction import VMInstruction, PUSH, POP, IF_GOTO, CALL, LABEL
+
+
+# The label the guard jumps to. Labels belong to their function, so one name does.
+READY_LABEL = "STRING_POOL_READY"
+
+
+class StringPool:
+  def __init__(self, class_symbol_table, vm_writer):
+    # Pooled literals live in the class's static segment,
+    # after the class's own static variables.
+    self.class_symbol_table = class_symbol_table
+    self.vm_writer = vm_writer
+
+    # Every distinct literal in the current class, mapped to its static's name.
+    self.literals = {}
+
+    # Where the current subroutine's guard goes (just after its "function" line),
+    # and whether it needs one.
+    self.guard_position = 0
+    self.used = False
+
+    # Running totals across every class, for the compile report.
+    self.pooled = 0
+    self.uses = 0
+    self.calls_avoided = 0
+
+
+  # Start a new class.
+  # The class symbol table must already have been reset.
+  def reset(self):
+    self.literals.clear()
+
+
+  # Start a new subroutine, whose "function" line has just been written.
+  def start_subroutine(self):
+    self.guard_position = len(self.vm_writer.instructions)
+    self.used = False
+
+
+  def write_string(self, string):
+    name = self.literals.get(string)
+
+    if name is None:
+      # "$" can't appear in a Jack identifier, so these never clash with real statics.
+      name = f"$string{len(self.literals)}"
+      self.class_symbol_table.define(name, "String", "static")
+      self.literals[string] = name
+      self.pooled += 1
+
+    self.vm_writer.write_push("static", self.class_symbol_table.index_of(name))
+    self.used = True
+
+    # Every run of this use site but the very first
+    # skips String.new() and one String.appendChar() per character.
+    self.uses += 1
+    self.calls_avoided += 1 + len(string)
+
+
+  # Finish the current subroutine, going back to put its guard in if it used the pool.
+  # We only know that once its body has been compiled.
+  def finish_subroutine(self, class_name):
+    if not self.used:
+      return
+
+    first = self.class_symbol_table.index_of("$string0")
+
+    self.vm_writer.instructions[self.guard_position:self.guard_position] = [
+      VMInstruction(PUSH, "static", first),
+      VMInstruction(IF_GOTO, READY_LABEL),
+      VMInstruction(CALL, f"{class_name}.$strings", 0),
+      VMInstruction(POP, "temp", 0),
+      VMInstruction(LABEL, READY_LABEL)
+    ]
+
+
+  # Finish the class, writing the function that builds its pooled literals, if it has any.
+  def finish_class(self, class_name):
+    if not self.literals:
+      return
+
+    self.vm_writer.write_function(f"{class_name}.$strings", 0)
+
+    for string, name in self.literals.items():
+      self.vm_writer.write_string(string)
+      self.vm_writer.write_pop("static", self.class_symbol_table.index_of(name))
+
+    self.vm_writer.write_push("constant", 0)
+    self.vm_writer.write_return()
+
+
+  # Describe the pool for the compile report.
+  # Classes without string literals have nothing to report.
+  def describe(self):
+    if not self.pooled:
+      return []
+
+    return [
+      f"string pool holds {self.pooled} literals for {self.uses} uses; "
+      f"those uses skip {self.calls_avoided} String calls per pass"
+    ]
@@ -7,21 +7,52 @@ store the variable in a symbol table.
 Create a new SymbolTable for each scope (class, subroutine).
 
 There will only be at most two SymbolTables at a given time (class & subroutine).
+A subroutine's table is created with the class's table as its parent,
+so resolve() looks a name up in the subroutine scope first, then the class scope.
+
+Each variable is stored as a single immutable Symbol record,
+which already knows which VM segment the variable lives in.
+Resolving a variable reference is one chained lookup that returns everything we need.
 
 "When compilng error-free Jack code, each symbol not found in the symbol tables can be assumed to be either a subroutine name or a class name."
 """
 
 
+import collections
+
+
+# An immutable, slotted record for a single variable.
+# - kind: field, static, argument, or local
+# - segment: the VM segment the variable lives in (fields live in "this")
+# - index: the variable's index within its segment
+# - type: the variable's Jack type, e.g. int or MyClass
+Symbol = collections.namedtuple("Symbol", ["kind", "segment", "index", "type"])
+
+
+SEGMENTS = {
+  "field": "this",
+  "static": "static",
+  "argument": "argument",
+  "local": "local"
+}
+
+
 class SymbolTable:
-  def __init__(self):
+  def __init__(self, parent = None):
+    # The enclosing scope's table, if any.
+    self.parent = parent
+
     self.table = {}
-    self.reset_kind_count()
+    self.kind_count = dict.fromkeys(SEGMENTS, 0)
 
 
   # Reset the symbol table.
+  # The table and counters are cleared in place rather than reallocated.
   def reset(self):
-    self.table = {}
-    self.reset_kind_count()
+    self.table.clear()
+
+    for kind in self.kind_count:
+      self.kind_count[kind] = 0
 
 
   # Define a new identifier of the given name, type, and kind.
@@ -29,15 +60,25 @@ class SymbolTable:
   def define(self, name, typ, kind):
     self.assert_valid_kind(kind)
 
-    self.table[name] = {
-      "type": typ,
-      "kind": kind,
-      "count": self.kind_count[kind]
-    }
+    self.table[name] = Symbol(kind, SEGMENTS[kind], self.kind_count[kind], typ)
 
     self.kind_count[kind] += 1
 
 
+  # Return the Symbol for a name, looking in this scope and then the enclosing one.
+  # Returns None if the name isn't a variable (e.g. it's a class or subroutine name).
+  #
+  # Jack only ever nests two scopes (subroutine inside class),
+  # so we check the parent's table directly rather than recursing.
+  def resolve(self, name):
+    symbol = self.table.get(name)
+
+    if symbol is None and self.parent is not None:
+      symbol = self.parent.table.get(name)
+
+    return symbol
+
+
   def var_count(self, kind):
     self.assert_valid_kind(kind)
 
@@ -47,37 +88,28 @@ class SymbolTable:
   def kind_of(self, name):
     self.assert_name_exists(name)
 
-    return self.table[name]["kind"]
+    return self.table[name].kind
 
 
   def type_of(self, name):
     self.assert_name_exists(name)
 
-    return self.table[name]["type"]
+    return self.table[name].type
 
 
   def index_of(self, name):
     self.assert_name_exists(name)
 
-    return self.table[name]["count"]
+    return self.table[name].index
 
 
   def has_name(self, name):
     return name in self.table
 
 
-  def reset_kind_count(self):
-    self.kind_count = {
-      "field": 0,
-      "static": 0,
-      "argument": 0,
-      "local": 0
-    }
-
-
   def assert_name_exists(self, name):
     assert self.has_name(name), f"Unrecognized name in symbol table: {name}"
 
 
   def assert_valid_kind(self, kind):
-    assert kind in self.kind_count.keys(), f"Invalid kind in SymbolTable.define(): {kind}"
+    assert kind in self.kind_count, f"Invalid kind in SymbolTable.define(): {kind}"
@@ -0,0 +1,120 @@
+"""
+Tracer
+
+Record what the compiler is doing, phase by phase.
+
+Tracing is off by default. It can be enabled with the --trace flag
+or the JACK_TRACE environment variable:
+- JACK_TRACE=path/to/file writes every event to that file
+- JACK_TRACE=1 keeps the most recent events in an in-memory ring buffer
+
+Each event belongs to a phase (tokenize, compile, write).
+The tracer keeps a running count per phase, which is reported when it's closed.
+
+When tracing is disabled, nothing in the compiler does any per-token work for it.
+Components only check `tracer.enabled` at coarse points (once per file or subroutine)
+and only then walk their results to emit events in bulk.
+"""
+
+
+import collections
+import os
+import sys
+
+
+TRACE_ENV_VAR = "JACK_TRACE"
+
+# The number of events kept around when tracing to a ring buffer.
+DEFAULT_RING_SIZE = 10_000
+
+
+class Tracer:
+  def __init__(self, path = None, ring_size = None):
+    # Tracing is enabled as soon as we have somewhere to send events.
+    self.enabled = path is not None or ring_size is not None
+
+    # Events are either written straight to a file...
+    self.path = path
+    self.file = open(path, "w") if path else None
+
+    # ...or kept in a bounded ring buffer, oldest events first.
+    self.ring = collections.deque(maxlen = ring_size) if ring_size else None
+
+    # Running event counts, keyed by phase.
+    self.counters = collections.Counter()
+
+
+  # Build a Tracer from the --trace flag, falling back to the JACK_TRACE environment variable.
+  # A flag value of "" means "trace to a ring buffer".
+  @classmethod
+  def from_settings(cls, flag = None, environ = os.environ):
+    setting = flag if flag is not None else environ.get(TRACE_ENV_VAR)
+
+    if setting is None:
+      return cls()
+
+    if setting in ["", "1", "ring"]:
+      return cls(ring_size = DEFAULT_RING_SIZE)
+
+    return cls(path = setting)
+
+
+  # Record a single event for the given phase.
+  def event(self, phase, message):
+    self.counters[phase] += 1
+
+    line = f"[{phase}] {message}"
+
+    if self.file:
+      self.file.write(line + "\n")
+    else:
+      self.ring.append(line)
+
+
+  # Record events and counters that were collected by another Tracer,
+  # e.g. one running in a worker process.
+  def replay(self, events, counters):
+    for line in events:
+      if self.file:
+        self.file.write(line + "\n")
+      else:
+        self.ring.append(line)
+
+    self.counters.update(counters)
+
+
+  # Bump a phase counter without recording an event.
+  def count(self, phase, amount = 1):
+    self.counters[phase] += amount
+
+
+  # Return the events currently held in the ring buffer.
+  def recent_events(self):
+    return list(self.ring) if self.ring is not None else []
+
+
+  # Return one "phase: count" line per counter.
+  def summary(self):
+    return [f"{phase}: {count}" for phase, count in sorted(self.counters.items())]
+
+
+  # Dump the ring buffer (if any) to the given stream.
+  def dump(self, stream = sys.stderr):
+    for line in self.recent_events():
+      stream.write(line + "\n")
+
+
+  # Write the per-phase counters and close the trace file.
+  def close(self):
+    if not self.enabled:
+      return
+
+    if self.file:
+      for line in self.summary():
+        self.file.write(f"[summary] {line}\n")
+
+      self.file.close()
+      self.file = None
+    else:
+      for line in self.summary():
+        sys.stderr.write(f"[trace] {line}\n")
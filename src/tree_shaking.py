@@ -0,0 +1,110 @@
+"""
+Tree shaking
+
+Leave out every subroutine that the program can never call.
+
+Each class compiles on its own, so the CompilationEngine can't know
+which of a class's subroutines anybody actually uses.
+Once every class in the program has been compiled, though,
+the "call" instructions tell us the whole story:
+Jack has no function pointers, so every call's target is right there in the code.
+
+Starting from the program's entry points (Main.main, and Sys.init if the program defines one),
+we follow calls from function to function. Anything we never reach is dead.
+
+Calls to functions the program doesn't define (the OS, e.g. Math.multiply)
+are simply ignored; they aren't ours to remove.
+"""
+
+
+from vm_instruction import FUNCTION, CALL, serialize
+
+
+# Where a Jack program starts running.
+# The VM's bootstrap code calls Sys.init, and the OS's Sys.init calls Main.main.
+ENTRY_POINTS = ("Sys.init", "Main.main")
+
+
+# Split a class's instructions into its functions.
+# Returns a dict mapping each function's name to its instructions, in order.
+def split_functions(instructions):
+  functions = {}
+  body = None
+
+  for instruction in instructions:
+    if instruction.command == FUNCTION:
+      body = functions[instruction.arg1] = []
+
+    assert body is not None, f"Instruction outside of any function: {instruction}"
+    body.append(instruction)
+
+  return functions
+
+
+# Map each function to the set of functions it calls.
+def call_graph(functions):
+  return {
+    name: {instruction.arg1 for instruction in body if instruction.command == CALL}
+    for name, body in functions.items()
+  }
+
+
+# Return the set of functions reachable from the given roots.
+def reachable_functions(graph, roots):
+  reachable = set()
+  pending = [root for root in roots if root in graph]
+
+  while pending:
+    name = pending.pop()
+
+    if name in reachable:
+      continue
+
+    reachable.add(name)
+    pending.extend(callee for callee in graph[name] if callee in graph and callee not in reachable)
+
+  return reachable
+
+
+# Shake a whole program, given as a dict mapping each file to its instructions.
+#
+# Returns (programs, removed), where programs maps each file to its surviving instructions,
+# and removed maps each file to the list of (function name, instructions) we dropped.
+#
+# If the program has no entry point (e.g. we're compiling a library on its own),
+# there's no telling what's used, so nothing is removed and removed is None.
+def shake(programs):
+  functions = {jack_file: split_functions(instructions) for jack_file, instructions in programs.items()}
+
+  graph = {}
+  for class_functions in functions.values():
+    graph.update(call_graph(class_functions))
+
+  if not any(root in graph for root in ENTRY_POINTS):
+    return dict(programs), None
+
+  reachable = reachable_functions(graph, ENTRY_POINTS)
+
+  shaken = {}
+  removed = {}
+
+  for jack_file, class_functions in functions.items():
+    shaken[jack_file] = []
+    removed[jack_file] = []
+
+    for name, body in class_functions.items():
+      if name in reachable:
+        shaken[jack_file].extend(body)
+      else:
+        removed[jack_file].append((name, body))
+
+  return shaken, removed
+
+
+# Describe what was removed from one file, for the compile report.
+def describe(removed):
+  instruction_count = sum(len(body) for _, body in removed)
+  byte_count = sum(len(serialize(body)) for _, body in removed)
+  names = ", ".join(name for name, _ in removed)
+
+  return f"tree shaking removed {len(removed)} subroutines ({instruction_count} instructions, {byte_count} bytes): {names}"
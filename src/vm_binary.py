@@ -0,0 +1,255 @@
+"""
+VM binary format (.vmb)
+
+A compact binary encoding of VMInstructions, as an alternative to .vm text.
+Tools that load compiled code (emulators, translators) can read it without
+splitting and parsing every line, and it's several times smaller on disk.
+
+A .vmb file is laid out as:
+- the magic bytes "VMB" and a format version byte
+- the string table: a count, then each string as a length and its UTF-8 bytes.
+  Every function and label name is stored here exactly once.
+- the instruction count, then each instruction:
+  - one opcode byte (for push and pop, the segment is part of the opcode)
+  - push/pop: the index
+  - label/goto/if-goto: the label's string number
+  - function/call: the name's string number, then the local or argument count
+
+Every number after the header is an unsigned LEB128 varint:
+7 bits per byte, low bits first, with the high bit set on every byte but the last.
+Almost every number in real VM code fits in a single byte.
+
+Decoding and re-encoding as text is lossless: serialize(decode(encode(instructions)))
+is exactly serialize(instructions).
+"""
+
+
+from vm_instruction import (
+  VMInstruction,
+  serialize,
+  parse,
+  PUSH,
+  POP,
+  LABEL,
+  GOTO,
+  IF_GOTO,
+  FUNCTION,
+  CALL,
+  RETURN
+)
+
+
+MAGIC = b"VMB"
+VERSION = 1
+
+# Opcodes with no operands.
+SIMPLE_COMMANDS = ["add", "sub", "neg", "eq", "gt", "lt", "and", "or", "not", RETURN]
+
+# Opcodes whose operand is a name in the string table.
+NAME_COMMANDS = [LABEL, GOTO, IF_GOTO]
+
+# Opcodes whose operands are a name and a count.
+NAME_COUNT_COMMANDS = [FUNCTION, CALL]
+
+SEGMENTS = ["constant", "argument", "local", "static", "this", "that", "pointer", "temp"]
+
+# push and pop get one opcode per segment.
+PUSH_BASE = 16
+POP_BASE = PUSH_BASE + len(SEGMENTS)
+
+OPCODES = {command: opcode for opcode, command in enumerate(SIMPLE_COMMANDS + NAME_COMMANDS + NAME_COUNT_COMMANDS)}
+NAME_BASE = len(SIMPLE_COMMANDS)
+NAME_COUNT_BASE = NAME_BASE + len(NAME_COMMANDS)
+
+SEGMENT_CODES = {segment: code for code, segment in enumerate(SEGMENTS)}
+
+
+###################################################
+# VARINTS
+###################################################
+
+
+def write_varint(out, value):
+  assert value >= 0, f"Can't encode a negative number: {value}"
+
+  while value > 0x7F:
+    out.append(value & 0x7F | 0x80)
+    value >>= 7
+
+  out.append(value)
+
+
+# Read a varint from data at position.
+# Returns (value, position after it).
+def read_varint(data, position):
+  byte = data[position]
+  position += 1
+
+  # The common case: a single byte.
+  if byte < 0x80:
+    return byte, position
+
+  value = byte & 0x7F
+  shift = 7
+
+  while True:
+    byte = data[position]
+    position += 1
+    value |= (byte & 0x7F) << shift
+
+    if byte < 0x80:
+      return value, position
+
+    shift += 7
+
+
+###################################################
+# ENCODING
+###################################################
+
+
+# Encode a list of VMInstructions as .vmb bytes.
+def encode(instructions):
+  strings = {}
+  body = bytearray()
+
+  def string_number(name):
+    number = strings.get(name)
+
+    if number is None:
+      number = strings[name] = len(strings)
+
+    return number
+
+  for instruction in instructions:
+    command = instruction.command
+
+    if command == PUSH or command == POP:
+      segment = SEGMENT_CODES.get(instruction.arg1)
+      assert segment is not None, f"Invalid segment: {instruction}"
+
+      body.append((PUSH_BASE if command == PUSH else POP_BASE) + segment)
+      write_varint(body, instruction.arg2)
+    else:
+      opcode = OPCODES.get(command)
+      assert opcode is not None, f"Unrecognized VM command: {instruction}"
+
+      body.append(opcode)
+
+      if opcode >= NAME_BASE:
+        write_varint(body, string_number(instruction.arg1))
+
+      if opcode >= NAME_COUNT_BASE:
+        write_varint(body, instruction.arg2)
+
+  out = bytearray(MAGIC)
+  out.append(VERSION)
+
+  write_varint(out, len(strings))
+  for name in strings:
+    encoded = name.encode("utf-8")
+    write_varint(out, len(encoded))
+    out += encoded
+
+  write_varint(out, len(instructions))
+  out += body
+
+  return bytes(out)
+
+
+###################################################
+# DECODING
+###################################################
+
+
+# Decode .vmb bytes back into a list of VMInstructions.
+def decode(data):
+  assert len(data) > len(MAGIC) and data[:len(MAGIC)] == MAGIC, "Not a .vmb file"
+  assert data[len(MAGIC)] == VERSION, f"Unsupported .vmb version: {data[len(MAGIC)]}"
+
+  position = len(MAGIC) + 1
+
+  # Instructions without operands are all alike, so they can share one instance each.
+  # Real code repeats its other instructions too ("push local 0", "call Math.multiply 2", ...),
+  # so we keep the ones we've built, keyed on their opcode and operands, and hand out the same
+  # instance again. Nothing changes a VMInstruction once it's built, so sharing is safe.
+  simple = [VMInstruction(command) for command in SIMPLE_COMMANDS]
+  names = NAME_COMMANDS + NAME_COUNT_COMMANDS
+  stack_commands = [PUSH] * len(SEGMENTS) + [POP] * len(SEGMENTS)
+  stack_segments = SEGMENTS + SEGMENTS
+  built = {}
+
+  instructions = []
+  append = instructions.append
+
+  # A truncated file, an unknown opcode, or a string number past the string table
+  # all end up indexing past the end of something.
+  try:
+    string_count, position = read_varint(data, position)
+    strings = []
+
+    for _ in range(string_count):
+      length, position = read_varint(data, position)
+      strings.append(data[position:position + length].decode("utf-8"))
+      position += length
+
+    instruction_count, position = read_varint(data, position)
+
+    for _ in range(instruction_count):
+      opcode = data[position]
+
+      if opcode >= PUSH_BASE:
+        # Inline the single-byte varint case; it's by far the most common.
+        index = data[position + 1]
+
+        if index < 0x80:
+          position += 2
+        else:
+          index, position = read_varint(data, position + 1)
+
+        key = index << 8 | opcode
+        instruction = built.get(key)
+
+        if instruction is None:
+          instruction = built[key] = VMInstruction(stack_commands[opcode - PUSH_BASE], stack_segments[opcode - PUSH_BASE], index)
+
+        append(instruction)
+      elif opcode < NAME_BASE:
+        position += 1
+        append(simple[opcode])
+      else:
+        number, position = read_varint(data, position + 1)
+
+        if opcode < NAME_COUNT_BASE:
+          count = None
+        else:
+          count, position = read_varint(data, position)
+
+        key = (opcode, number, count)
+        instruction = built.get(key)
+
+        if instruction is None:
+          instruction = built[key] = VMInstruction(names[opcode - NAME_BASE], strings[number], count)
+
+        append(instruction)
+  except (IndexError, UnicodeDecodeError):
+    raise AssertionError(f"Corrupt .vmb file at byte {position}") from None
+
+  assert position == len(data), f"Corrupt .vmb file at byte {position}"
+
+  return instructions
+
+
+###################################################
+# TEXT ROUND TRIPS
+###################################################
+
+
+# Convert .vm text to .vmb bytes.
+def text_to_binary(text):
+  return encode(parse(text))
+
+
+# Convert .vmb bytes back to .vm text.
+def binary_to_text(data):
+  return serialize(decode(data))
@@ -0,0 +1,432 @@
+"""
+VMEmulator
+
+A headless VM emulator, for running compiled programs and counting what they execute,
+without loading them into the course's GUI emulator.
+
+Before running, every class's instructions are predecoded into one flat code list
+of (opcode, a, b) tuples, with everything that can be resolved ahead of time resolved:
+- push/pop get an opcode per kind of segment. static, temp, and pointer
+  all become a fixed RAM address; constant becomes the value itself.
+- goto/if-goto targets become code positions, and labels disappear.
+- calls become either a code position, or (for subroutines the program doesn't define)
+  a Python function from the JackOS stand-in.
+The run loop then only has to dispatch on a small int opcode, and never looks at a name.
+
+While it runs, the emulator counts how many times each instruction executed.
+Everything in the report is worked out from those counts afterwards:
+instructions and calls per function, and an estimate of the Hack cycles they'd take,
+using the same cost model as strength reduction.
+Labels aren't executed, so they aren't counted.
+
+SP, LCL and ARG are kept in local variables while the program runs,
+and are written back to RAM when it stops.
+"""
+
+
+from jack_os import JackOS, Halt, word
+from strength_reduction import cost_of
+from vm_instruction import PUSH, POP, LABEL, GOTO, IF_GOTO, FUNCTION, CALL, RETURN
+
+
+RAM_SIZE = 32768
+STACK_BASE = 256
+STATIC_BASE = 16
+STATIC_END = 256
+
+# Programs start in Sys.init if they have one, and in Main.main otherwise.
+ENTRY_POINTS = ("Sys.init", "Main.main")
+
+# Stop a program once it has taken this many jumps and calls,
+# so a program stuck in a loop can't hang the emulator.
+DEFAULT_MAX_BRANCHES = 100_000_000
+
+# How many of the busiest functions to show in the report.
+FUNCTION_ROWS = 20
+
+# The return address that ends the program.
+HALT = -1
+
+# OPCODES
+PUSH_CONSTANT = 0
+PUSH_LOCAL = 1
+PUSH_ARGUMENT = 2
+PUSH_THIS = 3
+PUSH_THAT = 4
+PUSH_ADDRESS = 5
+POP_LOCAL = 6
+POP_ARGUMENT = 7
+POP_THIS = 8
+POP_THAT = 9
+POP_ADDRESS = 10
+ADD = 11
+SUB = 12
+NEG = 13
+EQ = 14
+GT = 15
+LT = 16
+AND = 17
+OR = 18
+NOT = 19
+GOTO_OP = 20
+IF_GOTO_OP = 21
+FUNCTION_OP = 22
+CALL_OP = 23
+CALL_OS = 24
+RETURN_OP = 25
+
+ARITHMETIC_OPCODES = {
+  "add": ADD,
+  "sub": SUB,
+  "neg": NEG,
+  "eq": EQ,
+  "gt": GT,
+  "lt": LT,
+  "and": AND,
+  "or": OR,
+  "not": NOT
+}
+
+PUSH_OPCODES = {"local": PUSH_LOCAL, "argument": PUSH_ARGUMENT, "this": PUSH_THIS, "that": PUSH_THAT}
+POP_OPCODES = {"local": POP_LOCAL, "argument": POP_ARGUMENT, "this": POP_THIS, "that": POP_THAT}
+
+# Segments that map straight onto registers.
+FIXED_SEGMENTS = {"pointer": (3, 2), "temp": (5, 8)}
+
+
+class VMEmulator:
+  # programs is a list of (class name, VMInstructions) pairs,
+  # keys the JackOS keyboard script, and ram a dict of {address: value} to preload.
+  def __init__(self, programs, keys = (), ram = None):
+    self.ram = [0] * RAM_SIZE
+
+    for address, value in (ram or {}).items():
+      self.ram[address] = word(value)
+
+    self.os = JackOS(self.ram, keys)
+    self.load(programs)
+
+    self.hits = [0] * len(self.code)
+    self.os_calls = {}
+    self.halt_reason = None
+
+
+  ###################################################
+  # PREDECODING
+  ###################################################
+
+
+  def load(self, programs):
+    self.code = []
+    self.costs = []
+
+    # Each function's name and its first code position, in order.
+    self.functions = []
+    function_positions = {}
+    labels = {}
+    statics = {}
+
+    # Calls and jumps are resolved once every function and label has a position.
+    calls = []
+    jumps = []
+
+    for class_name, instructions in programs:
+      function_name = None
+
+      for instruction in instructions:
+        command = instruction.command
+
+        if command == LABEL:
+          labels[function_name, instruction.arg1] = len(self.code)
+          continue
+
+        if command == FUNCTION:
+          function_name = instruction.arg1
+          assert function_name not in function_positions, f"Function defined twice: {function_name}"
+
+          function_positions[function_name] = len(self.code)
+          self.functions.append((function_name, len(self.code)))
+          decoded = (FUNCTION_OP, instruction.arg2, None)
+        elif command == PUSH or command == POP:
+          decoded = self.decode_stack_instruction(class_name, instruction, statics)
+        elif command in ARITHMETIC_OPCODES:
+          decoded = (ARITHMETIC_OPCODES[command], None, None)
+        elif command == GOTO or command == IF_GOTO:
+          jumps.append((len(self.code), function_name, instruction))
+          decoded = None
+        elif command == CALL:
+          calls.append((len(self.code), instruction))
+          decoded = None
+        elif command == RETURN:
+          decoded = (RETURN_OP, None, None)
+        else:
+          raise AssertionError(f"Unrecognized VM command: {instruction}")
+
+        self.code.append(decoded)
+        self.costs.append(cost_of(instruction))
+
+    for position, function_name, instruction in jumps:
+      target = labels.get((function_name, instruction.arg1))
+      assert target is not None, f"Undefined label in {function_name}: {instruction.arg1}"
+
+      self.code[position] = (GOTO_OP if instruction.command == GOTO else IF_GOTO_OP, target, None)
+
+    os_functions = self.os.functions()
+
+    for position, instruction in calls:
+      name = instruction.arg1
+
+      if name in function_positions:
+        self.code[position] = (CALL_OP, function_positions[name], instruction.arg2)
+      else:
+        assert name in os_functions, f"Call to undefined function: {name}"
+        self.code[position] = (CALL_OS, (name, os_functions[name]), instruction.arg2)
+
+    self.entry = next((name for name in ENTRY_POINTS if name in function_positions), None)
+    assert self.entry, "The program has no Sys.init or Main.main"
+    self.entry_position = function_positions[self.entry]
+
+
+  def decode_stack_instruction(self, class_name, instruction, statics):
+    segment = instruction.arg1
+    index = instruction.arg2
+    push = instruction.command == PUSH
+
+    if segment == "constant":
+      assert push, f"Can't pop to a constant: {instruction}"
+      return (PUSH_CONSTANT, index, None)
+
+    if segment in PUSH_OPCODES:
+      return (PUSH_OPCODES[segment] if push else POP_OPCODES[segment], index, None)
+
+    if segment == "static":
+      address = statics.get((class_name, index))
+
+      if address is None:
+        address = statics[class_name, index] = STATIC_BASE + len(statics)
+        assert address < STATIC_END, "Too many static variables"
+    elif segment in FIXED_SEGMENTS:
+      base, size = FIXED_SEGMENTS[segment]
+      assert 0 <= index < size, f"Invalid {segment} index: {instruction}"
+      address = base + index
+    else:
+      raise AssertionError(f"Invalid segment: {instruction}")
+
+    return (PUSH_ADDRESS if push else POP_ADDRESS, address, None)
+
+
+  ###################################################
+  # RUNNING
+  ###################################################
+
+
+  # Run the program until it returns from its entry point, halts,
+  # or takes more than max_branches jumps and calls.
+  def run(self, max_branches = DEFAULT_MAX_BRANCHES):
+    ram = self.ram
+    code = self.code
+    hits = self.hits
+    os_calls = self.os_calls
+    budget = max_branches
+
+    # Call the entry point as if from a caller that halts when it returns.
+    sp = STACK_BASE
+    ram[sp:sp + 5] = [HALT, 0, 0, 0, 0]
+    sp += 5
+    arg = STACK_BASE
+    lcl = sp
+    pc = self.entry_position
+
+    try:
+      while True:
+        hits[pc] += 1
+        op, a, b = code[pc]
+        pc += 1
+
+        if op == PUSH_CONSTANT:
+          ram[sp] = a
+          sp += 1
+        elif op == PUSH_LOCAL:
+          ram[sp] = ram[lcl + a]
+          sp += 1
+        elif op == PUSH_ARGUMENT:
+          ram[sp] = ram[arg + a]
+          sp += 1
+        elif op == POP_LOCAL:
+          sp -= 1
+          ram[lcl + a] = ram[sp]
+        elif op == PUSH_ADDRESS:
+          ram[sp] = ram[a]
+          sp += 1
+        elif op == POP_ADDRESS:
+          sp -= 1
+          ram[a] = ram[sp]
+        elif op == PUSH_THIS:
+          ram[sp] = ram[ram[3] + a]
+          sp += 1
+        elif op == PUSH_THAT:
+          ram[sp] = ram[ram[4] + a]
+          sp += 1
+        elif op == POP_THIS:
+          sp -= 1
+          ram[ram[3] + a] = ram[sp]
+        elif op == POP_THAT:
+          sp -= 1
+          ram[ram[4] + a] = ram[sp]
+        elif op == POP_ARGUMENT:
+          sp -= 1
+          ram[arg + a] = ram[sp]
+        elif op == IF_GOTO_OP:
+          sp -= 1
+          if ram[sp]:
+            pc = a
+            budget -= 1
+            if not budget:
+              raise Halt(f"stopped after {max_branches} jumps and calls")
+        elif op == GOTO_OP:
+          pc = a
+          budget -= 1
+          if not budget:
+            raise Halt(f"stopped after {max_branches} jumps and calls")
+        elif op <= NOT:
+          if op == NOT:
+            ram[sp - 1] = ~ram[sp - 1]
+          elif op == NEG:
+            ram[sp - 1] = word(-ram[sp - 1])
+          else:
+            sp -= 1
+            y = ram[sp]
+            x = ram[sp - 1]
+
+            if op == ADD:
+              x = ((x + y + 32768) & 0xFFFF) - 32768
+            elif op == SUB:
+              x = ((x - y + 32768) & 0xFFFF) - 32768
+            elif op == EQ:
+              x = -(x == y)
+            elif op == GT:
+              x = -(x > y)
+            elif op == LT:
+              x = -(x < y)
+            elif op == AND:
+              x = x & y
+            else:
+              x = x | y
+
+            ram[sp - 1] = x
+        elif op == CALL_OP:
+          budget -= 1
+          if not budget:
+            raise Halt(f"stopped after {max_branches} jumps and calls")
+
+          ram[sp] = pc
+          ram[sp + 1] = lcl
+          ram[sp + 2] = arg
+          ram[sp + 3] = ram[3]
+          ram[sp + 4] = ram[4]
+          sp += 5
+          arg = sp - 5 - b
+          lcl = sp
+          pc = a
+        elif op == FUNCTION_OP:
+          if a:
+            ram[sp:sp + a] = [0] * a
+            sp += a
+        elif op == RETURN_OP:
+          frame = lcl
+          pc = ram[frame - 5]
+          ram[arg] = ram[sp - 1]
+          sp = arg + 1
+          ram[4] = ram[frame - 1]
+          ram[3] = ram[frame - 2]
+          arg = ram[frame - 3]
+          lcl = ram[frame - 4]
+
+          if pc == HALT:
+            self.halt_reason = f"{self.entry} returned"
+            break
+        else:
+          # CALL_OS: pop the arguments, and push what the OS function returns.
+          name, function = a
+          os_calls[name] = os_calls.get(name, 0) + 1
+
+          sp -= b
+          value = function(*ram[sp:sp + b])
+          ram[sp] = 0 if value is None else word(value)
+          sp += 1
+    except Halt as halt:
+      self.halt_reason = str(halt)
+
+    ram[0] = sp
+    ram[1] = lcl
+    ram[2] = arg
+
+    return self
+
+
+  ###################################################
+  # REPORTING
+  ###################################################
+
+
+  def report(self):
+    hits = self.hits
+    costs = self.costs
+    functions = []
+
+    bounds = [position for _, position in self.functions] + [len(self.code)]
+
+    for (name, start), end in zip(self.functions, bounds[1:]):
+      functions.append({
+        "name": name,
+        "calls": hits[start],
+        "instructions": sum(hits[start:end]),
+        "cycles": sum(hits[position] * costs[position] for position in range(start, end))
+      })
+
+    # OS calls run in one step, and are charged the cost of their call instruction.
+    os_cycles = sum(
+      hits[position] * costs[position] for position, (op, _, _) in enumerate(self.code) if op == CALL_OS
+    )
+
+    return {
+      "entry": self.entry,
+      "halt_reason": self.halt_reason,
+      "instructions": sum(hits),
+      "calls": sum(function["calls"] for function in functions) + sum(self.os_calls.values()),
+      "cycles": sum(function["cycles"] for function in functions),
+      "os_cycles": os_cycles,
+      "functions": sorted(functions, key = lambda function: function["instructions"], reverse = True),
+      "os_calls": dict(sorted(self.os_calls.items(), key = lambda item: item[1], reverse = True)),
+      "output": self.os.text()
+    }
+
+
+def format_report(report):
+  lines = [
+    f"{report['entry']}: {report['halt_reason']}",
+    f"{report['instructions']:,} VM instructions, {report['calls']:,} calls, "
+    + f"~{report['cycles']:,} Hack cycles (~{report['os_cycles']:,} of them calling the OS)",
+    "",
+    f"{'function':<40} {'calls':>10} {'instrs':>12} {'cycles':>14}"
+  ]
+
+  for function in report["functions"][:FUNCTION_ROWS]:
+    if function["calls"]:
+      lines.append(
+        f"{function['name'][-40:]:<40} {function['calls']:>10,} {function['instructions']:>12,} {function['cycles']:>14,}"
+      )
+
+  if report["os_calls"]:
+    lines.append("")
+    lines.append(f"{'OS function':<40} {'calls':>10}")
+
+    for name, calls in report["os_calls"].items():
+      lines.append(f"{name:<40} {calls:>10,}")
+
+  if report["output"]:
+    lines.append("")
+    lines.append("output:")
+    lines.append(report["output"])
+
+  return "\n".join(lines)
@@ -0,0 +1,127 @@
+"""
+VMInstruction
+
+A compact, in-memory representation of a single VM instruction.
+
+VMWriter collects these instead of formatting text right away.
+The whole list is serialized to VM code in one final pass,
+which leaves room for optimization passes (and other output formats) in between.
+parse() turns VM code text back into VMInstructions.
+
+Following the VM spec, every instruction has a command and up to two arguments:
+- push/pop: arg1 is the segment, arg2 is the index
+- label/goto/if-goto: arg1 is the label
+- function: arg1 is the function name, arg2 is the local count
+- call: arg1 is the function name, arg2 is the argument count
+- arithmetic commands and return have no arguments
+"""
+
+
+# COMMANDS
+PUSH = "push"
+POP = "pop"
+LABEL = "label"
+GOTO = "goto"
+IF_GOTO = "if-goto"
+FUNCTION = "function"
+CALL = "call"
+RETURN = "return"
+
+
+ARITHMETIC_COMMANDS = frozenset([
+  "add",
+  "sub",
+  "neg",
+  "eq",
+  "gt",
+  "lt",
+  "and",
+  "or",
+  "not"
+])
+
+
+POP_SEGMENTS = frozenset([
+  "argument",
+  "local",
+  "static",
+  "this",
+  "that",
+  "pointer",
+  "temp"
+])
+
+
+PUSH_SEGMENTS = POP_SEGMENTS | {"constant"}
+
+
+# Commands whose text form is "command arg1 arg2" or "command arg1".
+TWO_ARG_COMMANDS = frozenset([PUSH, POP, FUNCTION, CALL])
+ONE_ARG_COMMANDS = frozenset([LABEL, GOTO, IF_GOTO])
+
+
+class VMInstruction:
+  __slots__ = ("command", "arg1", "arg2")
+
+  def __init__(self, command, arg1 = None, arg2 = None):
+    self.command = command
+    self.arg1 = arg1
+    self.arg2 = arg2
+
+
+  def __eq__(self, other):
+    if not isinstance(other, VMInstruction):
+      return NotImplemented
+
+    return self.command == other.command and self.arg1 == other.arg1 and self.arg2 == other.arg2
+
+
+  def __hash__(self):
+    return hash((self.command, self.arg1, self.arg2))
+
+
+  def __repr__(self):
+    return f"VMInstruction({self.command!r}, {self.arg1!r}, {self.arg2!r})"
+
+
+  # Format the instruction as a line of VM code.
+  def __str__(self):
+    if self.command in TWO_ARG_COMMANDS:
+      return f"{self.command} {self.arg1} {self.arg2}"
+
+    if self.command in ONE_ARG_COMMANDS:
+      return f"{self.command} {self.arg1}"
+
+    return self.command
+
+
+# Serialize a list of instructions into VM code, one instruction per line.
+def serialize(instructions):
+  return "".join([f"{instruction}\n" for instruction in instructions])
+
+
+# Parse VM code back into a list of instructions: the inverse of serialize().
+# Comments (// ...) and blank lines are skipped, so hand-written VM code
+# (e.g. the OS's .vm files) parses too.
+def parse(text):
+  instructions = []
+
+  for number, line in enumerate(text.splitlines(), 1):
+    words = line.split("//", 1)[0].split()
+
+    if not words:
+      continue
+
+    command = words[0]
+
+    if command in TWO_ARG_COMMANDS:
+      assert len(words) == 3, f"Expected two arguments on line {number}: {line}"
+      instructions.append(VMInstruction(command, words[1], int(words[2])))
+    elif command in ONE_ARG_COMMANDS:
+      assert len(words) == 2, f"Expected one argument on line {number}: {line}"
+      instructions.append(VMInstruction(command, words[1]))
+    else:
+      assert len(words) == 1 and (command in ARITHMETIC_COMMANDS or command == RETURN), f"Unrecognized VM command on line {number}: {line}"
+      instructions.append(VMInstruction(command))
+
+  return instructions
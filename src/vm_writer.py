@@ -2,50 +2,99 @@
 VMWriter
 
 Emit VM Code to output .vm file.
+
+Instructions are collected in memory as VMInstructions (see vm_instruction.py)
+as the CompilationEngine emits them, and only serialized to text at the very end.
+Nothing touches the disk until close(), which writes the whole file in one go
+through a temp file and an atomic rename.
+That way, a failed compile never leaves a truncated .vm file behind.
+
+Pass jack_file = None to keep everything in memory;
+getvalue() then hands back the VM code as text.
+reset() readies the same VMWriter for the next file.
 """
 
+
+import os
+
+from atomic_file import write_atomically
+from tracer import Tracer
+from vm_instruction import (
+  VMInstruction,
+  serialize,
+  PUSH,
+  POP,
+  LABEL,
+  GOTO,
+  IF_GOTO,
+  FUNCTION,
+  CALL,
+  RETURN,
+  ARITHMETIC_COMMANDS,
+  PUSH_SEGMENTS,
+  POP_SEGMENTS
+)
+
+
+# Return the .vm file that a given .jack file compiles to.
+def vm_file_for(jack_file):
+  return os.path.splitext(jack_file)[0] + ".vm"
+
+
 class VMWriter:
-  def __init__(self, jack_file):
-    vm_file = jack_file.replace(".jack", ".vm")
+  def __init__(self, jack_file = None, tracer = None):
+    self.reset(jack_file)
+
+    # When tracing, swap in an emit() that records each instruction.
+    # When not tracing, emit() stays as lean as it's always been.
+    self.tracer = tracer or Tracer()
+
+    if self.tracer.enabled:
+      self.emit = self.emit_traced
 
-    self.vm_file = open(vm_file, "w")
 
+  # Start over on a new file (or a new in-memory compile, if jack_file is None).
+  # The old instructions list is left alone, so whoever took it can keep it.
+  def reset(self, jack_file = None):
+    # Where the VM code will end up, or None if we're only compiling in memory.
+    self.vm_file = vm_file_for(jack_file) if jack_file else None
 
-  def write(self, line):
-    self.vm_file.write(f"{line}\n")
+    # Every VM instruction we've written so far, as VMInstructions.
+    # They're only turned into text when we're done.
+    self.instructions = []
 
 
+  def emit(self, command, arg1 = None, arg2 = None):
+    self.instructions.append(VMInstruction(command, arg1, arg2))
+
+
+  def emit_traced(self, command, arg1 = None, arg2 = None):
+    instruction = VMInstruction(command, arg1, arg2)
+    self.tracer.event("write", instruction)
+    self.instructions.append(instruction)
+
+
+  # Return the VM code written so far.
+  def getvalue(self):
+    return serialize(self.instructions)
+
+
+  # Write the VM code out to the .vm file (atomically), if we have one.
   def close(self):
-    self.vm_file.close()
+    if self.vm_file is not None:
+      write_atomically(self.vm_file, self.getvalue())
 
 
   def write_push(self, segment, index):
-    assert segment in [
-      "constant",
-      "argument",
-      "local",
-      "static",
-      "this",
-      "that",
-      "pointer",
-      "temp"
-    ], f"Invalid push segment: {segment}"
+    assert segment in PUSH_SEGMENTS, f"Invalid push segment: {segment}"
 
-    self.write(f"push {segment} {index}")
+    self.emit(PUSH, segment, index)
 
 
   def write_pop(self, segment, index):
-    assert segment in [
-      "argument",
-      "local",
-      "static",
-      "this",
-      "that",
-      "pointer",
-      "temp"
-    ], f"Invalid pop segment: {segment}"
+    assert segment in POP_SEGMENTS, f"Invalid pop segment: {segment}"
 
-    self.write(f"pop {segment} {index}")
+    self.emit(POP, segment, index)
 
 
   def write_binary_op(self, op):
@@ -81,40 +130,42 @@ class VMWriter:
 
 
   def write_command(self, command):
-    assert command in [
-      "add",
-      "sub",
-      "neg",
-      "eq",
-      "gt",
-      "lt",
-      "and",
-      "or",
-      "not"
-    ], f"Invalid arithmetic command: {command}"
+    assert command in ARITHMETIC_COMMANDS, f"Invalid arithmetic command: {command}"
 
-    self.write(command)
+    self.emit(command)
 
 
   def write_label(self, label):
-    self.write(f"label {label}")
+    self.emit(LABEL, label)
 
 
   def write_goto(self, label):
-    self.write(f"goto {label}")
+    self.emit(GOTO, label)
 
 
   def write_if(self, label):
-    self.write(f"if-goto {label}")
+    self.emit(IF_GOTO, label)
 
 
   def write_call(self, name, arg_count):
-    self.write(f"call {name} {arg_count}")
+    self.emit(CALL, name, arg_count)
 
 
   def write_function(self, name, local_count):
-    self.write(f"function {name} {local_count}")
+    self.emit(FUNCTION, name, local_count)
 
 
   def write_return(self):
-    self.write("return")
+    self.emit(RETURN)
+
+
+  # Build a string constant at runtime:
+  # String.new(length), then String.appendChar() once per character.
+  # Each appendChar() returns the string, so it stays on the stack for the next one.
+  def write_string(self, string):
+    self.write_push("constant", len(string))
+    self.write_call("String.new", 1)
+
+    for character in string:
+      self.write_push("constant", ord(character))
+      self.write_call("String.appendChar", 2)
@@ -0,0 +1,121 @@
+"""
+Watcher
+
+Keep the compiler running and recompile .jack files as soon as they're saved.
+
+The compiler's modules (and their compiled regexes, grammar tables, etc.) are
+loaded once and stay warm, and so does one CompileSession (its tokenizer,
+VMWriter, and CompilationEngine), so a recompile only pays for the file itself.
+
+Changes are detected by polling each file's mtime, which works everywhere
+without anything outside the standard library.
+
+For each recompiled file, we report how long compilation took and
+how long it's been since the file was saved (its mtime), i.e. the save-to-.vm latency.
+"""
+
+
+import os
+import sys
+import time
+
+from compile_session import CompileSession
+from jack_compiler import compile_file, find_jack_files
+from tracer import Tracer
+
+
+DEFAULT_INTERVAL = 0.1
+
+
+class Watcher:
+  def __init__(self, argv1, tracer = None, options = None, interval = DEFAULT_INTERVAL, output = sys.stdout):
+    self.argv1 = argv1
+    self.tracer = tracer or Tracer()
+    self.options = options
+    self.interval = interval
+    self.output = output
+
+    # Every compile reuses the same session, rather than building a new one per save.
+    self.session = CompileSession(options, self.tracer)
+
+    # The last mtime we compiled each file at.
+    self.mtimes = {}
+
+
+  # Return {jack_file: mtime} for every .jack file we're watching.
+  def scan(self):
+    mtimes = {}
+
+    for jack_file in find_jack_files(self.argv1):
+      try:
+        mtimes[jack_file] = os.stat(jack_file).st_mtime_ns
+      except OSError:
+        # The file vanished between listing and stat'ing it (e.g. an editor's atomic save).
+        # We'll pick it up on the next poll.
+        pass
+
+    return mtimes
+
+
+  # Compile everything once up front, so the first change we report is a real save.
+  def initial_build(self):
+    mtimes = self.scan()
+    failures = 0
+
+    for jack_file, mtime in mtimes.items():
+      self.mtimes[jack_file] = mtime
+      result = compile_file(jack_file, self.tracer, self.options, session = self.session)
+
+      if result.error:
+        failures += 1
+        self.report(f"{jack_file}: {result.error}")
+
+    self.report(f"Compiled {len(mtimes) - failures} of {len(mtimes)} files.")
+
+
+  # Recompile every file that's new or has changed since the last poll.
+  # Returns the results of the files we compiled.
+  def poll(self):
+    results = []
+
+    for jack_file, mtime in self.scan().items():
+      if self.mtimes.get(jack_file) == mtime:
+        continue
+
+      self.mtimes[jack_file] = mtime
+      results.append(self.recompile(jack_file, mtime))
+
+    return results
+
+
+  def recompile(self, jack_file, mtime):
+    start = time.perf_counter()
+    result = compile_file(jack_file, self.tracer, self.options, session = self.session)
+    finished = time.time_ns()
+
+    compile_ms = (time.perf_counter() - start) * 1000
+    latency_ms = (finished - mtime) / 1_000_000
+
+    if result.error:
+      self.report(f"{jack_file}: {result.error}")
+    else:
+      self.report(f"Compiled {jack_file} in {compile_ms:.1f} ms ({latency_ms:.1f} ms after save)")
+
+    return result
+
+
+  def report(self, message):
+    print(message, file = self.output, flush = True)
+
+
+  # Poll forever (or until interrupted).
+  def run(self):
+    self.initial_build()
+    self.report(f"Watching {self.argv1} for changes. Press Ctrl+C to stop.")
+
+    try:
+      while True:
+        self.poll()
+        time.sleep(self.interval)
+    except KeyboardInterrupt:
+      pass
@@ -0,0 +1,94 @@
+"""
+Deeply nested expressions
+
+Both front ends parse and generate expressions with an explicit stack,
+so nesting depth is limited by memory, not by Python's recursion limit.
+These compile expressions nested (or chained) 10,000 deep, far past the
+default recursion limit, and check the VM code that comes out.
+
+Timings live in benchmarks/expression_benchmark.py; these only check results.
+"""
+
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from compile_options import CompileOptions
+from jack_compiler import compile_source
+
+
+DEPTH = 10_000
+
+FRONTENDS = ["engine", "ast"]
+
+PROGRAM = """
+class Main {
+  function int f() {
+    return %s;
+  }
+
+  function int id(int x) {
+    return x;
+  }
+}
+"""
+
+# Main.id, which follows Main.f in every program.
+ID_FUNCTION = ["function Main.id 0", "push argument 0", "return"]
+
+
+# Compile Main.f returning the given expression, and return its VM code as lines.
+def compile_expression(expression, frontend):
+  result = compile_source(PROGRAM % expression, CompileOptions(frontend = frontend))
+
+  return result.getvalue().splitlines()
+
+
+# The VM code for Main.f, given the code for its expression.
+def expected_program(expression_code):
+  return ["function Main.f 0", *expression_code, "return", *ID_FUNCTION]
+
+
+@pytest.mark.parametrize("frontend", FRONTENDS)
+def test_nested_parentheses(frontend):
+  # ((((1 + 1) + 1) + 1) ...)
+  expression = "(" * DEPTH + "1" + " + 1)" * DEPTH
+
+  assert compile_expression(expression, frontend) == expected_program(
+    ["push constant 1"] + ["push constant 1", "add"] * DEPTH
+  )
+
+
+@pytest.mark.parametrize("frontend", FRONTENDS)
+def test_unary_chain(frontend):
+  # ---...-5
+  expression = "-" * DEPTH + "5"
+
+  assert compile_expression(expression, frontend) == expected_program(
+    ["push constant 5"] + ["neg"] * DEPTH
+  )
+
+
+@pytest.mark.parametrize("frontend", FRONTENDS)
+def test_nested_call_arguments(frontend):
+  # Main.id(Main.id(...(7)))
+  expression = "Main.id(" * DEPTH + "7" + ")" * DEPTH
+
+  assert compile_expression(expression, frontend) == expected_program(
+    ["push constant 7"] + ["call Main.id 1"] * DEPTH
+  )
+
+
+@pytest.mark.parametrize("frontend", FRONTENDS)
+def test_long_binary_chain(frontend):
+  # 1 + 2 + 3 + ... , evaluated left to right
+  expression = " + ".join(str(number % 100) for number in range(DEPTH))
+
+  assert compile_expression(expression, frontend) == expected_program(
+    ["push constant 0"]
+    + [line for number in range(1, DEPTH) for line in (f"push constant {number % 100}", "add")]
+  )
@@ -0,0 +1,71 @@
+"""
+.vmb decoding
+
+decode() round-trips what encode() writes, and rejects corrupt files
+with an AssertionError, the same way it rejects a bad magic number or version.
+"""
+
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import vm_binary
+from vm_instruction import parse
+
+
+SOURCE = """function Main.main 1
+push constant 300
+pop local 0
+label LOOP
+push local 0
+call Output.printInt 1
+pop temp 0
+goto LOOP
+push constant 0
+return
+"""
+
+DATA = vm_binary.encode(parse(SOURCE))
+
+
+def test_round_trip():
+  assert vm_binary.binary_to_text(DATA) == SOURCE
+
+
+@pytest.mark.parametrize("length", range(len(vm_binary.MAGIC) + 1, len(DATA)))
+def test_truncated(length):
+  with pytest.raises(AssertionError, match = "Corrupt .vmb file"):
+    vm_binary.decode(DATA[:length])
+
+
+def test_trailing_bytes():
+  with pytest.raises(AssertionError, match = f"Corrupt .vmb file at byte {len(DATA)}"):
+    vm_binary.decode(DATA + b"\x00")
+
+
+# The opcodes between the name/count commands and push, and past the last pop.
+@pytest.mark.parametrize("opcode", [vm_binary.NAME_COUNT_BASE + len(vm_binary.NAME_COUNT_COMMANDS), vm_binary.POP_BASE + len(vm_binary.SEGMENTS)])
+def test_unknown_opcode(opcode):
+  data = bytearray(DATA)
+  data[-1] = opcode
+
+  with pytest.raises(AssertionError, match = "Corrupt .vmb file"):
+    vm_binary.decode(bytes(data))
+
+
+def test_string_number_out_of_range():
+  # The body starts with "function", whose name is string 0; point it past the table.
+  data = bytearray(DATA)
+  data[data.index(bytes([vm_binary.OPCODES["function"], 0]), len(vm_binary.MAGIC) + 1) + 1] = 99
+
+  with pytest.raises(AssertionError, match = "Corrupt .vmb file"):
+    vm_binary.decode(bytes(data))
+
+
+def test_not_a_vmb_file():
+  with pytest.raises(AssertionError, match = "Not a .vmb file"):
+    vm_binary.decode(vm_binary.MAGIC)